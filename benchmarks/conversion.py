@@ -0,0 +1,359 @@
+"""Micro-benchmarks for the message conversion layer.
+
+Times the functions that run for every message on every poll:
+extract_content, convert_message_to_state, convert_task_to_state,
+convert_event_to_state, ADKHostManager.adk_content_from_message /
+adk_content_to_message and ConversationServer.cache_content, plus the construction cost of the
+pydantic Message against the InternalMessage the server builds for itself.
+
+Synthetic messages vary the number of parts, the part kinds, the payload size
+and whether parts arrive as pydantic objects or plain dicts. For every case
+the report has ops/s, the peak memory traced during one call (KiB) and the
+memory blocks still allocated per call afterwards.
+
+run:
+  python -m benchmarks.conversion
+  python -m benchmarks.conversion --filter cache_content --min-time 0.5
+  python -m benchmarks.conversion --baseline benchmarks/results/conversion_baseline.json
+"""
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import inspect
+import io
+import itertools
+import json
+import os
+import sys
+import time
+import tracemalloc
+import uuid
+
+from collections.abc import Callable
+from typing import Any
+
+from a2a.types import (
+    DataPart,
+    FilePart,
+    FileWithBytes,
+    Part,
+    Role,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+
+from service.server.adk_host_manager import ADKHostManager
+from service.server.internal_message import InternalMessage
+from service.server.server import ConversationServer
+from service.types import Event, Message, patch_a2a_message
+from state import host_agent_service
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+PART_COUNTS = [1, 4, 16]
+PART_KINDS = ['text', 'data', 'file', 'mixed']
+PAYLOAD_SIZES = {'small': 64, 'large': 16 * 1024}
+REPRESENTATIONS = ['object', 'dict']
+
+
+def make_part(kind: str, size: int, index: int) -> Part:
+    if kind == 'mixed':
+        kind = ['text', 'data', 'file'][index % 3]
+    if kind == 'text':
+        return Part(root=TextPart(text='x' * size))
+    if kind == 'data':
+        return Part(root=DataPart(data={'index': index, 'payload': 'y' * size}))
+    return Part(
+        root=FilePart(
+            file=FileWithBytes(bytes='z' * size, mime_type='text/plain')
+        )
+    )
+
+
+def make_message(
+    part_count: int, kind: str, size: int, representation: str
+) -> Message:
+    messageid = str(uuid.uuid4())
+    parts: list[Any] = [make_part(kind, size, i) for i in range(part_count)]
+    if representation == 'dict':
+        parts = [p.model_dump(mode='json') for p in parts]
+    return Message(
+        messageId=messageid,
+        contextId='benchmark',
+        role=Role.agent,
+        parts=parts,
+        metadata={'messageId': messageid},
+    )
+
+
+def make_task(message: Message) -> Task:
+    task = Task(
+        id=str(uuid.uuid4()),
+        context_id='benchmark',
+        status=TaskStatus(state=TaskState.completed, message=message),
+        history=[message, message],
+    )
+    return task
+
+
+def bare_manager() -> ADKHostManager:
+    # The conversion methods do not touch the runner or the session services;
+    # __init__ is skipped, so patch the a2a models here (see make_task)
+    patch_a2a_message()
+    return ADKHostManager.__new__(ADKHostManager)
+
+
+def bare_server() -> ConversationServer:
+    server = ConversationServer.__new__(ConversationServer)
+    server._file_cache = {}
+    server._message_to_cache = {}
+    # Single process: file parts are not shared with other workers
+    server.cluster = None
+    return server
+
+
+def build_cases() -> list[tuple[str, str, Callable[[], Any]]]:
+    """Return (function, case, zero-argument callable) triples."""
+    manager = bare_manager()
+    server = bare_server()
+    cases = []
+    for count, kind, (size_name, size), representation in itertools.product(
+        PART_COUNTS, PART_KINDS, PAYLOAD_SIZES.items(), REPRESENTATIONS
+    ):
+        case = f'{count}x{kind}/{size_name}/{representation}'
+        message = make_message(count, kind, size, representation)
+        cases.append(
+            (
+                'extract_content',
+                case,
+                lambda m=message: host_agent_service.extract_content(m.parts),
+            )
+        )
+        cases.append(
+            (
+                'convert_message_to_state',
+                case,
+                lambda m=message: host_agent_service.convert_message_to_state(m),
+            )
+        )
+        event = Event(id='e', actor='agent', content=message, timestamp=0.0)
+        cases.append(
+            (
+                'convert_event_to_state',
+                case,
+                lambda e=event: host_agent_service.convert_event_to_state(e),
+            )
+        )
+        cases.append(
+            (
+                'cache_content',
+                case,
+                lambda m=message: server.cache_content([m]),
+            )
+        )
+        if representation == 'object':
+            task = make_task(message)
+            cases.append(
+                (
+                    'convert_task_to_state',
+                    case,
+                    lambda t=task: host_agent_service.convert_task_to_state(t),
+                )
+            )
+            adk_message = make_message(count, kind, size, representation)
+            cases.append(
+                (
+                    'adk_content_from_message',
+                    case,
+                    lambda m=adk_message: manager.adk_content_from_message(m),
+                )
+            )
+            parts = list(adk_message.parts)
+            cases.append(
+                (
+                    'Message()',
+                    case,
+                    lambda p=parts: Message(
+                        parts=p, role=Role.agent, contextId='benchmark'
+                    ),
+                )
+            )
+            cases.append(
+                (
+                    'InternalMessage()',
+                    case,
+                    lambda p=parts: InternalMessage(
+                        parts=p, contextId='benchmark'
+                    ),
+                )
+            )
+            internal = InternalMessage(parts=parts, contextId='benchmark')
+            cases.append(
+                ('InternalMessage.to_wire', case, internal.to_wire)
+            )
+            content = manager.adk_content_from_message(adk_message)
+            cases.append(
+                (
+                    'adk_content_to_message',
+                    case,
+                    lambda c=content: manager.adk_content_to_message(
+                        c, 'benchmark', None
+                    ),
+                )
+            )
+    return cases
+
+
+def _returns_coroutine(fn: Callable[[], Any]) -> bool:
+    result = fn()
+    if inspect.iscoroutine(result):
+        result.close()
+        return True
+    return False
+
+
+def measure(
+    fn: Callable[[], Any], min_time: float, loop: asyncio.AbstractEventLoop
+) -> dict[str, float]:
+    is_async = _returns_coroutine(fn)
+
+    def calls(n: int):
+        if is_async:
+
+            async def batch():
+                for _ in range(n):
+                    await fn()
+
+            loop.run_until_complete(batch())
+        else:
+            for _ in range(n):
+                fn()
+
+    # Warm up and calibrate the number of iterations
+    n = 1
+    while True:
+        start = time.perf_counter()
+        calls(n)
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time / 10 or n >= 1_000_000:
+            break
+        n *= 4
+    iterations = max(1, int(n * min_time / max(elapsed, 1e-9)))
+
+    gc.collect()
+    start = time.perf_counter()
+    calls(iterations)
+    elapsed = time.perf_counter() - start
+
+    # Memory: peak traced during a single call and blocks kept per call
+    gc.collect()
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    base, _ = tracemalloc.get_traced_memory()
+    calls(1)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sample = min(iterations, 200)
+    gc.collect()
+    blocks_before = sys.getallocatedblocks()
+    calls(sample)
+    gc.collect()
+    retained = (sys.getallocatedblocks() - blocks_before) / sample
+
+    return {
+        'iterations': iterations,
+        'ops_per_second': round(iterations / elapsed, 1),
+        'us_per_call': round(elapsed / iterations * 1e6, 3),
+        'peak_kib_per_call': round((peak - base) / 1024, 2),
+        'retained_blocks_per_call': round(retained, 2),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    previous = {
+        (r['function'], r['case']): r for r in baseline.get('results', [])
+    }
+    for r in result['results']:
+        old = previous.get((r['function'], r['case']))
+        if not old or not old.get('ops_per_second') or 'error' in r:
+            continue
+        change = (r['ops_per_second'] - old['ops_per_second']) / old['ops_per_second']
+        if change < -tolerance:
+            regressions.append(f'{r["function"]}[{r["case"]}] {change:+.1%}')
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--min-time', type=float, default=0.2)
+    parser.add_argument(
+        '--filter', default='', help='Only run functions/cases containing this'
+    )
+    parser.add_argument('--output', help='Where to write the JSON result')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Also write the result here')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    loop = asyncio.new_event_loop()
+    results = []
+    # The converters print debug lines; keep them out of the report
+    with contextlib.redirect_stdout(io.StringIO()) as sink:
+        for function, case, fn in build_cases():
+            if args.filter and args.filter not in f'{function} {case}':
+                continue
+            try:
+                stats = measure(fn, args.min_time, loop)
+            except Exception as e:
+                # Broken branch for this kind of input: report it, keep going
+                results.append(
+                    {'function': function, 'case': case, 'error': repr(e)}
+                )
+                print(f'{function:<26} {case:<24} ERRO {e!r}', file=sys.stderr)
+                continue
+            finally:
+                sink.seek(0)
+                sink.truncate()
+            results.append({'function': function, 'case': case, **stats})
+            print(
+                f'{function:<26} {case:<24} {stats["ops_per_second"]:>12} ops/s '
+                f'{stats["us_per_call"]:>10} us  pico={stats["peak_kib_per_call"]} KiB '
+                f'retidos={stats["retained_blocks_per_call"]}',
+                file=sys.stderr,
+            )
+    loop.close()
+
+    result = {
+        'results': results,
+        'python': sys.version.split()[0],
+        'timestamp': time.time(),
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'conversion_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    for path in filter(None, [output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+    print(f'Resultado salvo em {output}')
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print('Regressões de ops/s:')
+            for r in regressions:
+                print('  ' + r)
+            return 1
+        print('Sem regressões em relação ao baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+"""Load-generation benchmark for ConversationServer.
+
+Starts the FastAPI app in-process (no sockets, no network) with the seeded
+InMemoryFakeAgentManager simulation and drives a UI-like workload: many conversations, concurrent
+sends and periodic polling of /message/list, /message/pending, /events/get and
+/task/list. Reports throughput, p50/p95/p99 latency per endpoint and RSS over
+time, writes the result as JSON and optionally compares it with a baseline.
+
+run:
+  python -m benchmarks.load_server --conversations 200 --turns 5
+  python -m benchmarks.load_server --save-baseline benchmarks/results/baseline.json
+  python -m benchmarks.load_server --baseline benchmarks/results/baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import resource
+import sys
+import time
+import uuid
+
+from collections import defaultdict
+from dataclasses import asdict, dataclass
+
+import httpx
+
+from fastapi import FastAPI
+
+from service.server.in_memory_manager import (
+    InMemoryFakeAgentManager,
+    SimulationConfig,
+)
+from service.server.server import ConversationServer
+
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# Metrics compared against the baseline and whether higher is better
+COMPARED_METRICS = {
+    'throughput_rps': True,
+    'p50_ms': False,
+    'p95_ms': False,
+    'p99_ms': False,
+}
+
+
+@dataclass
+class Workload:
+    conversations: int = 100
+    turns: int = 5
+    concurrency: int = 50
+    pollers: int = 20
+    poll_interval: float = 0.25
+    agent_latency: float = 0.05
+    task_probability: float = 0.3
+    reply_timeout: float = 30.0
+    seed: int = 1234
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def current_rss_mb() -> float:
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except (OSError, ValueError):
+        # Not Linux: fall back to the peak RSS (KiB on Linux, bytes on macOS)
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+class LoadRunner:
+    def __init__(self, client: httpx.AsyncClient, workload: Workload):
+        self.client = client
+        self.workload = workload
+        self.random = random.Random(workload.seed)
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+        self.rss: list[tuple[float, float]] = []
+        self.conversation_ids: list[str] = []
+        self._done = asyncio.Event()
+
+    async def call(self, method: str, params=None) -> dict:
+        start = time.perf_counter()
+        try:
+            response = await self.client.post(
+                '/' + method,
+                json={'jsonrpc': '2.0', 'id': uuid.uuid4().hex, 'params': params},
+            )
+            response.raise_for_status()
+            return response.json()
+        except Exception:
+            self.errors[method] += 1
+            return {}
+        finally:
+            self.latencies[method].append(
+                (time.perf_counter() - start) * 1000
+            )
+
+    async def run(self) -> dict:
+        started = time.perf_counter()
+        sampler = asyncio.create_task(self.sample_rss(started))
+        for _ in range(self.workload.conversations):
+            result = await self.call('conversation/create')
+            conversation = result.get('result') or {}
+            self.conversation_ids.append(
+                conversation.get('conversationid')
+                or conversation.get('conversationId', '')
+            )
+        pollers = [
+            asyncio.create_task(self.poll()) for _ in range(self.workload.pollers)
+        ]
+        semaphore = asyncio.Semaphore(self.workload.concurrency)
+        await asyncio.gather(
+            *(self.converse(c, semaphore) for c in self.conversation_ids)
+        )
+        self._done.set()
+        await asyncio.gather(*pollers)
+        await sampler
+        return self.report(time.perf_counter() - started)
+
+    async def converse(self, conversationid: str, semaphore: asyncio.Semaphore):
+        async with semaphore:
+            for turn in range(self.workload.turns):
+                messageid = str(uuid.uuid4())
+                await self.call(
+                    'message/send',
+                    {
+                        'messageId': messageid,
+                        'contextId': conversationid,
+                        'role': 'user',
+                        'parts': [{'kind': 'text', 'text': f'turn {turn}'}],
+                    },
+                )
+                # Wait for the reply the same way the UI does
+                deadline = time.perf_counter() + self.workload.reply_timeout
+                while True:
+                    await asyncio.sleep(self.workload.poll_interval)
+                    pending = (await self.call('message/pending')).get('result')
+                    if not pending or messageid not in {p[0] for p in pending}:
+                        break
+                    if time.perf_counter() > deadline:
+                        self.errors['reply_timeout'] += 1
+                        break
+                await self.call('message/list', conversationid)
+
+    async def poll(self):
+        while not self._done.is_set():
+            conversationid = self.random.choice(self.conversation_ids)
+            await self.call('message/list', conversationid)
+            await self.call('message/pending')
+            await self.call('events/get')
+            await self.call('task/list')
+            await self.call('conversation/list')
+            await asyncio.sleep(self.workload.poll_interval)
+
+    async def sample_rss(self, started: float):
+        while not self._done.is_set():
+            self.rss.append(
+                (round(time.perf_counter() - started, 3), round(current_rss_mb(), 2))
+            )
+            await asyncio.sleep(0.5)
+        self.rss.append(
+            (round(time.perf_counter() - started, 3), round(current_rss_mb(), 2))
+        )
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for method, values in sorted(self.latencies.items()):
+            endpoints[method] = summarize(values, elapsed, self.errors[method])
+        all_values = [v for values in self.latencies.values() for v in values]
+        return {
+            'workload': asdict(self.workload),
+            'elapsed_seconds': round(elapsed, 3),
+            'total': summarize(all_values, elapsed, sum(self.errors.values())),
+            'endpoints': endpoints,
+            'rss_mb': {
+                'samples': self.rss,
+                'peak': max((r for _, r in self.rss), default=0.0),
+            },
+            'python': sys.version.split()[0],
+            'timestamp': time.time(),
+        }
+
+
+def summarize(values: list[float], elapsed: float, errors: int) -> dict:
+    return {
+        'count': len(values),
+        'errors': errors,
+        'throughput_rps': round(len(values) / elapsed, 2) if elapsed else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(max(values, default=0.0), 3),
+    }
+
+
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    """Return the metrics that regressed more than `tolerance` (a fraction)."""
+    regressions = []
+    sections = {'total': (result['total'], baseline.get('total', {}))}
+    for method, stats in result['endpoints'].items():
+        sections[method] = (stats, baseline.get('endpoints', {}).get(method, {}))
+    for name, (current, previous) in sections.items():
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            regressed = change < -tolerance if higher_is_better else change > tolerance
+            marker = 'REGRESSION' if regressed else 'ok'
+            print(f'  {name:<20} {metric:<15} {old:>10} -> {new:>10} ({change:+.1%}) {marker}')
+            if regressed:
+                regressions.append(f'{name}.{metric}')
+    old_peak = baseline.get('rss_mb', {}).get('peak')
+    new_peak = result['rss_mb']['peak']
+    if old_peak:
+        change = (new_peak - old_peak) / old_peak
+        print(f'  {"rss":<20} {"peak_mb":<15} {old_peak:>10} -> {new_peak:>10} ({change:+.1%})')
+        if change > tolerance:
+            regressions.append('rss_mb.peak')
+    return regressions
+
+
+async def run_benchmark(workload: Workload) -> dict:
+    app = FastAPI()
+    manager = InMemoryFakeAgentManager(
+        SimulationConfig(
+            latency_seconds=workload.agent_latency,
+            task_probability=workload.task_probability,
+            task_step_seconds=workload.agent_latency / 2,
+            seed=workload.seed,
+        )
+    )
+    async with httpx.AsyncClient() as http_client:
+        ConversationServer(app, http_client, manager=manager)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://benchmark', timeout=60
+        ) as client:
+            return await LoadRunner(client, workload).run()
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    defaults = Workload()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(
+            '--' + name.replace('_', '-'), type=type(value), default=value
+        )
+    parser.add_argument('--output', help='Where to write the JSON result')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against')
+    parser.add_argument('--save-baseline', help='Also write the result here')
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        default=0.10,
+        help='Allowed relative regression before failing (default 0.10)',
+    )
+    args = parser.parse_args(argv)
+    workload = Workload(
+        **{name: getattr(args, name) for name in asdict(defaults)}
+    )
+
+    result = asyncio.run(run_benchmark(workload))
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'load_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    for path in filter(None, [output, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    total = result['total']
+    print(f'Resultado salvo em {output}')
+    print(
+        f'{total["count"]} requisições em {result["elapsed_seconds"]}s, '
+        f'{total["throughput_rps"]} req/s, p50={total["p50_ms"]}ms '
+        f'p95={total["p95_ms"]}ms p99={total["p99_ms"]}ms, '
+        f'RSS pico={result["rss_mb"]["peak"]}MB'
+    )
+    for method, stats in result['endpoints'].items():
+        print(
+            f'  {method:<20} n={stats["count"]:<7} {stats["throughput_rps"]:>9} req/s '
+            f'p50={stats["p50_ms"]}ms p95={stats["p95_ms"]}ms p99={stats["p99_ms"]}ms '
+            f'erros={stats["errors"]}'
+        )
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f'Comparando com {args.baseline}:')
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print('Regressões: ' + ', '.join(regressions))
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+"""Throughput of the multi-worker mode (A2A_WORKERS) against one process.
+
+For each worker count, starts `main.py` with the offline FakeLlm backend on a
+free port, waits until it answers, then drives --conversations conversations
+with --turns sends each through the public port (a send returns at once;
+the turn is done when its message leaves message/pending). Reports completed
+turns per second for each count. Scaling needs as many free cores as
+workers: on a single core the extra workers only add forwarding.
+
+run:
+  python -m benchmarks.multiworker --workers 1 2 4
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.load_server import RESULTS_DIR
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+async def call(client: httpx.AsyncClient, method: str, params=None) -> dict:
+    response = await client.post(
+        '/' + method,
+        json={'jsonrpc': '2.0', 'id': uuid.uuid4().hex, 'params': params},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def wait_ready(client: httpx.AsyncClient, timeout: float):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            await call(client, 'conversation/list')
+            return
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.5)
+
+
+async def converse(client: httpx.AsyncClient, turns: int):
+    result = await call(client, 'conversation/create')
+    conversationid = result['result']['conversationid']
+    for turn in range(turns):
+        messageid = str(uuid.uuid4())
+        await call(
+            client,
+            'message/send',
+            {
+                'messageId': messageid,
+                'contextId': conversationid,
+                'role': 'user',
+                'parts': [{'kind': 'text', 'text': f'turno {turn}'}],
+            },
+        )
+        while True:
+            await asyncio.sleep(0.05)
+            pending = (await call(client, 'message/pending'))['result'] or []
+            if messageid not in {p[0] for p in pending}:
+                break
+
+
+async def drive(base_url: str, args) -> dict:
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        await wait_ready(client, args.startup_timeout)
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with semaphore:
+                await converse(client, args.turns)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(args.conversations)))
+        elapsed = time.perf_counter() - started
+    turns = args.conversations * args.turns
+    return {
+        'turns': turns,
+        'seconds': round(elapsed, 2),
+        'turns_per_second': round(turns / elapsed, 1),
+    }
+
+
+def run_one(workers: int, args, script: str) -> dict:
+    port = free_port()
+    env = {
+        **os.environ,
+        'A2A_WORKERS': str(workers),
+        'A2A_UI_HOST': '127.0.0.1',
+        'A2A_UI_PORT': str(port),
+        'A2A_WORKER_BASE_PORT': str(free_port()),
+        'A2A_SHARED_STORE': os.path.join(tempfile.mkdtemp(), 'shared.db'),
+        'A2A_MODEL_BACKEND': 'fake',
+        'A2A_FAKE_LLM_SCRIPT': script,
+    }
+    env.pop('GOOGLE_API_KEY', None)
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(ROOT, 'main.py')],
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        result = asyncio.run(drive(f'http://127.0.0.1:{port}', args))
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+    return {'workers': workers, **result}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--conversations', type=int, default=200)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--concurrency', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--startup-timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='Where to write the JSON result')
+    args = parser.parse_args(argv)
+
+    with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as f:
+        json.dump(
+            {
+                'latency_ms': args.latency_ms,
+                'turns': [{'text': 'Você disse: {user_text}'}],
+            },
+            f,
+        )
+        script = f.name
+    results = [run_one(n, args, script) for n in args.workers]
+    os.remove(script)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'multiworker_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(
+            {
+                'args': vars(args),
+                'cpus': os.cpu_count(),
+                'results': results,
+                'timestamp': time.time(),
+            },
+            f,
+            indent=2,
+        )
+    print(f'Resultado salvo em {output}')
+    for r in results:
+        print(f'{r["workers"]} worker(s): {r["turns_per_second"]} turnos/s')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
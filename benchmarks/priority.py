@@ -0,0 +1,157 @@
+"""Chat latency under a batch backfill.
+
+Runs the ConversationServer in-process with the InMemoryFakeAgentManager
+simulation and `max_concurrent_runs` run slots. A backfill sends
+`--batch` messages at once while `--chats` conversations keep chatting
+(one turn after the other). Reported: reply latency of the chat turns
+(send until the message leaves message/pending), the backfill duration and
+the slot wait per class from the server metrics.
+
+The same workload runs twice: the backfill sent as `interactive` (what
+every message was before priority classes) and as `batch`.
+
+run:
+  python -m benchmarks.priority
+  python -m benchmarks.priority --slots 4 --batch 400 --chats 10
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+from dataclasses import asdict, dataclass
+
+import httpx
+
+from fastapi import FastAPI
+
+from benchmarks.load_server import percentile
+from service.server.in_memory_manager import (
+    InMemoryFakeAgentManager,
+    SimulationConfig,
+)
+from service.server.metrics import metrics
+from service.server.server import ConversationServer
+
+
+@dataclass
+class Workload:
+    slots: int = 4
+    batch: int = 200
+    chats: int = 8
+    turns: int = 5
+    agent_latency: float = 0.05
+    poll_interval: float = 0.01
+    seed: int = 1234
+
+
+async def send(client, conversationid: str, priority: str) -> str:
+    messageid = str(uuid.uuid4())
+    response = await client.post(
+        '/message/send',
+        json={
+            'jsonrpc': '2.0',
+            'id': messageid,
+            'params': {
+                'messageId': messageid,
+                'contextId': conversationid,
+                'role': 'user',
+                'parts': [{'kind': 'text', 'text': 'oi'}],
+                'metadata': {'priority': priority},
+            },
+        },
+    )
+    response.raise_for_status()
+    return messageid
+
+
+async def pending(client) -> set[str]:
+    response = await client.post(
+        '/message/pending', json={'jsonrpc': '2.0', 'id': 1}
+    )
+    return {p[0] for p in response.json()['result']}
+
+
+async def wait_for(client, messageids: set[str], interval: float):
+    while messageids & await pending(client):
+        await asyncio.sleep(interval)
+
+
+async def run_once(workload: Workload, batch_priority: str) -> dict:
+    metrics.reset()
+    app = FastAPI()
+    manager = InMemoryFakeAgentManager(
+        SimulationConfig(
+            latency_seconds=workload.agent_latency,
+            task_probability=0,
+            seed=workload.seed,
+        )
+    )
+    async with httpx.AsyncClient() as http_client:
+        server = ConversationServer(app, http_client, manager=manager)
+        server.admission.configure({'max_concurrent_runs': workload.slots})
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url='http://benchmark',
+            timeout=120,
+        ) as client:
+
+            async def create() -> str:
+                response = await client.post(
+                    '/conversation/create', json={'jsonrpc': '2.0', 'id': 1}
+                )
+                return response.json()['result']['conversationid']
+
+            backfill = await create()
+            chats = [await create() for _ in range(workload.chats)]
+            latencies: list[float] = []
+
+            async def chat(conversationid: str):
+                for _ in range(workload.turns):
+                    start = time.perf_counter()
+                    messageid = await send(client, conversationid, 'interactive')
+                    await wait_for(client, {messageid}, workload.poll_interval)
+                    latencies.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            batch = {
+                await send(client, backfill, batch_priority)
+                for _ in range(workload.batch)
+            }
+            await asyncio.gather(*(chat(c) for c in chats))
+            await wait_for(client, batch, workload.poll_interval)
+            elapsed = time.perf_counter() - start
+    timings = metrics.snapshot()['timings']
+    return {
+        'batch_priority': batch_priority,
+        'chat_p50_ms': round(percentile(latencies, 50), 1),
+        'chat_p95_ms': round(percentile(latencies, 95), 1),
+        'chat_max_ms': round(max(latencies, default=0.0), 1),
+        'backfill_seconds': round(elapsed, 2),
+        'slot_wait_seconds': {
+            name.rsplit('.', 1)[-1]: value
+            for name, value in timings.items()
+            if name.startswith('admission.slot_wait_seconds.')
+        },
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    defaults = Workload()
+    for name, value in asdict(defaults).items():
+        parser.add_argument(
+            '--' + name.replace('_', '-'), type=type(value), default=value
+        )
+    args = parser.parse_args(argv)
+    workload = Workload(**{name: getattr(args, name) for name in asdict(defaults)})
+    for priority in ('interactive', 'batch'):
+        result = asyncio.run(run_once(workload, priority))
+        print(json.dumps(result))
+    return 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
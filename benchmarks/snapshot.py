@@ -0,0 +1,153 @@
+"""Snapshot write/restore benchmark for ADKHostManager.
+
+Fills a manager (offline FakeLlm backend) with synthetic conversations
+through `import_conversation`, writes a snapshot and restores it into a new
+manager. Reports the write time, the file size, the time until the restored
+manager can serve conversation/list (the lazy restore), and the time to load
+every conversation back (what the first access to all of them costs).
+
+run:
+  python -m benchmarks.snapshot --messages 100000
+  python -m benchmarks.snapshot --messages 100000 --per-conversation 20
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import uuid
+
+import httpx
+
+from benchmarks.load_server import RESULTS_DIR, current_rss_mb
+from service.server.adk_host_manager import ADKHostManager
+from service.server.bundle import BUNDLE_VERSION
+from utils.fake_llm import FakeLlm
+
+
+def synthetic_bundle(per_conversation: int, payload: str) -> dict:
+    conversationid = str(uuid.uuid4())
+    now = time.time()
+    messages = [
+        {
+            'messageId': str(uuid.uuid4()),
+            'contextId': conversationid,
+            'taskId': None,
+            'role': 'user' if i % 2 == 0 else 'agent',
+            'parts': [{'kind': 'text', 'text': f'{i} {payload}'}],
+            'metadata': None,
+            'version': 1,
+        }
+        for i in range(per_conversation)
+    ]
+    return {
+        'version': BUNDLE_VERSION,
+        'conversation': {
+            'conversationid': conversationid,
+            'isactive': True,
+            'name': '',
+            'task_ids': [],
+            'messageIds': [m['messageId'] for m in messages],
+        },
+        'messages': messages,
+        'events': [
+            {
+                'id': str(uuid.uuid4()),
+                'actor': 'user' if i % 2 == 0 else 'host_agent',
+                'messageId': m['messageId'],
+                'timestamp': now + i,
+            }
+            for i, m in enumerate(messages)
+        ],
+        'session': {
+            'id': conversationid,
+            'app_name': 'A2A',
+            'user_id': 'test_user',
+            'state': {},
+            'events': [],
+            'last_update_time': now,
+        },
+        'artifacts': {},
+        'last_active': now,
+    }
+
+
+def run(args) -> dict:
+    http_client = httpx.AsyncClient()
+    manager = ADKHostManager(http_client, model_backend=FakeLlm())
+    payload = 'x' * args.payload_bytes
+    conversations = max(1, args.messages // args.per_conversation)
+    for _ in range(conversations):
+        manager.import_conversation(
+            synthetic_bundle(args.per_conversation, payload)
+        )
+    rss_filled = current_rss_mb()
+
+    path = args.path or os.path.join(tempfile.mkdtemp(), 'a2a.snap')
+    start = time.perf_counter()
+    manager.write_snapshot(path)
+    write_seconds = time.perf_counter() - start
+    size = os.path.getsize(path)
+    del manager
+
+    restored = ADKHostManager(http_client, model_backend=FakeLlm())
+    start = time.perf_counter()
+    counts = restored.restore_snapshot(path)
+    listed = len(restored.conversations)
+    restore_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for conversation in list(restored.conversations):
+        restored.get_conversation(conversation.conversationId)
+    rehydrate_seconds = time.perf_counter() - start
+    messages = len(restored.messages)
+    if not args.path:
+        os.remove(path)
+
+    return {
+        'args': vars(args),
+        'conversations': conversations,
+        'messages': messages,
+        'restored': counts,
+        'listed_after_restore': listed,
+        'snapshot_bytes': size,
+        'write_seconds': round(write_seconds, 3),
+        'restore_seconds': round(restore_seconds, 3),
+        'rehydrate_all_seconds': round(rehydrate_seconds, 3),
+        'rss_mb_filled': round(rss_filled, 1),
+        'rss_mb_end': round(current_rss_mb(), 1),
+        'python': sys.version.split()[0],
+        'timestamp': time.time(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--messages', type=int, default=100_000)
+    parser.add_argument('--per-conversation', type=int, default=50)
+    parser.add_argument('--payload-bytes', type=int, default=200)
+    parser.add_argument('--path', help='Keep the snapshot at this path')
+    parser.add_argument('--output', help='Where to write the JSON result')
+    args = parser.parse_args(argv)
+
+    result = run(args)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'snapshot_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'Resultado salvo em {output}')
+    print(
+        f'{result["messages"]} mensagens em {result["conversations"]} conversas: '
+        f'snapshot {result["snapshot_bytes"] / 1e6:.1f}MB em '
+        f'{result["write_seconds"]}s; restore {result["restore_seconds"]}s; '
+        f'todas carregadas em {result["rehydrate_all_seconds"]}s'
+    )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
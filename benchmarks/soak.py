@@ -0,0 +1,194 @@
+"""Soak test for the retention sweeper.
+
+Runs the ConversationServer in-process with the real ADKHostManager on the
+offline FakeLlm backend and keeps traffic flowing for a while: conversations
+are created continuously, get a few turns and then go idle, while the UI-like
+poll endpoints are hit in between. The Sweeper runs with a short policy.
+
+Every second it samples RSS and the size of the manager's structures. The
+run passes when RSS grows by less than --max-growth-mb over the second half
+of the run (the first half is warm-up: imports, arenas, caches filling up).
+Use --no-retention to see the same workload without the sweeper.
+
+run:
+  python -m benchmarks.soak --duration 120
+  python -m benchmarks.soak --duration 120 --no-retention
+  python -m benchmarks.soak --duration 120 --evict-idle 1 --ttl 30
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import sys
+import time
+import uuid
+
+from dataclasses import asdict
+
+import httpx
+
+from fastapi import FastAPI
+
+from benchmarks.load_server import RESULTS_DIR, current_rss_mb
+from service.server.adk_host_manager import ADKHostManager
+from service.server.retention import RetentionPolicy, Sweeper
+from service.server.server import ConversationServer
+from utils.fake_llm import FakeLlm
+
+
+async def call(client: httpx.AsyncClient, method: str, params=None) -> dict:
+    response = await client.post(
+        '/' + method,
+        json={'jsonrpc': '2.0', 'id': uuid.uuid4().hex, 'params': params},
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+async def converse(client: httpx.AsyncClient, turns: int, payload: str):
+    result = await call(client, 'conversation/create')
+    conversationid = result['result']['conversationid']
+    for turn in range(turns):
+        messageid = str(uuid.uuid4())
+        await call(
+            client,
+            'message/send',
+            {
+                'messageId': messageid,
+                'contextId': conversationid,
+                'role': 'user',
+                'parts': [{'kind': 'text', 'text': f'{turn} {payload}'}],
+            },
+        )
+        while True:
+            await asyncio.sleep(0.02)
+            pending = (await call(client, 'message/pending'))['result'] or []
+            if messageid not in {p[0] for p in pending}:
+                break
+        await call(client, 'message/list', conversationid)
+    await call(client, 'events/get')
+    await call(client, 'task/list')
+
+
+def sizes(server: ConversationServer) -> dict[str, int]:
+    manager = server.manager
+    return {
+        'conversations': len(manager.conversations),
+        'messages': len(manager.messages),
+        'events': len(manager.events),
+        'tasks': len(manager.tasks),
+        'sessions': sum(
+            len(sessions)
+            for users in manager._session_service.sessions.values()
+            for sessions in users.values()
+        ),
+    }
+
+
+async def run(args) -> dict:
+    policy = RetentionPolicy(
+        sweep_interval_seconds=args.sweep_interval,
+        task_ttl_seconds=args.ttl,
+        events_per_conversation=args.events_per_conversation,
+        artifact_chunk_ttl_seconds=args.ttl,
+        conversation_ttl_seconds=args.ttl,
+        evict_idle_seconds=args.evict_idle,
+    )
+    app = FastAPI()
+    samples = []
+    async with httpx.AsyncClient() as http_client:
+        manager = ADKHostManager(http_client, model_backend=FakeLlm())
+        server = ConversationServer(app, http_client, manager=manager)
+        sweeper = Sweeper(server.prune, policy)
+        if not args.no_retention:
+            sweeper.start()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://soak', timeout=60
+        ) as client:
+            started = time.perf_counter()
+            deadline = started + args.duration
+            conversations = 0
+            running: set[asyncio.Task] = set()
+            next_sample = started
+            while time.perf_counter() < deadline:
+                while len(running) < args.active:
+                    task = asyncio.create_task(
+                        converse(client, args.turns, 'x' * args.payload_bytes)
+                    )
+                    running.add(task)
+                    task.add_done_callback(running.discard)
+                    conversations += 1
+                if time.perf_counter() >= next_sample:
+                    gc.collect()
+                    samples.append(
+                        {
+                            'seconds': round(time.perf_counter() - started, 1),
+                            'rss_mb': round(current_rss_mb(), 2),
+                            **sizes(server),
+                        }
+                    )
+                    print(samples[-1], file=sys.stderr)
+                    next_sample += 1.0
+                await asyncio.sleep(0.05)
+            await asyncio.gather(*running)
+            await sweeper.stop()
+
+    half = samples[len(samples) // 2]['rss_mb'] if samples else 0.0
+    end = samples[-1]['rss_mb'] if samples else 0.0
+    growth = round(end - half, 2)
+    return {
+        'args': vars(args),
+        'policy': asdict(policy),
+        'conversations': conversations,
+        'samples': samples,
+        'rss_mb_at_half': half,
+        'rss_mb_at_end': end,
+        'second_half_growth_mb': growth,
+        'bounded': growth < args.max_growth_mb,
+        'python': sys.version.split()[0],
+        'timestamp': time.time(),
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--duration', type=float, default=60.0)
+    parser.add_argument('--active', type=int, default=10)
+    parser.add_argument('--turns', type=int, default=3)
+    parser.add_argument('--payload-bytes', type=int, default=2048)
+    parser.add_argument('--sweep-interval', type=float, default=1.0)
+    parser.add_argument('--ttl', type=float, default=2.0)
+    parser.add_argument('--events-per-conversation', type=int, default=50)
+    parser.add_argument(
+        '--evict-idle',
+        type=float,
+        default=0.0,
+        help='Evict conversations to disk after this idle time (use with a '
+        'larger --ttl)',
+    )
+    parser.add_argument('--max-growth-mb', type=float, default=10.0)
+    parser.add_argument('--no-retention', action='store_true')
+    parser.add_argument('--output', help='Where to write the JSON result')
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run(args))
+    output = args.output or os.path.join(
+        RESULTS_DIR, f'soak_{time.strftime("%Y%m%d_%H%M%S")}.json'
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+    print(f'Resultado salvo em {output}')
+    print(
+        f'{result["conversations"]} conversas; RSS {result["rss_mb_at_half"]}MB '
+        f'(metade) -> {result["rss_mb_at_end"]}MB (fim), '
+        f'crescimento {result["second_half_growth_mb"]}MB'
+    )
+    return 0 if result['bounded'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,8 +3,10 @@ import asyncio
 
 import mesop as me
 
-from a2a.types import Message, Part, Role, TextPart
+from a2a.types import Part, Role, TextPart
+from service.types import Message
 from state.host_agent_service import (
+    CancelMessage,
     ListConversations,
     SendMessage,
     ListMessages,
@@ -91,6 +93,24 @@ async def send_message_button(e: me.ClickEvent):  # pylint: disable=unused-argum
     yield
 
 
+def pending_message_ids() -> list[str]:
+    """Mensagens desta conversa que ainda estão sendo processadas."""
+    app_state = me.state(AppState)
+    ids = {m.messageId for m in app_state.messages}
+    return [m for m in app_state.background_tasks if m in ids]
+
+
+async def stop_button(e: me.ClickEvent):  # pylint: disable=unused-argument
+    """Cancela as mensagens pendentes da conversa"""
+    state = me.state(PageState)
+    app_state = me.state(AppState)
+    for messageid in pending_message_ids():
+        await CancelMessage(messageid, state.conversationid)
+        app_state.background_tasks.pop(messageid, None)
+    await refresh_messages()
+    yield
+
+
 async def refresh_messages():
     """Refresh messages from server"""
     page_state = me.state(PageState)
@@ -103,15 +123,11 @@ async def refresh_messages():
         # Buscar mensagens do servidor
         messages = await ListMessages(page_state.conversationid)
         
-        # Converter mensagens para o formato do estado
-        state_messages = []
-        for msg in messages:
-            state_msg = convert_message_to_state(msg)
-            state_messages.append(state_msg)
-        
-        # Atualizar o estado apenas se houver novas mensagens
-        if len(state_messages) > len(app_state.messages):
-            app_state.messages = state_messages
+        # Só converte quando alguma mensagem nova ou alterada chegou;
+        # as inalteradas vêm do cache de convert_message_to_state
+        keys = [(m.messageId, m.version) for m in messages]
+        if keys != [(m.messageId, m.version) for m in app_state.messages]:
+            app_state.messages = [convert_message_to_state(m) for m in messages]
             
     except Exception as e:
         print(f"Erro ao atualizar mensagens: {e}")
@@ -190,3 +206,15 @@ def conversation():
                 ),
             ):
                 me.icon(icon='send', style=me.Style(color='white'))
+            if pending_message_ids():
+                with me.content_button(
+                    type='flat',
+                    on_click=stop_button,
+                    style=me.Style(
+                        background='#5f6368',
+                        color='white',
+                        border_radius=20,
+                        padding=me.Padding.all(8),
+                    ),
+                ):
+                    me.icon(icon='stop', style=me.Style(color='white'))
@@ -5,7 +5,7 @@ run:
 
 import os
 
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, nullcontext
 
 import httpx
 import mesop as me
@@ -21,7 +21,13 @@ from pages.event_list import event_list_page
 from pages.home import home_page_content
 from pages.settings import settings_page_content
 from pages.task_list import task_list_page
+from service.server.cluster import ClusterConfig
+from service.server.deadlines import http_client
+from service.server.retention import Sweeper
+from service.server.router import ShardRouter, shards_from_env
 from service.server.server import ConversationServer
+from service.server.snapshot import Snapshotter
+from service.server.warmup import WarmupPolicy, warm_up
 from state import host_agent_service
 from state.state import AppState
 
@@ -157,7 +163,8 @@ class HTTPXClientWrapper:
 
     def start(self):
         """Instantiate the client. Call from the FastAPI startup hook."""
-        self.async_client = httpx.AsyncClient(timeout=30)
+        # Timeout from A2A_DEADLINE_REMOTE_CALL_SECONDS (30s by default)
+        self.async_client = http_client()
 
     async def stop(self):
         """Gracefully shutdown. Call from FastAPI shutdown hook."""
@@ -176,27 +183,203 @@ httpx_client_wrapper = HTTPXClientWrapper()
 agent_server = None
 
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    httpx_client_wrapper.start()
-    ConversationServer(app, httpx_client_wrapper())
-    app.openapi_schema = None
-    app.mount(
-        '/',
-        WSGIMiddleware(
-            me.create_wsgi_app(
-                debug_mode=os.environ.get('DEBUG_MODE', '') == 'true'
-            )
+def drain_timeout_seconds() -> float:
+    return float(os.environ.get('A2A_DRAIN_TIMEOUT_SECONDS', '30'))
+
+
+def uvicorn_config(app: FastAPI, **kwargs):
+    import uvicorn
+
+    return uvicorn.Config(
+        app,
+        # Open connections (Mesop streams) after the drain
+        timeout_graceful_shutdown=int(
+            os.environ.get('A2A_DRAIN_GRACE_SECONDS', '5')
         ),
+        **kwargs,
     )
-    app.setup()
+
+
+def serve(config, sockets=None):
+    """Run uvicorn. The first SIGTERM/SIGINT drains the conversation
+    server while it still answers (new sends get a 503, see
+    ConversationServer.drain) and then stops uvicorn; a second one stops it
+    at once."""
+    import asyncio
+
+    import uvicorn
+
+    server = uvicorn.Server(config)
+    exit_now = server.handle_exit
+    draining = set()
+
+    async def drain_then_exit(sig, frame):
+        await agent_server.drain(drain_timeout_seconds())
+        exit_now(sig, frame)
+
+    def handle_exit(sig, frame):
+        if agent_server is None or draining:
+            exit_now(sig, frame)
+            return
+        # Signal handlers run on the main thread, where the loop is
+        loop = asyncio.get_event_loop()
+        draining.add(loop.create_task(drain_then_exit(sig, frame)))
+
+    server.handle_exit = handle_exit
+    server.run(sockets=sockets)
+
+
+@asynccontextmanager
+async def backend(app: FastAPI):
+    """The conversation API with its manager, warm-up, sweeper and
+    snapshots."""
+    global agent_server
+    server = agent_server = ConversationServer(app, httpx_client_wrapper())
+    snapshotter = Snapshotter.from_env(server.manager.save_snapshot)
+    if snapshotter and os.path.exists(snapshotter.path):
+        try:
+            restored = server.manager.restore_snapshot(snapshotter.path)
+            print(f'[SNAPSHOT] restaurado de {snapshotter.path}: {restored}')
+        except (OSError, ValueError) as e:
+            print(f'[SNAPSHOT] ignorando {snapshotter.path}: {e!r}')
+    server.health.start()
+    # Before the first request: the lifespan only yields once it is done
+    await warm_up(server, WarmupPolicy.from_env())
+    sweeper = Sweeper(server.prune)
+    sweeper.start()
+    if snapshotter:
+        snapshotter.start()
     yield
+    # Already done when the exit signal went through serve(); this covers
+    # the other ways uvicorn stops
+    await server.drain(drain_timeout_seconds())
+    agent_server = None
+    await server.health.stop()
+    await sweeper.stop()
+    if snapshotter:
+        # Also writes the final snapshot
+        await snapshotter.stop()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    httpx_client_wrapper.start()
+    shards = shards_from_env()
+    # With shards the managers run in the shard processes (spawn_shards)
+    async with nullcontext() if shards else backend(app):
+        router = ShardRouter(app, httpx_client_wrapper(), shards) if shards else None
+        if router:
+            router.health.start()
+        app.openapi_schema = None
+        app.mount(
+            '/',
+            WSGIMiddleware(
+                me.create_wsgi_app(
+                    debug_mode=os.environ.get('DEBUG_MODE', '') == 'true'
+                )
+            ),
+        )
+        app.setup()
+        yield
+        if router:
+            await router.health.stop()
     await httpx_client_wrapper.stop()
 
 
+@asynccontextmanager
+async def shard_lifespan(app: FastAPI):
+    """A shard only serves the conversation API, to the router."""
+    httpx_client_wrapper.start()
+    async with backend(app):
+        yield
+    await httpx_client_wrapper.stop()
+
+
+def serve_worker(app: FastAPI, config: ClusterConfig, host: str, port: int):
+    """Run one worker of the multi-worker mode on the public port (shared
+    with the other workers) and on its private port."""
+    import socket
+
+    public = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    public.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    public.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    public.bind((host, port))
+    private_url = httpx.URL(config.workers[config.worker_id])
+    private = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    private.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    private.bind((private_url.host, private_url.port))
+    print(f'👷 Worker {config.worker_id} em http://{host}:{port} e {private_url}')
+    serve(uvicorn_config(app), sockets=[public, private])
+
+
+def spawn_workers(count: int, host: str, port: int) -> int:
+    """Start `count` copies of this program as workers and wait for them."""
+    import signal
+    import subprocess
+    import sys
+    import tempfile
+
+    base_port = int(os.environ.get('A2A_WORKER_BASE_PORT', str(port + 1000)))
+    workers = {
+        f'w{i}': f'http://127.0.0.1:{base_port + i}' for i in range(count)
+    }
+    store_path = os.environ.get('A2A_SHARED_STORE') or os.path.join(
+        tempfile.gettempdir(), 'a2a-shared.db'
+    )
+    snapshot_path = os.environ.get('A2A_SNAPSHOT_PATH', '')
+    if not snapshot_path:
+        # Nothing survives a restart without snapshots: start clean
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(store_path + suffix):
+                os.remove(store_path + suffix)
+    processes = []
+    for worker_id in workers:
+        env = {
+            **os.environ,
+            **ClusterConfig(worker_id, workers, store_path).to_env(),
+            'A2A_UI_PORT': str(port),
+        }
+        if snapshot_path:
+            env['A2A_SNAPSHOT_PATH'] = f'{snapshot_path}.{worker_id}'
+        processes.append(subprocess.Popen([sys.executable, __file__], env=env))
+
+    def stop(signum, frame):  # pylint: disable=unused-argument
+        for process in processes:
+            process.send_signal(signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    return max(process.wait() for process in processes)
+
+
+def spawn_shards(count: int, port: int) -> list:
+    """Start `count` shard processes on private ports; returns them and
+    points the router at them through A2A_SHARD_URLS."""
+    import subprocess
+    import sys
+
+    base_port = int(os.environ.get('A2A_SHARD_BASE_PORT', str(port + 2000)))
+    snapshot_path = os.environ.get('A2A_SNAPSHOT_PATH', '')
+    shards = {f's{i}': f'http://127.0.0.1:{base_port + i}' for i in range(count)}
+    processes = []
+    for i, shard_id in enumerate(shards):
+        env = {**os.environ, 'A2A_SHARD_PORT': str(base_port + i)}
+        if snapshot_path:
+            env['A2A_SNAPSHOT_PATH'] = f'{snapshot_path}.{shard_id}'
+        processes.append(subprocess.Popen([sys.executable, __file__], env=env))
+    os.environ['A2A_SHARD_URLS'] = ','.join(f'{k}={v}' for k, v in shards.items())
+    return processes
+
+
 if __name__ == '__main__':
-    import uvicorn
     import socket
+    import sys
+
+    if '--profile-startup' in sys.argv:
+        from utils.startup_profile import profile_startup
+
+        print(profile_startup(os.path.dirname(os.path.abspath(__file__))))
+        raise SystemExit(0)
 
     app = FastAPI(lifespan=lifespan)
 
@@ -204,6 +387,24 @@ if __name__ == '__main__':
     host = os.environ.get('A2A_UI_HOST', '0.0.0.0')
     preferred_port = int(os.environ.get('A2A_UI_PORT', '8888'))
     mesop_default_port = int(os.environ.get('MESOP_DEFAULT_PORT', '8888'))
+    cluster_config = ClusterConfig.from_env()
+
+    if os.environ.get('A2A_SHARD_PORT'):
+        # Started by spawn_shards
+        serve(
+            uvicorn_config(
+                FastAPI(lifespan=shard_lifespan),
+                host='127.0.0.1',
+                port=int(os.environ['A2A_SHARD_PORT']),
+            )
+        )
+        raise SystemExit(0)
+
+    if cluster_config:
+        # Started by spawn_workers: the public port is shared on purpose
+        host_agent_service.server_url = f'http://{host}:{preferred_port}'
+        serve_worker(app, cluster_config, host, preferred_port)
+        raise SystemExit(0)
     
     # Função para verificar se uma porta está disponível
     def is_port_available(port_to_check):
@@ -224,11 +425,24 @@ if __name__ == '__main__':
     
     # Set the client to talk to the server
     host_agent_service.server_url = f'http://{host}:{port}'
+
+    shard_processes = []
+    shard_count = int(os.environ.get('A2A_SHARDS', '0'))
+    if shard_count > 0:
+        print(f"🧩 Iniciando {shard_count} shards atrás do roteador")
+        shard_processes = spawn_shards(shard_count, port)
+
+    workers = int(os.environ.get('A2A_WORKERS', '1'))
+    if workers > 1 and not shard_processes:
+        print(f"🚀 Iniciando {workers} workers em http://{host}:{port}")
+        raise SystemExit(spawn_workers(workers, host, port))
+
     print(f"🚀 Iniciando servidor em http://{host}:{port}")
 
-    uvicorn.run(
-        app,
-        host=host,
-        port=port,
-        timeout_graceful_shutdown=0,
-    )
+    try:
+        serve(uvicorn_config(app, host=host, port=port))
+    finally:
+        for process in shard_processes:
+            process.terminate()
+        for process in shard_processes:
+            process.wait()
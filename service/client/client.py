@@ -1,3 +1,4 @@
+import asyncio
 import json
 
 from typing import Any
@@ -7,11 +8,18 @@ import httpx
 from service.types import (
     AgentClientHTTPError,
     AgentClientJSONError,
+    CancelMessageRequest,
+    CancelMessageResponse,
     CreateConversationRequest,
     CreateConversationResponse,
     GetEventRequest,
     GetEventResponse,
+    GetMetricsRequest,
+    GetMetricsResponse,
+    GetTraceRequest,
+    GetTraceResponse,
     JSONRPCRequest,
+    JSONRPCResponse,
     ListAgentRequest,
     ListAgentResponse,
     ListConversationRequest,
@@ -26,13 +34,75 @@ from service.types import (
     RegisterAgentResponse,
     SendMessageRequest,
     SendMessageResponse,
+    patch_a2a_message,
 )
 
 
+# Response type of each method, for the answers of a batch
+RESPONSE_TYPES: dict[str, type[JSONRPCResponse]] = {
+    'message/send': SendMessageResponse,
+    'message/cancel': CancelMessageResponse,
+    'conversation/create': CreateConversationResponse,
+    'conversation/list': ListConversationResponse,
+    'events/get': GetEventResponse,
+    'message/list': ListMessageResponse,
+    'message/pending': PendingMessageResponse,
+    'task/list': ListTaskResponse,
+    'agent/register': RegisterAgentResponse,
+    'agent/list': ListAgentResponse,
+    'trace/get': GetTraceResponse,
+    'metrics/get': GetMetricsResponse,
+}
+
+
 class ConversationClient:
     def __init__(self, base_url):
+        # ListTaskResponse carries a2a Tasks with our messages
+        patch_a2a_message()
         self.base_url = base_url.rstrip('/')
 
+    async def batch(
+        self, payloads: list[JSONRPCRequest]
+    ) -> list[JSONRPCResponse]:
+        """Send the requests in one round trip (POST /rpc); the server runs
+        them concurrently. The responses come in the order of `payloads`,
+        each of the type the single call would return (an error is set on
+        the response, not raised)."""
+        ids = [payload.id for payload in payloads]
+        if len(set(ids)) != len(ids):
+            raise ValueError('batch requests need distinct ids')
+        async with httpx.AsyncClient() as client:
+            try:
+                response = await client.post(
+                    self.base_url + '/rpc',
+                    json=[
+                        payload.model_dump(mode='json', exclude_none=True)
+                        for payload in payloads
+                    ],
+                )
+                response.raise_for_status()
+                answers = {answer.get('id'): answer for answer in response.json()}
+            except httpx.HTTPStatusError as e:
+                print('http error', e)
+                raise AgentClientHTTPError(
+                    e.response.status_code, str(e)
+                ) from e
+            except json.JSONDecodeError as e:
+                print('decode error', e)
+                raise AgentClientJSONError(str(e)) from e
+        return [
+            RESPONSE_TYPES.get(payload.method, JSONRPCResponse)(
+                **answers.get(
+                    payload.id,
+                    {
+                        'id': payload.id,
+                        'error': {'code': -32603, 'message': 'no answer'},
+                    },
+                )
+            )
+            for payload in payloads
+        ]
+
     async def send_message(
         self, payload: SendMessageRequest
     ) -> SendMessageResponse:
@@ -56,6 +126,11 @@ class ConversationClient:
                 print('decode error', e)
                 raise AgentClientJSONError(str(e)) from e
 
+    async def cancel_message(
+        self, payload: CancelMessageRequest
+    ) -> CancelMessageResponse:
+        return CancelMessageResponse(**await self._send_request(payload))
+
     async def create_conversation(
         self, payload: CreateConversationRequest
     ) -> CreateConversationResponse:
@@ -89,3 +164,92 @@ class ConversationClient:
 
     async def list_agents(self, payload: ListAgentRequest) -> ListAgentResponse:
         return ListAgentResponse(**await self._send_request(payload))
+
+    async def get_trace(self, payload: GetTraceRequest) -> GetTraceResponse:
+        return GetTraceResponse(**await self._send_request(payload))
+
+    async def get_metrics(
+        self, payload: GetMetricsRequest
+    ) -> GetMetricsResponse:
+        return GetMetricsResponse(**await self._send_request(payload))
+
+    async def export_conversations(
+        self,
+        path: str,
+        conversation_ids: list[str] | None = None,
+        since: float | None = None,
+        until: float | None = None,
+    ) -> int:
+        """Write the dump of the selected conversations (gzip JSONL, see
+        service/server/export.py) to `path` as it arrives; returns its size
+        in bytes."""
+        size = 0
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None)) as client:
+            try:
+                async with client.stream(
+                    'POST',
+                    self.base_url + '/conversation/export',
+                    json={
+                        'jsonrpc': '2.0',
+                        'id': 1,
+                        'method': 'conversation/export',
+                        'params': {
+                            'conversationIds': conversation_ids,
+                            'since': since,
+                            'until': until,
+                        },
+                    },
+                ) as response:
+                    response.raise_for_status()
+                    if 'gzip' not in response.headers.get('content-type', ''):
+                        answer = json.loads(await response.aread())
+                        raise AgentClientJSONError(answer['error']['message'])
+                    dump = await asyncio.to_thread(open, path, 'wb')
+                    try:
+                        async for chunk in response.aiter_bytes():
+                            await asyncio.to_thread(dump.write, chunk)
+                            size += len(chunk)
+                    finally:
+                        await asyncio.to_thread(dump.close)
+            except httpx.HTTPStatusError as e:
+                print('http error', e)
+                raise AgentClientHTTPError(
+                    e.response.status_code, str(e)
+                ) from e
+        return size
+
+    async def import_conversations(
+        self, path: str, replace: bool = False
+    ) -> dict[str, int]:
+        """Send the dump at `path`, read in chunks; returns the counts
+        (conversations, skipped, replaced, tasks)."""
+
+        async def chunks():
+            dump = await asyncio.to_thread(open, path, 'rb')
+            try:
+                while chunk := await asyncio.to_thread(dump.read, 1 << 16):
+                    yield chunk
+            finally:
+                await asyncio.to_thread(dump.close)
+
+        async with httpx.AsyncClient(timeout=httpx.Timeout(30.0, read=None)) as client:
+            try:
+                response = await client.post(
+                    self.base_url + '/conversation/import',
+                    content=chunks(),
+                    params={'replace': 'true'} if replace else None,
+                    headers={'content-type': 'application/gzip'},
+                )
+                response.raise_for_status()
+                answer = response.json()
+            except httpx.HTTPStatusError as e:
+                print('http error', e)
+                raise AgentClientHTTPError(
+                    e.response.status_code, str(e)
+                ) from e
+            except json.JSONDecodeError as e:
+                print('decode error', e)
+                raise AgentClientJSONError(str(e)) from e
+        if answer.get('error'):
+            raise AgentClientJSONError(answer['error']['message'])
+        return answer['result']
@@ -1,10 +1,15 @@
 import asyncio
 import base64
+import copy
 import datetime
 import json
 import os
+import tempfile
+import time
 import uuid
 
+from dataclasses import dataclass, field
+
 import httpx
 
 from a2a.types import (
@@ -14,7 +19,6 @@ from a2a.types import (
     FilePart,
     FileWithBytes,
     FileWithUri,
-    Message,
     Part,
     Role,
     Task,
@@ -29,6 +33,8 @@ from google.adk.artifacts import InMemoryArtifactService
 from google.adk.events.event import Event as ADKEvent
 from google.adk.events.event_actions import EventActions as ADKEventActions
 from google.adk.memory.in_memory_memory_service import InMemoryMemoryService
+from google.adk.models.base_llm import BaseLlm
+from google.adk.sessions import Session
 from google.adk.sessions.in_memory_session_service import InMemorySessionService
 from google.genai import types
 from utils.host_agent import HostAgent
@@ -36,7 +42,115 @@ from utils.remote_agent_connection import TaskCallbackArg
 from utils.agent_card import get_agent_card
 
 from service.server.application_manager import ApplicationManager
-from service.types import Conversation, Event
+from service.server.bundle import (
+    BUNDLE_VERSION,
+    decode_conversation,
+    decode_event,
+    decode_message,
+    encode_conversation,
+    encode_event,
+    encode_message,
+    read_bundle,
+    write_bundle,
+)
+from service.server.deadlines import DeadlinePolicy
+from service.server.internal_message import (  # noqa: F401 (get_message_id re-exported)
+    InternalMessage,
+    get_message_id,
+)
+from service.server.message_store import (
+    ConversationIndex,
+    EventRecord,
+    MessageStore,
+    task_context_id,
+)
+from service.server.metrics import metrics
+from service.server.normalize import normalize_message
+from service.server.retention import (
+    FirstSeen,
+    RetentionPolicy,
+    approx_size,
+    idle_conversations,
+    task_finished,
+    trim_events,
+)
+from service.server.snapshot import (
+    FRAME_AGENT,
+    FRAME_CONVERSATION,
+    FRAME_STATE,
+    FRAME_TASK,
+    SnapshotReader,
+    SnapshotWriter,
+    read_frame,
+    read_frame_raw,
+)
+from service.server.tracing import tracer
+from service.types import Conversation, Message, patch_a2a_message
+
+
+@dataclass
+class EvictedConversation:
+    path: str
+    # Without messageIds: enough for conversation/list
+    stub: Conversation
+    # Set when `path` is a snapshot: where the conversation frame starts
+    offset: int | None = None
+
+
+@dataclass
+class SnapshotCapture:
+    """The manager state copied for a snapshot (see write_snapshot)."""
+
+    created_at: float
+    # (conversation id, index entry without its offset, the _bundle_copy of
+    # a resident conversation or the (path, offset) of an evicted one)
+    conversations: list[tuple[str, dict, dict | tuple[str, int | None]]] = field(
+        default_factory=list
+    )
+    # Evicted entries whose stubs move to the new snapshot once it is written
+    evicted: dict[str, EvictedConversation] = field(default_factory=dict)
+    # (task, its history)
+    tasks: list[tuple[Task, list]] = field(default_factory=list)
+    agents: list[AgentCard] = field(default_factory=list)
+    state: dict = field(default_factory=dict)
+
+
+def _snapshot_index(capture: SnapshotCapture) -> dict:
+    return {
+        'created_at': capture.created_at,
+        'conversations': {},
+        'tasks': [],
+        'agents': [],
+        'state': None,
+    }
+
+
+def _encode_bundle(parts: dict) -> dict:
+    """The bundle of a `_bundle_copy`."""
+    session = parts['session']
+    return {
+        **parts,
+        'messages': [encode_message(m) for m in parts['messages']],
+        'events': [encode_event(e) for e in parts['events']],
+        'session': session.model_dump(mode='json') if session else None,
+        'artifacts': _encode_artifacts(parts['artifacts']),
+    }
+
+
+def _encode_state(state: dict) -> dict:
+    return {
+        **state,
+        'events': [encode_event(e) for e in state['events']],
+        'messages': [encode_message(m) for m in state['messages']],
+        'user_artifacts': _encode_artifacts(state['user_artifacts']),
+    }
+
+
+def _encode_artifacts(artifacts: dict[str, list]) -> dict[str, list]:
+    return {
+        path: [p.model_dump(mode='json', exclude_none=True) for p in versions]
+        for path, versions in artifacts.items()
+    }
 
 
 class ADKHostManager(ApplicationManager):
@@ -52,18 +166,32 @@ class ADKHostManager(ApplicationManager):
         http_client: httpx.AsyncClient,
         api_key: str = '',
         uses_vertex_ai: bool = False,
+        model_backend: BaseLlm | None = None,
     ):
+        patch_a2a_message()
         self._conversations: list[Conversation] = []
-        self._messages: list[Message] = []
+        self.messages = MessageStore()
         self._tasks: list[Task] = []
-        self._events: dict[str, Event] = {}
+        self._events: dict[str, EventRecord] = {}
+        # The same events by conversation (publish, export, eviction)
+        self._events_index = ConversationIndex()
+        self._tasks_index = ConversationIndex()
         self._pending_messageIds: list[str] = []
         self._agents: list[AgentCard] = []
         self._artifact_chunks: dict[str, list[Artifact]] = {}
         self._session_service = InMemorySessionService()
         self._artifact_service = InMemoryArtifactService()
         self._memory_service = InMemoryMemoryService()
-        self._host_agent = HostAgent([], http_client, self.task_callback)
+        self.deadlines = DeadlinePolicy.from_env()
+        self._host_agent = HostAgent(
+            [],
+            http_client,
+            self.task_callback,
+            model_backend=model_backend,
+            tool_timeout_seconds=self.deadlines.limit(
+                self.deadlines.tool_call_seconds
+            ),
+        )
         self._context_to_conversation: dict[str, str] = {}
         self.user_id = 'test_user'
         self.app_name = 'A2A'
@@ -90,6 +218,13 @@ class ADKHostManager(ApplicationManager):
         self._next_id: dict[
             str, str
         ] = {}  # dict[str, str]: previous message to next message
+        # Ages of finished tasks and chunk buffers, for prune()
+        self._finished_tasks = FirstSeen()
+        self._chunk_buffers = FirstSeen()
+        # conversation id -> time of its last message
+        self._last_active: dict[str, float] = {}
+        # Idle conversations moved to disk (see evict_conversation)
+        self._evicted: dict[str, EvictedConversation] = {}
 
     def _initialize_host(self):
         agent = self._host_agent.create_agent()
@@ -101,13 +236,61 @@ class ADKHostManager(ApplicationManager):
             memory_service=self._memory_service,
         )
 
-    async def create_conversation(self) -> Conversation:
+    async def warm_up(self, ping_model: bool = False):
+        """Exercise the runner on a throwaway session: session service,
+        state event, model resolution and the ADK content conversions; with
+        `ping_model`, one tiny turn whose events are not recorded."""
         session = await self._session_service.create_session(
             app_name=self.app_name, user_id=self.user_id
         )
+        try:
+            await self._session_service.append_event(
+                session,
+                ADKEvent(
+                    id=ADKEvent.new_id(),
+                    author='host_agent',
+                    invocation_id=ADKEvent.new_id(),
+                    actions=ADKEventActions(
+                        state_delta={'taskid': None, 'contextId': session.id}
+                    ),
+                ),
+            )
+            # Resolves the model name through the LLM registry
+            self._host_runner.agent.canonical_model  # noqa: B018
+            content = self.adk_content_from_message(
+                InternalMessage(
+                    parts=[Part(root=TextPart(text='ping'))],
+                    role=Role.user,
+                    contextId=session.id,
+                )
+            )
+            await self.adk_content_to_message(content, session.id, None)
+            if ping_model:
+                async for _ in self._host_runner.run_async(
+                    user_id=self.user_id,
+                    session_id=session.id,
+                    new_message=content,
+                ):
+                    pass
+        finally:
+            await self._session_service.delete_session(
+                app_name=self.app_name,
+                user_id=self.user_id,
+                session_id=session.id,
+            )
+
+    async def create_conversation(
+        self, conversationid: str | None = None
+    ) -> Conversation:
+        session = await self._session_service.create_session(
+            app_name=self.app_name,
+            user_id=self.user_id,
+            session_id=conversationid,
+        )
         conversationid = session.id
         c = Conversation(conversationid=conversationid, isactive=True)
         self._conversations.append(c)
+        self._last_active[conversationid] = time.time()
         return c
 
     def update_api_key(self, api_key: str):
@@ -132,8 +315,8 @@ class ADKHostManager(ApplicationManager):
             if not conversation:
                 return message
             # Check if the last event in the conversation was tied to a task.
-            if conversation.messages:
-                taskid = conversation.messages[-1].taskId
+            if conversation.messageIds:
+                taskid = self.messages.get(conversation.messageIds[-1]).taskId
                 if taskid and task_still_open(
                     next(
                         filter(lambda x: x and x.id == taskid, self._tasks),
@@ -144,6 +327,38 @@ class ADKHostManager(ApplicationManager):
         return message
 
     async def process_message(self, message: Message):
+        message_id = getattr(message, 'messageId', getattr(message, 'messageid', None))
+        trace = tracer.get_trace(message_id) if message_id else []
+        if trace:
+            # Time spent between the HTTP ingress and the start of processing
+            tracer.record(
+                'queue', start=trace[0].start, end=time.time(), trace_id=message_id
+            )
+        with tracer.span(
+            'process_message', trace_id=message_id, manager='adk'
+        ):
+            await self._process_message(message)
+
+    def _receive(self, message: Message, context_id: str | None) -> Message:
+        """Store the user message and add it to its conversation."""
+        conversation = self.get_conversation(context_id)
+        print(f"[DEBUG] Got conversation: {conversation is not None}")
+        if conversation:
+            self._last_active[context_id] = time.time()
+        message = self.messages.add(normalize_message(message))
+        if conversation:
+            conversation.messageIds.append(message.messageId)
+        self.add_event(
+            self.messages.record_event(
+                str(uuid.uuid4()),
+                'user',
+                message,
+                datetime.datetime.utcnow().timestamp(),
+            )
+        )
+        return message
+
+    async def _process_message(self, message: Message):
         # Suportar ambos messageId e messageid para compatibilidade
         message_id = getattr(message, 'messageId', getattr(message, 'messageid', None))
         print(f"[DEBUG] Processing message: {message_id}")
@@ -153,19 +368,8 @@ class ADKHostManager(ApplicationManager):
         # Suportar ambos contextId e context_id
         context_id = getattr(message, 'contextId', getattr(message, 'context_id', None))
         print(f"[DEBUG] Context ID: {context_id}")
+        message = self._receive(message, context_id)
         conversation = self.get_conversation(context_id)
-        print(f"[DEBUG] Got conversation: {conversation is not None}")
-        self._messages.append(message)
-        if conversation:
-            conversation.messages.append(message)
-        self.add_event(
-            Event(
-                id=str(uuid.uuid4()),
-                actor='user',
-                content=message,
-                timestamp=datetime.datetime.utcnow().timestamp(),
-            )
-        )
         final_event = None
         # Determine if a task is to be resumed.
         session = await self._session_service.get_session(
@@ -190,26 +394,37 @@ class ADKHostManager(ApplicationManager):
         )
         print(f"[DEBUG] Starting runner for context: {context_id}")
         try:
+            last_event_at = time.time()
             async for event in self._host_runner.run_async(
                 user_id=self.user_id,
                 session_id=context_id,
                 new_message=self.adk_content_from_message(message),
             ):
                 print(f"[DEBUG] Received event from runner: {event.author}")
+                # Time waiting for this event (LLM, tools or remote agents)
+                now = time.time()
+                tracer.record(
+                    'runner.event',
+                    start=last_event_at,
+                    end=now,
+                    author=event.author,
+                    partial=bool(event.partial),
+                )
+                last_event_at = now
                 if (
                     event.actions.state_delta
                     and 'taskid' in event.actions.state_delta
                 ):
                     taskid = event.actions.state_delta['taskid']
                 self.add_event(
-                Event(
-                    id=event.id,
-                    actor=event.author,
-                    content=await self.adk_content_to_message(
-                        event.content, context_id, taskid
-                    ),
-                    timestamp=event.timestamp,
-                )
+                    self.messages.record_event(
+                        event.id,
+                        event.author,
+                        await self.adk_content_to_message(
+                            event.content, context_id, taskid
+                        ),
+                        event.timestamp,
+                    )
                 )
                 final_event = event
         except Exception as e:
@@ -218,7 +433,7 @@ class ADKHostManager(ApplicationManager):
             traceback.print_exc()
             final_event = None
         
-        response: Message | None = None
+        response: InternalMessage | None = None
         if final_event:
             if (
                 final_event.actions.state_delta
@@ -226,13 +441,16 @@ class ADKHostManager(ApplicationManager):
             ):
                 taskid = event.actions.state_delta['taskid']
             final_event.content.role = 'model'
-            response = await self.adk_content_to_message(
-                final_event.content, context_id, taskid
+            response = normalize_message(
+                await self.adk_content_to_message(
+                    final_event.content, context_id, taskid
+                )
             )
-            self._messages.append(response)
+            self.messages.add(response)
 
         if conversation and response:
-            conversation.messages.append(response)
+            with tracer.span('message.append'):
+                conversation.messageIds.append(response.messageId)
             print(f"[DEBUG] Added response to conversation: {context_id}")
         else:
             print(f"[DEBUG] No response or conversation for: {context_id}")
@@ -242,15 +460,23 @@ class ADKHostManager(ApplicationManager):
             print(f"[DEBUG] Removed from pending: {message_id}")
 
     def add_task(self, task: Task):
-        self._tasks.append(task)
+        self._tasks.append(self.messages.intern_task(task))
+        self._tasks_index.add(task, task_context_id(task))
 
     def update_task(self, task: Task):
         for i, t in enumerate(self._tasks):
             if t.id == task.id:
-                self._tasks[i] = task
+                self._tasks[i] = self.messages.intern_task(task)
+                self._tasks_index.add(task, task_context_id(task))
                 return
 
     def task_callback(self, task: TaskCallbackArg, agent_card: AgentCard):
+        with tracer.span(
+            'task_callback', agent=agent_card.name, kind=type(task).__name__
+        ):
+            return self._task_callback(task, agent_card)
+
+    def _task_callback(self, task: TaskCallbackArg, agent_card: AgentCard):
         self.emit_event(task, agent_card)
         if isinstance(task, TaskStatusUpdateEvent):
             current_task = self.add_or_get_task(task)
@@ -280,20 +506,16 @@ class ADKHostManager(ApplicationManager):
             if task.status.message:
                 content = task.status.message
             else:
-                content = Message(
+                content = InternalMessage(
                     parts=[Part(root=TextPart(text=str(task.status.state)))],
-                    role=Role.agent,
-                    messageId=str(uuid.uuid4()),
                     contextId=context_id,
-                    taskid=task.taskId,
+                    taskId=task.taskId,
                 )
         elif isinstance(task, TaskArtifactUpdateEvent):
-            content = Message(
+            content = InternalMessage(
                 parts=task.artifact.parts,
-                role=Role.agent,
-                messageId=str(uuid.uuid4()),
                 contextId=context_id,
-                taskid=task.taskid,
+                taskId=task.taskId,
             )
         elif task.status and task.status.message:
             content = task.status.message
@@ -301,28 +523,27 @@ class ADKHostManager(ApplicationManager):
             parts = []
             for a in task.artifacts:
                 parts.extend(a.parts)
-            content = Message(
+            content = InternalMessage(
                 parts=parts,
-                role=Role.agent,
-                messageId=str(uuid.uuid4()),
-                taskid=task.id,
+                taskId=task.id,
                 contextId=context_id,
             )
         else:
-            content = Message(
+            content = InternalMessage(
                 parts=[Part(root=TextPart(text=str(task.status.state)))],
-                role=Role.agent,
-                messageId=str(uuid.uuid4()),
-                taskid=task.id,
+                taskId=task.id,
                 contextId=context_id,
             )
         if content:
+            tracer.record(
+                'emit_event', start=time.time(), actor=agent_card.name
+            )
             self.add_event(
-                Event(
-                    id=str(uuid.uuid4()),
-                    actor=agent_card.name,
-                    content=content,
-                    timestamp=datetime.datetime.utcnow().timestamp(),
+                self.messages.record_event(
+                    str(uuid.uuid4()),
+                    agent_card.name,
+                    content,
+                    datetime.datetime.utcnow().timestamp(),
                 )
             )
 
@@ -336,26 +557,8 @@ class ADKHostManager(ApplicationManager):
     def insert_message_history(self, task: Task, message: Message | None):
         if not message:
             return
-        if task.history is None:
-            task.history = []
-        # Suportar ambos messageId e messageid
-        message_id = getattr(message, 'messageId', getattr(message, 'messageid', None))
-        if not message_id:
-            return
-        if task.history and (
-            task.status.message
-            and getattr(task.status.message, 'messageId', getattr(task.status.message, 'messageid', None))
-            not in [getattr(x, 'messageId', getattr(x, 'messageid', None)) for x in task.history]
-        ):
-            task.history.append(task.status.message)
-        elif not task.history and task.status.message:
-            task.history = [task.status.message]
-        else:
-            print(
-                'Message id already in history',
-                getattr(task.status.message, 'messageId', getattr(task.status.message, 'messageid', '')) if task.status.message else '',
-                task.history,
-            )
+        if not self.messages.add_to_history(task.id, message):
+            print('Message id already in history', message.messageId)
 
     def add_or_get_task(self, event: TaskCallbackArg):
         taskid = None
@@ -417,14 +620,21 @@ class ADKHostManager(ApplicationManager):
                     current_task.artifacts = [current_temp_artifact]
                 del self._artifact_chunks[artifact.artifact_id][-1]
 
-    def add_event(self, event: Event):
+    def add_event(self, event: EventRecord):
         self._events[event.id] = event
+        self._events_index.add(event, self._event_context(event))
 
     def get_conversation(
         self, conversationid: str | None
     ) -> Conversation | None:
         if not conversationid:
             return None
+        conversation = self._resident_conversation(conversationid)
+        if conversation is None and conversationid in self._evicted:
+            conversation = self.rehydrate_conversation(conversationid)
+        return conversation
+
+    def _resident_conversation(self, conversationid: str) -> Conversation | None:
         return next(
             filter(
                 lambda c: c and c.conversationId == conversationid,
@@ -433,6 +643,64 @@ class ADKHostManager(ApplicationManager):
             None,
         )
 
+    def pending_count(self) -> int:
+        return len(self._pending_messageIds)
+
+    def abort_pending(
+        self,
+        reason: str,
+        state: TaskState = TaskState.failed,
+        messageids: list[str] | None = None,
+    ) -> list[str]:
+        aborted = [
+            m
+            for m in self._pending_messageIds
+            if messageids is None or m in messageids
+        ]
+        for message_id in aborted:
+            self._pending_messageIds.remove(message_id)
+            message = self.messages.get(message_id)
+            context_id = getattr(message, 'contextId', None)
+            # _task_map holds the agents' status messages; a user message
+            # carries its task only when it resumes one (sanitize_message)
+            taskid = self._task_map.get(message_id) or getattr(
+                message, 'taskId', None
+            )
+            response = Message(
+                role=Role.agent,
+                parts=[Part(root=TextPart(text=reason))],
+                contextId=context_id,
+                taskId=taskid,
+                messageId=str(uuid.uuid4()),
+            )
+            conversation = self.get_conversation(context_id)
+            if conversation:
+                conversation.messageIds.append(response.messageId)
+            self.add_event(
+                self.messages.record_event(
+                    str(uuid.uuid4()),
+                    'host_agent',
+                    normalize_message(response),
+                    datetime.datetime.utcnow().timestamp(),
+                )
+            )
+            task = next(filter(lambda t: t.id == taskid, self._tasks), None)
+            if task and task_still_open(task):
+                task.status = TaskStatus(state=state, message=response)
+                self.insert_message_history(task, response)
+                self.update_task(task)
+        return aborted
+
+    def fail_unstarted(self, message: Message, reason: str) -> bool:
+        message_id = getattr(message, 'messageId', getattr(message, 'messageid', None))
+        if not message_id or message_id in self._pending_messageIds:
+            return False
+        self._pending_messageIds.append(message_id)
+        self._receive(
+            message, getattr(message, 'contextId', getattr(message, 'context_id', None))
+        )
+        return bool(self.abort_pending(reason, messageids=[message_id]))
+
     def get_pending_messages(self) -> list[tuple[str, str]]:
         rval = []
         for message_id in self._pending_messageIds:
@@ -441,29 +709,16 @@ class ADKHostManager(ApplicationManager):
                 task = next(
                     filter(lambda x: x.id == taskid, self._tasks), None
                 )
+                history = self.messages.history(taskid)
+                last = self.messages.get(history[-1]) if history else None
                 if not task:
                     rval.append((message_id, ''))
-                elif task.history and task.history[-1].parts:
-                    if len(task.history) == 1:
+                elif last and last.parts:
+                    if len(history) == 1:
                         rval.append((message_id, 'Pensando...'))
                     else:
-                        part = task.history[-1].parts[0]
-                        # Handle both dict and object formats
-                        if isinstance(part, dict):
-                            if 'root' in part:
-                                p = part['root']
-                            else:
-                                p = part
-                        elif hasattr(part, 'root'):
-                            p = part.root
-                        else:
-                            p = part
-                            
-                        # Get text content safely
-                        text = None
-                        if hasattr(p, 'text') or (isinstance(p, dict) and 'text' in p):
-                            text = p.get('text') if isinstance(p, dict) else getattr(p, 'text', None)
-                        
+                        part = last.parts[0]
+                        text = getattr(getattr(part, 'root', part), 'text', None)
                         rval.append(
                             (
                                 message_id,
@@ -474,29 +729,620 @@ class ADKHostManager(ApplicationManager):
                 rval.append((message_id, ''))
         return rval
 
+    async def prune(
+        self, policy: RetentionPolicy, now: float
+    ) -> dict[str, int]:
+        pending = set(self._pending_messageIds)
+        busy = {getattr(self.messages.get(m), 'contextId', None) for m in pending}
+        idle = idle_conversations(
+            self.conversations,
+            self._last_active,
+            busy,
+            policy.conversation_ttl_seconds,
+            now,
+        )
+        removed_objects: list = []
+        for conversation in idle:
+            removed_objects.extend(
+                self.drop_conversation(conversation.conversationId)
+            )
+        dropped_conversations = {c.conversationId for c in idle}
+        evicted = 0
+        if policy.evict_idle_seconds > 0:
+            directory = policy.eviction_dir or os.path.join(
+                tempfile.gettempdir(), 'a2a-evicted'
+            )
+            for conversation in idle_conversations(
+                self._conversations,
+                self._last_active,
+                busy,
+                policy.evict_idle_seconds,
+                now,
+            ):
+                removed_objects.extend(
+                    self.evict_conversation(conversation.conversationId, directory)
+                )
+                evicted += 1
+        tasks = []
+        for task in self._tasks:
+            if (
+                task_finished(task)
+                and self._finished_tasks.age(task.id, now)
+                > policy.task_ttl_seconds
+            ):
+                self.messages.drop_history(task.id)
+                removed_objects.append(task)
+            else:
+                tasks.append(task)
+        removed = {
+            'conversations': len(idle),
+            'evicted': evicted,
+            'tasks': len(self._tasks) - len(tasks),
+        }
+        self._tasks = tasks
+        self._tasks_index.rebuild((t, task_context_id(t)) for t in tasks)
+        task_ids = {t.id for t in tasks}
+        self._finished_tasks.retain(task_ids)
+
+        stale = [
+            m
+            for m, t in self._task_map.items()
+            if t not in task_ids and m not in pending
+        ]
+        for messageid in stale:
+            del self._task_map[messageid]
+        removed['task_map'] = len(stale)
+
+        stale = [
+            m for m in self._next_id if m not in self.messages and m not in pending
+        ]
+        for messageid in stale:
+            del self._next_id[messageid]
+        removed['next_id'] = len(stale)
+
+        stale = [
+            a
+            for a in self._artifact_chunks
+            if self._chunk_buffers.age(a, now) > policy.artifact_chunk_ttl_seconds
+        ]
+        for artifact_id in stale:
+            removed_objects.append(self._artifact_chunks.pop(artifact_id))
+        self._chunk_buffers.retain(self._artifact_chunks)
+        removed['artifact_chunks'] = len(stale)
+
+        kept, dropped = trim_events(
+            list(self._events.values()),
+            self.messages,
+            policy.events_per_conversation,
+            dropped_conversations,
+        )
+        self._events = {e.id: e for e in kept}
+        self._events_index.rebuild((e, self._event_context(e)) for e in kept)
+        removed_objects.extend(dropped)
+        removed['events'] = len(dropped)
+
+        keep = set(pending)
+        for conversation in self._conversations:
+            keep.update(conversation.messageIds)
+        keep.update(e.messageId for e in kept)
+        for task in tasks:
+            keep.update(self.messages.history(task.id))
+            if task.status and task.status.message:
+                keep.add(task.status.message.messageId)
+        dropped = self.messages.prune(keep)
+        removed_objects.extend(dropped)
+        removed['messages'] = len(dropped)
+        removed['bytes'] = approx_size(removed_objects)
+        return removed
+
+    def drop_conversation(self, conversationid: str) -> list:
+        """Forget a conversation for good, evicted or not."""
+        removed = self.forget_conversation(conversationid)
+        self._last_active.pop(conversationid, None)
+        evicted = self._evicted.pop(conversationid, None)
+        if evicted and evicted.offset is None and os.path.exists(evicted.path):
+            os.remove(evicted.path)
+        return removed
+
+    def forget_conversation(self, conversationid: str) -> list:
+        """Remove a resident conversation with its events, messages, ADK
+        session and artifacts, and return what was removed. Messages still
+        referenced by a task or a pending request stay in the store."""
+        conversation = self._resident_conversation(conversationid)
+        if conversation is None:
+            return []
+        self._conversations = [
+            c for c in self._conversations if c is not conversation
+        ]
+        events = self._events_index.pop(conversationid)
+        for event in events:
+            del self._events[event.id]
+        keep = set(self._pending_messageIds)
+        for task in self._tasks:
+            keep.update(self.messages.history(task.id))
+        ids = {*conversation.messageIds, *(e.messageId for e in events)} - keep
+        removed = [conversation, *events, *self.messages.discard(ids)]
+        removed.append(
+            self._session_service.sessions.get(self.app_name, {})
+            .get(self.user_id, {})
+            .pop(conversationid, None)
+        )
+        prefix = self._artifact_prefix(conversationid)
+        for path in [p for p in self._artifact_service.artifacts if p.startswith(prefix)]:
+            removed.append(self._artifact_service.artifacts.pop(path))
+        return removed
+
+    def export_conversation(
+        self, conversationid: str, events: list[EventRecord] | None = None
+    ) -> dict | None:
+        """Bundle (see service.server.bundle) of a conversation, resident or
+        evicted (read from its file, not rehydrated).
+
+        `events` saves the scan over every event when the caller already
+        grouped them (see write_snapshot).
+        """
+        conversation = self._resident_conversation(conversationid)
+        if conversation is None:
+            evicted = self._evicted.get(conversationid)
+            if evicted is None:
+                return None
+            try:
+                return self._read_evicted(evicted)
+            except (OSError, ValueError) as e:
+                print(f'[ERROR] Could not read conversation {conversationid}: {e}')
+                return None
+        if events is None:
+            events = self.conversation_events(conversationid)
+        return _encode_bundle(self._bundle_copy(conversation, events))
+
+    def _bundle_copy(
+        self, conversation: Conversation, events: list[EventRecord]
+    ) -> dict:
+        """The parts of a bundle, copied but not encoded: stored messages and
+        events never change and are kept as they are; the conversation, the
+        session and the artifact lists, which do, are copied."""
+        conversationid = conversation.conversationId
+        ids = dict.fromkeys(
+            [*conversation.messageIds, *(e.messageId for e in events)]
+        )
+        # The in-memory ADK services have no export API: read their maps
+        session = (
+            self._session_service.sessions.get(self.app_name, {})
+            .get(self.user_id, {})
+            .get(conversationid)
+        )
+        if session is not None:
+            session = session.model_copy(
+                update={'events': list(session.events), 'state': dict(session.state)}
+            )
+        prefix = self._artifact_prefix(conversationid)
+        return {
+            'version': BUNDLE_VERSION,
+            'conversation': encode_conversation(conversation),
+            'messages': self.messages.resolve(ids),
+            'events': list(events),
+            'session': session,
+            'artifacts': {
+                path.removeprefix(prefix): list(versions)
+                for path, versions in self._artifact_service.artifacts.items()
+                if path.startswith(prefix)
+            },
+            'last_active': self._last_active.get(conversationid, time.time()),
+        }
+
+    def import_conversation(self, bundle: dict) -> Conversation:
+        """Make a bundled conversation resident again."""
+        conversation = decode_conversation(bundle['conversation'])
+        conversationid = conversation.conversationId
+        for data in bundle['messages']:
+            self.messages.add(decode_message(data))
+        for data in bundle['events']:
+            self.add_event(decode_event(data))
+        if bundle.get('session'):
+            self._session_service.sessions.setdefault(
+                self.app_name, {}
+            ).setdefault(self.user_id, {})[conversationid] = (
+                Session.model_validate(bundle['session'])
+            )
+        prefix = self._artifact_prefix(conversationid)
+        for filename, versions in bundle.get('artifacts', {}).items():
+            self._artifact_service.artifacts[prefix + filename] = [
+                types.Part.model_validate(p) for p in versions
+            ]
+        self._conversations.append(conversation)
+        self._last_active[conversationid] = bundle.get('last_active') or time.time()
+        return conversation
+
+    def last_active(self, conversationid: str) -> float | None:
+        return self._last_active.get(conversationid)
+
+    def import_task(self, task: Task) -> bool:
+        if any(t.id == task.id for t in self._tasks):
+            return False
+        self.add_task(task)
+        return True
+
+    def evict_conversation(self, conversationid: str, directory: str) -> list:
+        """Move a resident conversation to a compressed file in `directory`."""
+        bundle = self.export_conversation(conversationid)
+        if bundle is None:
+            return []
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{conversationid}.json.gz')
+        write_bundle(path, bundle)
+        conversation = self._resident_conversation(conversationid)
+        stub = Conversation(
+            conversationid=conversationid,
+            isactive=conversation.isActive,
+            name=conversation.name,
+        )
+        removed = self.forget_conversation(conversationid)
+        self._evicted[conversationid] = EvictedConversation(path, stub)
+        metrics.inc('eviction.evictions')
+        metrics.set('eviction.evicted', len(self._evicted))
+        return removed
+
+    def rehydrate_conversation(self, conversationid: str) -> Conversation | None:
+        evicted = self._evicted[conversationid]
+        start = time.perf_counter()
+        try:
+            bundle = self._read_evicted(evicted)
+        except (OSError, ValueError) as e:
+            # Stays evicted (and listed): the file may be readable later
+            print(f'[ERROR] Could not rehydrate conversation {conversationid}: {e}')
+            return None
+        del self._evicted[conversationid]
+        conversation = self.import_conversation(bundle)
+        # Read again: not idle, or the next sweep evicts it right back
+        self._last_active[conversationid] = time.time()
+        if evicted.offset is None:
+            # Snapshots are shared by every conversation in them and stay
+            os.remove(evicted.path)
+        metrics.inc('eviction.rehydrations')
+        metrics.observe('eviction.rehydrate_seconds', time.perf_counter() - start)
+        metrics.set('eviction.evicted', len(self._evicted))
+        return conversation
+
+    def _read_evicted(self, evicted: EvictedConversation) -> dict:
+        if evicted.offset is None:
+            return read_bundle(evicted.path)
+        bundle = read_frame(evicted.path, evicted.offset)
+        if bundle.get('version') != BUNDLE_VERSION:
+            raise ValueError(f'Unsupported bundle version in {evicted.path}')
+        return bundle
+
+    def write_snapshot(self, path: str) -> bool:
+        """Write every conversation, task, agent and the remaining events
+        to a snapshot (see service.server.snapshot), blocking until done.
+
+        Resident conversations are exported; evicted ones are copied from
+        their file, snapshot frames without decompressing them. Afterwards the
+        stubs that pointed into the previous snapshot point into this one.
+        """
+        capture = self._capture_snapshot()
+        writer = SnapshotWriter(path)
+        index = _snapshot_index(capture)
+        try:
+            conversations = capture.conversations
+            while conversations:
+                missed = self._write_conversations(conversations, writer, index)
+                conversations = self._recapture_conversations(missed, capture)
+            self._finish_capture(capture, writer, index)
+        except BaseException:
+            writer.abort()
+            raise
+        self._commit_snapshot(capture, path, index)
+        return True
+
+    async def save_snapshot(self, path: str) -> bool:
+        """write_snapshot with only the copy of the state on the event loop;
+        the encoding, compression and writes run in a thread."""
+        capture = self._capture_snapshot()
+        writer = await asyncio.to_thread(SnapshotWriter, path)
+        index = _snapshot_index(capture)
+        try:
+            conversations = capture.conversations
+            while conversations:
+                missed = await asyncio.to_thread(
+                    self._write_conversations, conversations, writer, index
+                )
+                conversations = self._recapture_conversations(missed, capture)
+            await asyncio.to_thread(self._finish_capture, capture, writer, index)
+        except BaseException:
+            writer.abort()
+            raise
+        self._commit_snapshot(capture, path, index)
+        return True
+
+    def _capture_snapshot(self) -> SnapshotCapture:
+        """The state to snapshot, as of this loop step (see _bundle_copy)."""
+        capture = SnapshotCapture(created_at=time.time())
+        for conversation in list(self._conversations):
+            conversationid = conversation.conversationId
+            capture.conversations.append(
+                (
+                    conversationid,
+                    self._snapshot_entry(conversation),
+                    self._bundle_copy(
+                        conversation, self.conversation_events(conversationid)
+                    ),
+                )
+            )
+        for conversationid, evicted in self._evicted.items():
+            capture.conversations.append(
+                (
+                    conversationid,
+                    self._snapshot_entry(evicted.stub),
+                    (evicted.path, evicted.offset),
+                )
+            )
+            capture.evicted[conversationid] = evicted
+        for task in self._tasks:
+            copied = task.model_copy()
+            if task.artifacts is not None:
+                copied.artifacts = list(task.artifacts)
+            capture.tasks.append(
+                (copied, self.messages.resolve(self.messages.history(task.id)))
+            )
+        capture.agents = list(self._agents)
+        capture.state = self._snapshot_state()
+        return capture
+
+    def _write_conversations(
+        self,
+        conversations: list[tuple[str, dict, dict | tuple[str, int | None]]],
+        writer: SnapshotWriter,
+        index: dict,
+    ) -> list[tuple[str, tuple[str, None]]]:
+        """Write captured conversations to `writer`, adding them to `index`.
+        Reads nothing but `conversations` and files, so it can run in a
+        thread; returns the evicted ones whose file was gone."""
+        missed = []
+        for conversationid, entry, source in conversations:
+            if isinstance(source, dict):
+                offset = writer.write(FRAME_CONVERSATION, _encode_bundle(source))
+            elif source[1] is None:
+                try:
+                    bundle = read_bundle(source[0])
+                except FileNotFoundError:
+                    # Read back since the capture (see _recapture_conversations)
+                    missed.append((conversationid, source))
+                    continue
+                offset = writer.write(FRAME_CONVERSATION, bundle)
+            else:
+                offset = writer.write_raw(FRAME_CONVERSATION, read_frame_raw(*source))
+            index['conversations'][conversationid] = {'offset': offset, **entry}
+        return missed
+
+    def _recapture_conversations(
+        self,
+        missed: list[tuple[str, tuple[str, None]]],
+        capture: SnapshotCapture,
+    ) -> list[tuple[str, dict, dict | tuple[str, int | None]]]:
+        """Capture again the conversations _write_conversations missed: a
+        rehydration removes the file of an evicted conversation, which is
+        resident (or evicted to a new file) by now. Without this the
+        snapshot taken by stop() would lose them."""
+        conversations = []
+        for conversationid, source in missed:
+            conversation = self._resident_conversation(conversationid)
+            evicted = self._evicted.get(conversationid)
+            if conversation is not None:
+                conversations.append(
+                    (
+                        conversationid,
+                        self._snapshot_entry(conversation),
+                        self._bundle_copy(
+                            conversation, self.conversation_events(conversationid)
+                        ),
+                    )
+                )
+            elif evicted is not None and (evicted.path, evicted.offset) != source:
+                conversations.append(
+                    (
+                        conversationid,
+                        self._snapshot_entry(evicted.stub),
+                        (evicted.path, evicted.offset),
+                    )
+                )
+                capture.evicted[conversationid] = evicted
+            elif evicted is not None:
+                print(
+                    f'[ERROR] Could not snapshot conversation {conversationid}: '
+                    f'{source[0]} is gone'
+                )
+        return conversations
+
+    def _finish_capture(
+        self, capture: SnapshotCapture, writer: SnapshotWriter, index: dict
+    ):
+        """Write the tasks, agents and state of `capture` and the index to
+        `<path>.tmp`; like _write_conversations it can run in a thread."""
+        for task, history in capture.tasks:
+            index['tasks'].append(
+                writer.write(
+                    FRAME_TASK,
+                    {
+                        'task': task.model_dump(mode='json', exclude_none=True),
+                        'history': [encode_message(m) for m in history],
+                    },
+                )
+            )
+        for card in capture.agents:
+            index['agents'].append(
+                writer.write(
+                    FRAME_AGENT, card.model_dump(mode='json', exclude_none=True)
+                )
+            )
+        index['state'] = writer.write(FRAME_STATE, _encode_state(capture.state))
+        writer.finish(index)
+
+    def _commit_snapshot(self, capture: SnapshotCapture, path: str, index: dict):
+        # Together, on the loop: a conversation read back in between would
+        # otherwise seek the new file at an offset of the previous one
+        SnapshotWriter.commit(path)
+        for conversationid, evicted in capture.evicted.items():
+            if (
+                evicted.offset is not None
+                and self._evicted.get(conversationid) is evicted
+            ):
+                evicted.path = path
+                evicted.offset = index['conversations'][conversationid]['offset']
+
+    def _snapshot_entry(self, conversation: Conversation) -> dict:
+        return {
+            'name': conversation.name,
+            'isActive': conversation.isActive,
+            'last_active': self._last_active.get(
+                conversation.conversationId, time.time()
+            ),
+        }
+
+    def _snapshot_state(self) -> dict:
+        # Events (and their messages) that belong to no conversation, e.g.
+        # remote agent updates without a contextId, and the ADK state that
+        # is not stored in a session; copied like _bundle_copy
+        conversationids = {c.conversationId for c in self.conversations}
+        events = [
+            e
+            for contextid in self._events_index.contexts()
+            if contextid not in conversationids
+            for e in self._events_index.get(contextid)
+        ]
+        shared = f'{self.app_name}/{self.user_id}/user/'
+        return {
+            'events': events,
+            'messages': self.messages.resolve(
+                dict.fromkeys(e.messageId for e in events)
+            ),
+            'task_map': dict(self._task_map),
+            'app_state': copy.deepcopy(self._session_service.app_state),
+            'user_state': copy.deepcopy(self._session_service.user_state),
+            'user_artifacts': {
+                path.removeprefix(shared): list(versions)
+                for path, versions in self._artifact_service.artifacts.items()
+                if path.startswith(shared)
+            },
+        }
+
+    def restore_snapshot(self, path: str) -> dict[str, int]:
+        """Load a snapshot, one frame at a time.
+
+        Agents, tasks and the manager state are read right away;
+        conversations only get a stub and are read from the snapshot the
+        first time they are accessed (like evicted conversations).
+        """
+        restored = {'conversations': 0, 'tasks': 0, 'agents': 0, 'events': 0}
+        with SnapshotReader(path) as reader:
+            index = reader.index
+            for offset in index['agents']:
+                _, data = reader.read(offset)
+                self._add_agent(AgentCard.model_validate(data))
+                restored['agents'] += 1
+            if restored['agents']:
+                self._initialize_host()
+            known = {t.id for t in self._tasks}
+            for offset in index['tasks']:
+                _, data = reader.read(offset)
+                task = Task.model_validate(data['task'])
+                if task.id in known:
+                    continue
+                for message in data['history']:
+                    self.messages.add_to_history(task.id, decode_message(message))
+                self.add_task(task)
+                restored['tasks'] += 1
+            if index.get('state') is not None:
+                _, state = reader.read(index['state'])
+                restored['events'] = self._restore_state(state)
+        for conversationid, entry in index['conversations'].items():
+            if conversationid in self._evicted or self._resident_conversation(
+                conversationid
+            ):
+                continue
+            stub = Conversation(
+                conversationid=conversationid,
+                isactive=entry['isActive'],
+                name=entry['name'],
+            )
+            self._evicted[conversationid] = EvictedConversation(
+                path, stub, entry['offset']
+            )
+            self._last_active[conversationid] = entry['last_active']
+            restored['conversations'] += 1
+        metrics.set('eviction.evicted', len(self._evicted))
+        return restored
+
+    def _restore_state(self, state: dict) -> int:
+        for data in state['messages']:
+            self.messages.add(decode_message(data))
+        for data in state['events']:
+            self.add_event(decode_event(data))
+        for messageid, taskid in state['task_map'].items():
+            self._task_map.setdefault(messageid, taskid)
+        self._session_service.app_state.update(state['app_state'])
+        for app, users in state['user_state'].items():
+            for user, values in users.items():
+                self._session_service.user_state.setdefault(app, {}).setdefault(
+                    user, {}
+                ).update(values)
+        shared = f'{self.app_name}/{self.user_id}/user/'
+        for filename, versions in state['user_artifacts'].items():
+            self._artifact_service.artifacts.setdefault(
+                shared + filename,
+                [types.Part.model_validate(p) for p in versions],
+            )
+        return len(state['events'])
+
+    def conversation_events(self, conversationid: str | None) -> list[EventRecord]:
+        return self._events_index.get(conversationid)
+
+    def conversation_tasks(self, conversationid: str | None) -> list[Task]:
+        return self._tasks_index.get(conversationid)
+
+    def _event_context(self, event: EventRecord) -> str | None:
+        return getattr(self.messages.get(event.messageId), 'contextId', None)
+
+    def _artifact_prefix(self, conversationid: str) -> str:
+        # Same layout as InMemoryArtifactService._artifact_path; "user:"
+        # artifacts are shared by all sessions and are left alone
+        return f'{self.app_name}/{self.user_id}/{conversationid}/'
+
     def register_agent(self, url):
-        agent_data = get_agent_card(url)
+        agent_data = get_agent_card(
+            url, self.deadlines.limit(self.deadlines.remote_call_seconds)
+        )
         if not agent_data.url:
             agent_data.url = url
-        self._agents.append(agent_data)
-        self._host_agent.register_agent_card(agent_data)
+        self._add_agent(agent_data)
         # Now update the host agent definition
         self._initialize_host()
 
+    def add_agents(self, cards: list[AgentCard]):
+        for card in cards:
+            self._add_agent(card)
+        # One rebuild for all of them
+        self._initialize_host()
+
+    def _add_agent(self, card: AgentCard):
+        self._agents.append(card)
+        # HostAgent keeps the cards in a plain list (it has no
+        # register_agent_card); _initialize_host() rebuilds the agent
+        self._host_agent.agents.append(card)
+
     @property
     def agents(self) -> list[AgentCard]:
         return self._agents
 
     @property
     def conversations(self) -> list[Conversation]:
-        return self._conversations
+        return self._conversations + [e.stub for e in self._evicted.values()]
 
     @property
     def tasks(self) -> list[Task]:
         return self._tasks
 
     @property
-    def events(self) -> list[Event]:
+    def events(self) -> list[EventRecord]:
         return sorted(self._events.values(), key=lambda x: x.timestamp)
 
     def adk_content_from_message(self, message: Message) -> types.Content:
@@ -550,15 +1396,14 @@ class ADKHostManager(ApplicationManager):
         content: types.Content,
         context_id: str | None,
         taskid: str | None,
-    ) -> Message:
+    ) -> InternalMessage:
         parts: list[Part] = []
         if not content.parts:
-            return Message(
+            return InternalMessage(
                 parts=[],
-                role=content.role if content.role == Role.user else Role.agent,
+                role=Role.user if content.role == Role.user else Role.agent,
                 contextId=context_id,
-                taskid=taskid,
-                messageId=str(uuid.uuid4()),
+                taskId=taskid,
             )
         for part in content.parts:
             if part.text:
@@ -573,8 +1418,10 @@ class ADKHostManager(ApplicationManager):
                     Part(
                         root=FilePart(
                             file=FileWithBytes(
-                                bytes=part.inline_data.decode('utf-8'),
-                                mime_type=part.file_data.mime_type,
+                                bytes=base64.b64encode(
+                                    part.inline_data.data or b''
+                                ).decode('utf-8'),
+                                mime_type=part.inline_data.mime_type,
                             ),
                         )
                     )
@@ -614,12 +1461,11 @@ class ADKHostManager(ApplicationManager):
                 )
             else:
                 raise ValueError('Unexpected content, unknown type')
-        return Message(
-            role=content.role if content.role == Role.user else Role.agent,
+        return InternalMessage(
+            role=Role.user if content.role == Role.user else Role.agent,
             parts=parts,
             contextId=context_id,
-            taskid=taskid,
-            messageId=str(uuid.uuid4()),
+            taskId=taskid,
         )
 
     async def _handle_function_response(
@@ -681,13 +1527,6 @@ class ADKHostManager(ApplicationManager):
         )
 
 
-def get_message_id(m: Message | None) -> str | None:
-    if not m or not m.metadata:
-        return None
-    # Tentar messageId primeiro (padrão), depois messageid (compatibilidade)
-    return m.metadata.get('messageId', m.metadata.get('messageid', None))
-
-
 def task_still_open(task: Task | None) -> bool:
     if not task:
         return False
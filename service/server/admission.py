@@ -0,0 +1,270 @@
+"""Admission control of message/send.
+
+Two token buckets are checked before a message is accepted: one per user
+(the `x-a2a-user-id` header or `metadata.userId` of the message, when the
+caller sends one) and one per conversation. A bucket holds up to `burst`
+tokens and refills at `rate` per second; a send takes one token from each.
+A rejected send gets a JSON-RPC error (HTTP 429) with `retryAfter`, the
+seconds until a token is available.
+
+Accepted messages then wait for one of `max_concurrent_runs` run slots (the
+global cap on concurrent LLM runs) before processing starts. Each message
+has a priority class, `metadata.priority` or the `x-a2a-priority` header:
+`interactive` (the default, chat) or `batch` (evaluations, backfills). A
+freed slot goes to the waiting classes by weighted round robin, interactive
+first: with the default weights 4 interactive runs start for each batch run
+while both wait, so batch work is slowed, never starved. `batch_max_runs`
+also keeps batch runs from holding every slot. The wait is reported per
+class as `admission.slot_wait_seconds.<class>`.
+
+`rate` 0 or `max_concurrent_runs` 0 disables that limit. The policy comes
+from A2A_ADMISSION_<FIELD> and can be changed at runtime with the
+admission/config JSON-RPC method.
+"""
+
+import asyncio
+import time
+
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, fields
+
+import httpx
+
+from fastapi import Request
+from fastapi.responses import JSONResponse
+
+from service.server.metrics import metrics
+from service.server.policy import parse_value, policy_from_env
+
+
+USER_HEADER = 'x-a2a-user-id'
+PRIORITY_HEADER = 'x-a2a-priority'
+# In the order a free slot is offered to them
+PRIORITIES = ('interactive', 'batch')
+# Kept when a worker or the shard router passes message/send on
+FORWARDED_HEADERS = (USER_HEADER, PRIORITY_HEADER)
+
+
+def forwarded_headers(request: Request) -> dict[str, str]:
+    return {h: request.headers[h] for h in FORWARDED_HEADERS if h in request.headers}
+
+
+def relay(response: httpx.Response) -> JSONResponse:
+    """The answer of the process that handled a message/send, status and
+    Retry-After included (429 rejected, 503 draining)."""
+    if response.status_code not in (200, 429, 503):
+        response.raise_for_status()
+    retry_after = response.headers.get('retry-after')
+    return JSONResponse(
+        response.json(),
+        status_code=response.status_code,
+        headers={'Retry-After': retry_after} if retry_after else None,
+    )
+
+
+@dataclass
+class AdmissionPolicy:
+    user_rate: float = 0.0
+    user_burst: int = 20
+    conversation_rate: float = 0.0
+    conversation_burst: int = 10
+    max_concurrent_runs: int = 0
+    # Share of the freed slots while both classes wait
+    interactive_weight: int = 4
+    batch_weight: int = 1
+    # Slots batch runs may hold at once (0: any)
+    batch_max_runs: int = 0
+    # Buckets kept (least recently used dropped first)
+    max_buckets: int = 10_000
+
+    @classmethod
+    def from_env(cls) -> 'AdmissionPolicy':
+        return policy_from_env(cls, 'ADMISSION')
+
+
+@dataclass
+class Rejection:
+    scope: str  # 'user' or 'conversation'
+    retry_after: float
+
+    def to_error(self) -> dict:
+        return {
+            'code': -32001,
+            'message': f'rate limit exceeded ({self.scope})',
+            'data': {'scope': self.scope, 'retryAfter': round(self.retry_after, 3)},
+        }
+
+
+class TokenBucket:
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst: int, now: float):
+        self.tokens = float(burst)
+        self.updated = now
+
+    def refill(self, rate: float, burst: int, now: float):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+
+    def wait(self, rate: float) -> float:
+        """Seconds until one token is available (0 if it is now)."""
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / rate
+
+
+class Ticket:
+    """A place in the queue of a class, then the slot it was given."""
+
+    __slots__ = ('key', 'priority', 'future', 'held', 'queued_at')
+
+    def __init__(self, key: str, priority: str):
+        self.key = key
+        self.priority = priority
+        self.future = asyncio.get_running_loop().create_future()
+        self.held = False
+        self.queued_at = time.perf_counter()
+
+
+class RunSlots:
+    """A semaphore with one queue per priority class, whose limits are
+    read from the policy (so they can change at runtime)."""
+
+    def __init__(self, policy: AdmissionPolicy):
+        self.policy = policy
+        self.active = 0
+        self.running = dict.fromkeys(PRIORITIES, 0)
+        self._waiters: dict[str, deque[Ticket]] = {p: deque() for p in PRIORITIES}
+        # Slots each class may still take in this round
+        self._credits = dict.fromkeys(PRIORITIES, 0)
+
+    @property
+    def queued(self) -> list[str]:
+        return [t.key for p in PRIORITIES for t in self._waiters[p]]
+
+    def enqueue(self, key: str, priority: str = 'interactive') -> Ticket:
+        """Queue `key` at once; its future is done when it holds a slot."""
+        ticket = Ticket(key, priority)
+        self._waiters[priority].append(ticket)
+        self.wake()
+        return ticket
+
+    def release(self, ticket: Ticket):
+        """Give the slot back, or leave the queue. Safe to call twice."""
+        if ticket.held:
+            ticket.held = False
+            self.active -= 1
+            self.running[ticket.priority] -= 1
+            self.wake()
+        elif ticket in self._waiters[ticket.priority]:
+            self._waiters[ticket.priority].remove(ticket)
+            ticket.future.cancel()
+
+    def _eligible(self, priority: str) -> bool:
+        cap = self.policy.batch_max_runs if priority == 'batch' else 0
+        return cap <= 0 or self.running[priority] < cap
+
+    def _next(self) -> str | None:
+        """The class the next free slot goes to (weighted round robin)."""
+        waiting = [p for p in PRIORITIES if self._waiters[p] and self._eligible(p)]
+        if not waiting:
+            return None
+        for p in waiting:
+            if self._credits[p] > 0:
+                return p
+        # Round over for every class that waits: a new one
+        for p in PRIORITIES:
+            self._credits[p] = max(1, getattr(self.policy, f'{p}_weight'))
+        return waiting[0]
+
+    def wake(self):
+        limit = self.policy.max_concurrent_runs
+        while limit <= 0 or self.active < limit:
+            priority = self._next()
+            if priority is None:
+                return
+            ticket = self._waiters[priority].popleft()
+            if ticket.future.done():
+                # Its run was cancelled while waiting
+                continue
+            self._credits[priority] -= 1
+            self.active += 1
+            self.running[priority] += 1
+            ticket.held = True
+            ticket.future.set_result(None)
+
+
+class AdmissionControl:
+    def __init__(self, policy: AdmissionPolicy | None = None):
+        self.policy = policy or AdmissionPolicy.from_env()
+        self._buckets: OrderedDict[tuple[str, str], TokenBucket] = OrderedDict()
+        self.slots = RunSlots(self.policy)
+
+    def configure(self, changes: dict) -> dict:
+        """Apply the given policy fields; returns the whole policy."""
+        names = {f.name: f for f in fields(AdmissionPolicy)}
+        for name, value in (changes or {}).items():
+            if name not in names:
+                raise ValueError(f'unknown admission field: {name}')
+            setattr(self.policy, name, parse_value(getattr(self.policy, name), value))
+        self.slots.wake()
+        print(f'[ADMISSION] {asdict(self.policy)}')
+        return asdict(self.policy)
+
+    def admit(
+        self, user: str | None, conversation: str | None, now: float | None = None
+    ) -> Rejection | None:
+        """Take a token from each bucket of the send, or none if one of
+        them is empty."""
+        now = time.monotonic() if now is None else now
+        policy = self.policy
+        checks = []
+        if user and policy.user_rate > 0:
+            checks.append(('user', user, policy.user_rate, policy.user_burst))
+        if conversation and policy.conversation_rate > 0:
+            checks.append(
+                (
+                    'conversation',
+                    conversation,
+                    policy.conversation_rate,
+                    policy.conversation_burst,
+                )
+            )
+        buckets = []
+        for scope, key, rate, burst in checks:
+            bucket = self._bucket(scope, key, burst, now)
+            bucket.refill(rate, burst, now)
+            wait = bucket.wait(rate)
+            if wait:
+                metrics.inc(f'admission.rejected.{scope}')
+                return Rejection(scope, wait)
+            buckets.append(bucket)
+        for bucket in buckets:
+            bucket.tokens -= 1
+        metrics.inc('admission.admitted')
+        return None
+
+    def _bucket(self, scope: str, key: str, burst: int, now: float) -> TokenBucket:
+        bucket = self._buckets.get((scope, key))
+        if bucket is None:
+            bucket = self._buckets[(scope, key)] = TokenBucket(burst, now)
+            while len(self._buckets) > self.policy.max_buckets:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end((scope, key))
+        return bucket
+
+    def enqueue(self, key: str, priority: str = 'interactive') -> Ticket:
+        """Take a place for a run of `key` (in the queue of its class)."""
+        return self.slots.enqueue(key, priority)
+
+    async def wait(self, ticket: Ticket):
+        """Wait until `ticket` holds a run slot."""
+        await ticket.future
+        metrics.observe(
+            f'admission.slot_wait_seconds.{ticket.priority}',
+            time.perf_counter() - ticket.queued_at,
+        )
+        metrics.set('admission.active_runs', self.slots.active)
+
+    def release(self, ticket: Ticket):
+        self.slots.release(ticket)
+        metrics.set('admission.active_runs', self.slots.active)
@@ -1,13 +1,23 @@
 from abc import ABC, abstractmethod
 
-from a2a.types import AgentCard, Message, Task
+from a2a.types import AgentCard, Task, TaskState
 
-from service.types import Conversation, Event
+from service.server.message_store import EventRecord, MessageStore, task_context_id
+from service.server.retention import RetentionPolicy
+from service.types import Conversation, Message
 
 
 class ApplicationManager(ABC):
+    # Every message of the manager; conversations, events and task
+    # histories refer to them by id (see MessageStore)
+    messages: MessageStore
+
     @abstractmethod
-    def create_conversation(self) -> Conversation:
+    def create_conversation(
+        self, conversationid: str | None = None
+    ) -> Conversation:
+        """Create a conversation; `conversationid` picks its id (e.g. one
+        that hashes to this worker, see service.server.cluster)."""
         pass
 
     @abstractmethod
@@ -22,16 +32,121 @@ class ApplicationManager(ABC):
     def register_agent(self, url: str):
         pass
 
+    def add_agents(self, cards: list[AgentCard]):
+        """Register agent cards fetched elsewhere (see warmup);
+        `register_agent` fetches the card of one url itself."""
+        raise NotImplementedError(
+            f'{type(self).__name__} cannot add agent cards'
+        )
+
+    async def warm_up(self, ping_model: bool = False):
+        """Build what the first message would otherwise pay for;
+        `ping_model` also runs one tiny turn through the model."""
+        return None
+
     @abstractmethod
     def get_pending_messages(self) -> list[tuple[str, str]]:
         pass
 
+    def pending_count(self) -> int:
+        """Number of messages being processed, without building the
+        statuses of get_pending_messages."""
+        return len(self.get_pending_messages())
+
+    def abort_pending(
+        self,
+        reason: str,
+        state: TaskState = TaskState.failed,
+        messageids: list[str] | None = None,
+    ) -> list[str]:
+        """End pending messages (all of them, or `messageids`) without
+        waiting for their run: each gets an agent reply with `reason` and
+        its open task moves to `state`. Returns the ids ended."""
+        return []
+
+    def fail_unstarted(self, message: Message, reason: str) -> bool:
+        """End a message whose run never started (it was waiting for a run
+        slot): it is added to its conversation as received, then answered
+        with `reason`. False when it is already pending."""
+        return False
+
+    async def cancel_message(self, messageid: str) -> bool:
+        """End a pending message as canceled (the server cancels its run);
+        False when it was not pending."""
+        return bool(
+            self.abort_pending(
+                'Cancelada pelo usuário.', TaskState.canceled, [messageid]
+            )
+        )
+
     @abstractmethod
     def get_conversation(
         self, conversationid: str | None
     ) -> Conversation | None:
         pass
 
+    async def prune(
+        self, policy: RetentionPolicy, now: float
+    ) -> dict[str, int]:
+        """Drop bookkeeping the policy no longer covers (see retention).
+
+        Returns the number of entries removed per structure and `bytes`,
+        the approximate memory reclaimed.
+        """
+        return {}
+
+    def export_conversation(self, conversationid: str) -> dict | None:
+        """Bundle of a conversation (see service.server.bundle); None when
+        the manager cannot export it."""
+        return None
+
+    def import_conversation(self, bundle: dict) -> Conversation:
+        raise NotImplementedError(
+            f'{type(self).__name__} cannot import conversations'
+        )
+
+    def drop_conversation(self, conversationid: str) -> list:
+        """Forget a conversation; returns what was removed."""
+        return []
+
+    def last_active(self, conversationid: str) -> float | None:
+        """When the conversation was last used (a message added, or read
+        back from disk), in epoch seconds; None when unknown."""
+        return None
+
+    def import_task(self, task: Task) -> bool:
+        """Add an exported task unless one with its id exists; returns
+        whether it was added."""
+        raise NotImplementedError(f'{type(self).__name__} cannot import tasks')
+
+    def conversation_events(self, conversationid: str | None) -> list[EventRecord]:
+        """Events of one conversation (the contextId of their message)."""
+        return [
+            e
+            for e in self.events
+            if getattr(self.messages.get(e.messageId), 'contextId', None)
+            == conversationid
+        ]
+
+    def conversation_tasks(self, conversationid: str | None) -> list[Task]:
+        return [t for t in self.tasks if task_context_id(t) == conversationid]
+
+    def write_snapshot(self, path: str) -> bool:
+        """Write the manager state to `path` (see service.server.snapshot).
+
+        Returns False when the manager has no snapshot support.
+        """
+        return False
+
+    async def save_snapshot(self, path: str) -> bool:
+        """write_snapshot for the running server: without holding the event
+        loop for the whole write where the manager can avoid it."""
+        return self.write_snapshot(path)
+
+    def restore_snapshot(self, path: str) -> dict[str, int]:
+        """Load a snapshot written by `write_snapshot`; returns counts."""
+        return {}
+
     @property
     @abstractmethod
     def conversations(self) -> list[Conversation]:
@@ -49,5 +164,5 @@ class ApplicationManager(ABC):
 
     @property
     @abstractmethod
-    def events(self) -> list[Event]:
+    def events(self) -> list[EventRecord]:
         pass
@@ -0,0 +1,104 @@
+"""Self-contained, serializable state of one conversation.
+
+A bundle is a plain dict that can be written as JSON:
+
+    {
+      'version': 1,
+      'conversation': {...},       # Conversation, messageIds included
+      'messages': [{...}, ...],    # every message the conversation refers to
+      'events': [{...}, ...],      # EventRecords of the conversation
+      'session': {...} | None,     # ADK session (events and state)
+      'artifacts': {filename: [part, ...]},  # ADK artifacts, all versions
+      'last_active': 1700000000.0,
+    }
+
+Managers build and restore bundles (`export_conversation` /
+`import_conversation`); this module only knows how to encode the pieces and
+how to store a bundle as gzip-compressed JSON.
+"""
+
+import gzip
+import json
+import os
+
+from typing import Any
+
+from service.server.internal_message import InternalMessage
+from service.server.message_store import EventRecord
+from service.server.normalize import normalize_part, normalize_role
+from service.types import Conversation
+
+
+BUNDLE_VERSION = 1
+
+
+def encode_message(message) -> dict[str, Any]:
+    # InternalMessage and Message share these attribute names: no need to
+    # build a wire model just to read them
+    return {
+        'messageId': message.messageId,
+        'contextId': message.contextId,
+        'taskId': message.taskId,
+        'role': getattr(message.role, 'value', message.role),
+        'parts': [
+            p.model_dump(mode='json', exclude_none=True)
+            if hasattr(p, 'model_dump')
+            else p
+            for p in message.parts
+        ],
+        'metadata': message.metadata,
+        'version': getattr(message, 'version', 0),
+    }
+
+
+def decode_message(data: dict[str, Any]) -> InternalMessage:
+    # Bundles are written by the server itself: no pydantic validation of
+    # the message, only the parts are rebuilt as typed Part objects
+    return InternalMessage(
+        parts=[normalize_part(p) for p in data.get('parts') or []],
+        role=normalize_role(data.get('role'), bool(data.get('taskId'))),
+        contextId=data.get('contextId'),
+        taskId=data.get('taskId'),
+        messageId=data['messageId'],
+        metadata=data.get('metadata'),
+        version=data.get('version') or 1,
+    )
+
+
+def encode_event(event: EventRecord) -> dict[str, Any]:
+    return {
+        'id': event.id,
+        'actor': event.actor,
+        'messageId': event.messageId,
+        'timestamp': event.timestamp,
+    }
+
+
+def decode_event(data: dict[str, Any]) -> EventRecord:
+    return EventRecord(
+        data['id'], data['actor'], data['messageId'], data['timestamp']
+    )
+
+
+def encode_conversation(conversation: Conversation) -> dict[str, Any]:
+    return conversation.model_dump(mode='json', exclude={'messages'})
+
+
+def decode_conversation(data: dict[str, Any]) -> Conversation:
+    return Conversation.model_validate(data)
+
+
+def write_bundle(path: str, bundle: dict[str, Any]):
+    """Write `bundle` as gzip JSON, atomically (no half-written files)."""
+    tmp = f'{path}.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8', compresslevel=6) as f:
+        json.dump(bundle, f, separators=(',', ':'))
+    os.replace(tmp, path)
+
+
+def read_bundle(path: str) -> dict[str, Any]:
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        bundle = json.load(f)
+    if bundle.get('version') != BUNDLE_VERSION:
+        raise ValueError(f'Unsupported bundle version in {path}')
+    return bundle
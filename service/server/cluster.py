@@ -0,0 +1,164 @@
+"""Multi-worker mode: N server processes behind one public port.
+
+Every worker runs its own manager and listens on the shared public port
+(SO_REUSEPORT, the kernel spreads connections) and on a private port of its
+own. Conversations are assigned to workers by consistent hashing of their
+id (HashRing), so the ADK session of a conversation lives in one process:
+
+- conversation/create picks a fresh id and creates it on the owner;
+- message/send is forwarded to the owner of its contextId and processed
+  there;
+- agent/register is applied on every worker;
+- conversation/list, message/list, events/get, task/list and
+  message/pending are answered by any worker from the SharedStore, which
+  the owners update when a message starts and when it finishes.
+
+Configured by main.py from A2A_WORKERS; a worker sees:
+  A2A_WORKER_ID      its name (w0, w1, ...)
+  A2A_WORKER_URLS    name=private url for every worker, comma separated
+  A2A_SHARED_STORE   path of the SQLite file
+"""
+
+import asyncio
+import os
+
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from fastapi.responses import JSONResponse
+
+from service.server.admission import relay
+from service.server.hashring import HashRing
+from service.server.metrics import metrics
+from service.server.shared_store import SharedStore
+
+
+# Marks a request a worker forwarded to another one: never forward it again
+FORWARDED_HEADER = 'x-a2a-forwarded'
+
+
+@dataclass
+class ClusterConfig:
+    worker_id: str
+    # worker id -> private base url
+    workers: dict[str, str]
+    store_path: str
+
+    @classmethod
+    def from_env(cls) -> 'ClusterConfig | None':
+        worker_id = os.environ.get('A2A_WORKER_ID', '')
+        urls = os.environ.get('A2A_WORKER_URLS', '')
+        if not worker_id or not urls:
+            return None
+        workers = dict(item.split('=', 1) for item in urls.split(',') if item)
+        return cls(
+            worker_id=worker_id,
+            workers=workers,
+            store_path=os.environ.get('A2A_SHARED_STORE', 'a2a-shared.db'),
+        )
+
+    def to_env(self) -> dict[str, str]:
+        return {
+            'A2A_WORKER_ID': self.worker_id,
+            'A2A_WORKER_URLS': ','.join(f'{k}={v}' for k, v in self.workers.items()),
+            'A2A_SHARED_STORE': self.store_path,
+        }
+
+
+class Cluster:
+    def __init__(self, config: ClusterConfig, http_client: httpx.AsyncClient):
+        self.config = config
+        self.worker_id = config.worker_id
+        self.ring = HashRing(config.workers)
+        self.store = SharedStore(config.store_path)
+        self.http_client = http_client
+
+    @classmethod
+    def from_env(cls, http_client: httpx.AsyncClient) -> 'Cluster | None':
+        config = ClusterConfig.from_env()
+        return cls(config, http_client) if config else None
+
+    def owner(self, conversationid: str | None) -> str:
+        if not conversationid:
+            return self.worker_id
+        return self.ring.owner(conversationid)
+
+    def is_local(self, conversationid: str | None) -> bool:
+        return self.owner(conversationid) == self.worker_id
+
+    def peers(self) -> list[str]:
+        return [w for w in self.ring.nodes if w != self.worker_id]
+
+    async def forward(self, worker: str, method: str, body: dict) -> dict:
+        """POST a JSON-RPC body to `method` on `worker`; return its JSON."""
+        response = await self.http_client.post(
+            f'{self.config.workers[worker]}/{method}',
+            json=body,
+            headers={FORWARDED_HEADER: self.worker_id},
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def forward_send(
+        self, worker: str, body: dict, headers: dict[str, str]
+    ) -> JSONResponse:
+        """message/send on `worker`, its status kept (see admission.relay)."""
+        response = await self.http_client.post(
+            f'{self.config.workers[worker]}/message/send',
+            json=body,
+            headers={**headers, FORWARDED_HEADER: self.worker_id},
+        )
+        return relay(response)
+
+
+@dataclass
+class _Writes:
+    lock: asyncio.Lock
+    requested: int = 0
+    written: int = 0
+    callers: int = 0
+
+
+class CoalescedWrites:
+    """Writes to the shared store, off the event loop and coalesced per key.
+
+    `run(key, snapshot, write)` takes `snapshot()` on the loop and runs
+    `write(state)` in a thread. While a write of `key` is in progress, the
+    calls made for it wait and are all served by one more write, with the
+    state taken when it starts: a conversation is written at most twice
+    however many times it is published meanwhile.
+    """
+
+    def __init__(self):
+        self._keys: dict[str, _Writes] = {}
+
+    async def run(
+        self, key: str, snapshot: Callable[[], Any], write: Callable[[Any], None]
+    ):
+        writes = self._keys.get(key)
+        if writes is None:
+            writes = self._keys[key] = _Writes(asyncio.Lock())
+        writes.requested += 1
+        ticket = writes.requested
+        writes.callers += 1
+        try:
+            async with writes.lock:
+                if writes.written >= ticket:
+                    # A write that started after this call covered it
+                    metrics.inc('cluster.publishes_coalesced')
+                    return
+                writes.written = writes.requested
+                state = snapshot()
+                start = asyncio.get_running_loop().time()
+                await asyncio.to_thread(write, state)
+                metrics.observe(
+                    'cluster.publish_seconds',
+                    asyncio.get_running_loop().time() - start,
+                )
+        finally:
+            writes.callers -= 1
+            if not writes.callers:
+                del self._keys[key]
@@ -0,0 +1,62 @@
+"""Deadlines of the agent pipeline.
+
+Without them a stuck model call or remote agent keeps its message pending
+forever and the tail latency is whatever the upstream does. Three limits,
+each counted in metrics when it expires:
+
+- `run_seconds`: a whole message run (ConversationServer._start_run). On
+  expiry the run is cancelled and the message ends through
+  `abort_pending` with a timeout reply and its open task failed
+  (`timeouts.run`);
+- `remote_call_seconds`: every HTTP call of the shared client to remote
+  agents, peers and shards, and the agent card fetches
+  (`timeouts.remote_call`, counted by `DeadlineTransport`);
+- `tool_call_seconds`: each tool call of the host agent; the model gets an
+  error result and the run goes on (`timeouts.tool`, see
+  utils.host_agent.DeadlineTool).
+
+0 disables a limit. Every field can be set from the environment as
+A2A_DEADLINE_<FIELD>.
+"""
+
+from dataclasses import dataclass
+
+import httpx
+
+from service.server.metrics import metrics
+from service.server.policy import policy_from_env
+
+
+@dataclass
+class DeadlinePolicy:
+    run_seconds: float = 300.0
+    remote_call_seconds: float = 30.0
+    tool_call_seconds: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> 'DeadlinePolicy':
+        return policy_from_env(cls, 'DEADLINE')
+
+    @staticmethod
+    def limit(seconds: float) -> float | None:
+        """`seconds` as a timeout argument (None when disabled)."""
+        return seconds if seconds > 0 else None
+
+
+class DeadlineTransport(httpx.AsyncHTTPTransport):
+    """Counts the requests that hit the client timeout."""
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        try:
+            return await super().handle_async_request(request)
+        except httpx.TimeoutException:
+            metrics.inc('timeouts.remote_call')
+            raise
+
+
+def http_client(policy: DeadlinePolicy | None = None) -> httpx.AsyncClient:
+    policy = policy or DeadlinePolicy.from_env()
+    return httpx.AsyncClient(
+        timeout=policy.limit(policy.remote_call_seconds),
+        transport=DeadlineTransport(),
+    )
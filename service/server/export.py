@@ -0,0 +1,252 @@
+"""Streaming export and import of conversations (conversation/export and
+conversation/import).
+
+A dump is gzip-compressed JSONL, one record per line:
+
+    {"type": "header", "version": 1, "exported_at": 1700000000.0}
+    {"type": "conversation", "bundle": {...}}  # see service.server.bundle
+    {"type": "task", "task": {...}}            # tasks of the conversation above
+    {"type": "conversation", "bundle": {...}}
+    ...
+
+A bundle carries the messages, events, ADK session and artifacts of its
+conversation. Conversations are exported one at a time and compressed as
+they go, and an import decompresses and applies one record at a time: the
+dump of a large node is never held in memory, only one conversation of it.
+Dumps concatenated (one per worker or shard) are a valid dump too.
+
+The selection is by ids and/or by last activity (`since` <= last_active <
+`until`, epoch seconds). On import, a conversation that already exists is
+skipped, or dropped and replaced with `replace`; tasks are added unless one
+with the same id exists.
+"""
+
+import asyncio
+import json
+import time
+import zlib
+
+from collections import defaultdict
+from collections.abc import AsyncIterable, AsyncIterator, Iterable
+from dataclasses import dataclass
+from typing import Any
+
+import httpx
+
+from a2a.types import Task
+
+from service.server.application_manager import ApplicationManager
+from service.server.metrics import metrics
+
+
+EXPORT_VERSION = 1
+# gzip container (wbits 16 + 15); on decompression 32 + 15 also takes zlib
+_GZIP = 31
+_GZIP_OR_ZLIB = 47
+
+
+@dataclass
+class Selection:
+    conversation_ids: list[str] | None = None
+    since: float | None = None
+    until: float | None = None
+
+    @classmethod
+    def from_params(cls, params: dict | None) -> 'Selection':
+        params = params or {}
+        ids = params.get('conversationIds')
+        if ids is not None and not isinstance(ids, list):
+            raise ValueError('conversationIds must be a list')
+        return cls(
+            conversation_ids=[str(i) for i in ids] if ids is not None else None,
+            since=float(params['since']) if params.get('since') is not None else None,
+            until=float(params['until']) if params.get('until') is not None else None,
+        )
+
+    def to_params(self) -> dict:
+        return {
+            'conversationIds': self.conversation_ids,
+            'since': self.since,
+            'until': self.until,
+        }
+
+    def matches(self, last_active: float | None) -> bool:
+        if self.since is None and self.until is None:
+            return True
+        if last_active is None:
+            return False
+        return (self.since is None or last_active >= self.since) and (
+            self.until is None or last_active < self.until
+        )
+
+
+def _line(record: dict) -> bytes:
+    return (json.dumps(record, separators=(',', ':')) + '\n').encode()
+
+
+def encode_records(records: Iterable[dict]) -> bytes:
+    """A small dump in one piece (e.g. one conversation sent to its owner)."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP)
+    return compressor.compress(b''.join(_line(r) for r in records)) + compressor.flush()
+
+
+async def export_stream(
+    manager: ApplicationManager, selection: Selection
+) -> AsyncIterator[bytes]:
+    """The compressed dump of the selected conversations of `manager`."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, _GZIP)
+    yield compressor.compress(
+        _line({'type': 'header', 'version': EXPORT_VERSION, 'exported_at': time.time()})
+    )
+    tasks: dict[str, list[Task]] = defaultdict(list)
+    for task in manager.tasks:
+        tasks[getattr(task, 'contextId', getattr(task, 'context_id', None))].append(task)
+    if selection.conversation_ids is not None:
+        ids = selection.conversation_ids
+    else:
+        ids = [c.conversationId for c in manager.conversations]
+    for conversationid in ids:
+        if not selection.matches(manager.last_active(conversationid)):
+            continue
+        bundle = manager.export_conversation(conversationid)
+        if bundle is None:
+            continue
+        records = [{'type': 'conversation', 'bundle': bundle}]
+        for task in tasks.get(conversationid, []):
+            wire = manager.messages.task_to_wire(task)
+            records.append(
+                {'type': 'task', 'task': wire.model_dump(mode='json', exclude_none=True)}
+            )
+        chunk = compressor.compress(b''.join(_line(r) for r in records))
+        metrics.inc('export.conversations')
+        if chunk:
+            yield chunk
+        # Let the other requests in between two conversations
+        await asyncio.sleep(0)
+    yield compressor.flush()
+
+
+async def read_records(chunks: AsyncIterable[bytes]) -> AsyncIterator[dict]:
+    """The records of a dump, decompressed as the chunks arrive."""
+    decompressor = zlib.decompressobj(_GZIP_OR_ZLIB)
+    buffer = b''
+    async for chunk in chunks:
+        while chunk:
+            if decompressor.eof:
+                # The next dump of a concatenation
+                decompressor = zlib.decompressobj(_GZIP_OR_ZLIB)
+            buffer += decompressor.decompress(chunk)
+            chunk = decompressor.unused_data if decompressor.eof else b''
+            *lines, buffer = buffer.split(b'\n')
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+    if buffer.strip():
+        yield json.loads(buffer)
+
+
+def conversation_id(record: dict) -> str | None:
+    conversation = record.get('bundle', {}).get('conversation') or {}
+    return conversation.get('conversationid') or conversation.get('conversationId')
+
+
+async def conversation_groups(
+    records: AsyncIterable[dict],
+) -> AsyncIterator[list[dict]]:
+    """The records of a dump grouped per conversation: its record, then its
+    tasks. Headers are checked and dropped."""
+    group: list[dict] = []
+    async for record in records:
+        kind = record.get('type')
+        if kind == 'header':
+            if record.get('version', 0) > EXPORT_VERSION:
+                raise ValueError(f'unsupported export version {record.get("version")}')
+            continue
+        if kind == 'conversation' and group:
+            yield group
+            group = []
+        group.append(record)
+    if group:
+        yield group
+
+
+def import_group(
+    manager: ApplicationManager,
+    group: list[dict],
+    replace: bool = False,
+    busy: set[str] | None = None,
+) -> dict[str, int]:
+    """Apply the records of one conversation to `manager`. A conversation
+    in `busy` (a message in flight) is never replaced."""
+    counts: dict[str, Any] = defaultdict(int)
+    for record in group:
+        kind = record.get('type')
+        if kind == 'conversation':
+            conversationid = conversation_id(record)
+            if manager.get_conversation(conversationid):
+                if not replace or conversationid in (busy or ()):
+                    counts['skipped'] += 1
+                    continue
+                manager.drop_conversation(conversationid)
+                counts['replaced'] += 1
+            manager.import_conversation(record['bundle'])
+            counts['conversations'] += 1
+        elif kind == 'task':
+            if manager.import_task(Task.model_validate(record['task'])):
+                counts['tasks'] += 1
+        else:
+            counts['unknown'] += 1
+    return counts
+
+
+async def concat(*streams: AsyncIterable[bytes]) -> AsyncIterator[bytes]:
+    """The streams one after the other (gzip members concatenate)."""
+    for stream in streams:
+        async for chunk in stream:
+            yield chunk
+
+
+async def remote_export(
+    http_client: httpx.AsyncClient,
+    url: str,
+    body: dict,
+    headers: dict[str, str] | None = None,
+) -> AsyncIterator[bytes]:
+    """The dump served by conversation/export at `url` (a worker, a shard),
+    as it arrives."""
+    async with http_client.stream(
+        'POST',
+        f'{url}/conversation/export',
+        json=body,
+        headers=headers,
+        timeout=httpx.Timeout(30.0, read=None),
+    ) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            yield chunk
+
+
+async def remote_import(
+    http_client: httpx.AsyncClient,
+    url: str,
+    content: bytes,
+    replace: bool = False,
+    headers: dict[str, str] | None = None,
+) -> dict[str, int]:
+    """POST a dump to conversation/import at `url`; returns its counts."""
+    response = await http_client.post(
+        f'{url}/conversation/import',
+        content=content,
+        params={'replace': 'true'} if replace else None,
+        headers={'content-type': 'application/gzip', **(headers or {})},
+    )
+    response.raise_for_status()
+    answer = response.json()
+    if answer.get('error'):
+        raise ValueError(answer['error'].get('message'))
+    return answer.get('result') or {}
+
+
+def add_counts(total: dict[str, int], counts: dict[str, int]):
+    for name, value in counts.items():
+        total[name] = total.get(name, 0) + value
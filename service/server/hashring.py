@@ -0,0 +1,62 @@
+"""Consistent hashing of keys (conversation ids) to nodes (workers).
+
+Each node is placed on the ring `replicas` times; a key belongs to the first
+node point clockwise from its own hash. Adding or removing a node only moves
+the keys between its points and the previous ones (about 1/N of them), so
+most conversations keep their owner when the number of workers changes.
+"""
+
+import bisect
+import hashlib
+
+from collections.abc import Iterable
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(
+        hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'big'
+    )
+
+
+class HashRing:
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 128):
+        self.replicas = replicas
+        self._points: list[int] = []
+        self._owners: list[str] = []
+        self._nodes: set[str] = set()
+        for node in nodes:
+            self.add(node)
+
+    @property
+    def nodes(self) -> list[str]:
+        return sorted(self._nodes)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._nodes
+
+    def add(self, node: str):
+        if node in self._nodes:
+            return
+        self._nodes.add(node)
+        for i in range(self.replicas):
+            point = _hash(f'{node}#{i}')
+            index = bisect.bisect(self._points, point)
+            self._points.insert(index, point)
+            self._owners.insert(index, node)
+
+    def remove(self, node: str):
+        if node not in self._nodes:
+            return
+        self._nodes.discard(node)
+        kept = [(p, o) for p, o in zip(self._points, self._owners) if o != node]
+        self._points = [p for p, _ in kept]
+        self._owners = [o for _, o in kept]
+
+    def owner(self, key: str) -> str:
+        if not self._points:
+            raise LookupError('empty hash ring')
+        index = bisect.bisect(self._points, _hash(key)) % len(self._points)
+        return self._owners[index]
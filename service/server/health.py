@@ -0,0 +1,120 @@
+"""Liveness and readiness probes (`GET /healthz`, `GET /readyz`).
+
+Load balancers probe often, so the handlers only read state cached by
+`HealthMonitor`: a heartbeat task that wakes every `interval_seconds`,
+measures how late it woke up (event loop lag) and runs the readiness probe
+of its owner (queue depth, storage, warm-up...). A probe never touches the
+model or the manager's lists.
+
+- /healthz: the process answers and the loop is responsive (the last beat
+  is recent and its lag is below `max_loop_lag_seconds`);
+- /readyz: alive and every readiness check of the last beat passed.
+
+Both answer 200 or 503 with the details as JSON. Every field of
+`HealthPolicy` can be set from the environment as A2A_HEALTH_<FIELD>.
+"""
+
+import asyncio
+import time
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+from service.server.metrics import metrics
+from service.server.policy import policy_from_env
+
+
+@dataclass
+class HealthPolicy:
+    interval_seconds: float = 1.0
+    max_loop_lag_seconds: float = 1.0
+    # Pending messages above which the server stops being ready
+    max_pending: int = 100
+
+    @classmethod
+    def from_env(cls) -> 'HealthPolicy':
+        return policy_from_env(cls, 'HEALTH')
+
+
+# (checks, info): each check must be True to be ready; info is reported as is
+Probe = Callable[[], Awaitable[tuple[dict[str, bool], dict[str, Any]]]]
+
+
+class HealthMonitor:
+    def __init__(self, probe: Probe, policy: HealthPolicy | None = None):
+        self.probe = probe
+        self.policy = policy or HealthPolicy.from_env()
+        self.loop_lag = 0.0
+        self.last_beat = time.monotonic()
+        self.checks: dict[str, bool] = {'started': False}
+        self.info: dict[str, Any] = {}
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def beat(self):
+        # When the loop woke up, whatever the probe then takes
+        self.last_beat = time.monotonic()
+        try:
+            checks, info = await self.probe()
+        except Exception as e:
+            checks, info = {'probe': False}, {'error': repr(e)}
+        self.checks, self.info = checks, info
+        metrics.set('health.loop_lag_seconds', self.loop_lag)
+        metrics.set('health.ready', int(self.is_ready()))
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        await self.beat()
+        while True:
+            before = loop.time()
+            await asyncio.sleep(self.policy.interval_seconds)
+            self.loop_lag = max(
+                0.0, loop.time() - before - self.policy.interval_seconds
+            )
+            await self.beat()
+
+    def is_alive(self) -> bool:
+        stale = time.monotonic() - self.last_beat
+        limit = self.policy.interval_seconds + self.policy.max_loop_lag_seconds
+        return stale <= limit and self.loop_lag <= self.policy.max_loop_lag_seconds
+
+    def is_ready(self) -> bool:
+        return self.is_alive() and all(self.checks.values())
+
+    def healthz(self) -> JSONResponse:
+        alive = self.is_alive()
+        return JSONResponse(
+            {
+                'status': 'ok' if alive else 'unavailable',
+                'loop_lag_ms': round(self.loop_lag * 1000, 1),
+                'last_beat_seconds': round(time.monotonic() - self.last_beat, 3),
+            },
+            status_code=200 if alive else 503,
+        )
+
+    def readyz(self) -> JSONResponse:
+        ready = self.is_ready()
+        return JSONResponse(
+            {
+                'status': 'ok' if ready else 'unavailable',
+                'alive': self.is_alive(),
+                'checks': self.checks,
+                **self.info,
+            },
+            status_code=200 if ready else 503,
+        )
@@ -0,0 +1,62 @@
+"""Idempotent message/send.
+
+The UI picks the message id on the client and some paths retry the POST on
+network errors. Without this, a retry starts a second `process_message`
+for the same id and pays for a second model run. `RecentSends` remembers
+the `MessageInfo` answered for every id accepted in the last
+`window_seconds` (at most `max_entries` of them, oldest dropped first); a
+send with one of those ids, with the id of a run still in flight or of a
+message the manager already stores, gets the same answer back and nothing
+is processed again (`messages.duplicates`).
+
+Only sends that carry their own `messageId` can be recognised. Every field
+can be set from the environment as A2A_IDEMPOTENCY_<FIELD>.
+"""
+
+import time
+
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from service.server.policy import policy_from_env
+from service.types import MessageInfo
+
+
+@dataclass
+class IdempotencyPolicy:
+    window_seconds: float = 600.0
+    max_entries: int = 10_000
+
+    @classmethod
+    def from_env(cls) -> 'IdempotencyPolicy':
+        return policy_from_env(cls, 'IDEMPOTENCY')
+
+
+class RecentSends:
+    def __init__(self, policy: IdempotencyPolicy | None = None):
+        self.policy = policy or IdempotencyPolicy.from_env()
+        # message id -> (accepted at, answer), oldest first
+        self._sends: OrderedDict[str, tuple[float, MessageInfo]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sends)
+
+    def get(self, messageid: str, now: float | None = None) -> MessageInfo | None:
+        self._expire(time.monotonic() if now is None else now)
+        entry = self._sends.get(messageid)
+        return entry[1] if entry else None
+
+    def add(self, info: MessageInfo, now: float | None = None):
+        now = time.monotonic() if now is None else now
+        self._sends[info.messageId] = (now, info)
+        self._sends.move_to_end(info.messageId)
+        while len(self._sends) > self.policy.max_entries:
+            self._sends.popitem(last=False)
+
+    def _expire(self, now: float):
+        horizon = now - self.policy.window_seconds
+        while self._sends:
+            accepted, _ = next(iter(self._sends.values()))
+            if accepted >= horizon:
+                return
+            self._sends.popitem(last=False)
@@ -1,12 +1,17 @@
 import asyncio
 import datetime
+import random
+import time
 import uuid
 
+from dataclasses import dataclass, field
+
 from a2a.types import (
     AgentCard,
     Artifact,
     DataPart,
-    Message,
+    FilePart,
+    FileWithUri,
     Part,
     Role,
     Task,
@@ -16,9 +21,66 @@ from a2a.types import (
 )
 from utils.agent_card import get_agent_card
 
-from service.server import test_image
 from service.server.application_manager import ApplicationManager
-from service.types import Conversation, Event
+from service.server.bundle import (
+    BUNDLE_VERSION,
+    decode_conversation,
+    decode_event,
+    decode_message,
+    encode_conversation,
+    encode_event,
+    encode_message,
+)
+from service.server.deadlines import DeadlinePolicy
+from service.server.message_store import (
+    ConversationIndex,
+    EventRecord,
+    MessageStore,
+    task_context_id,
+)
+from service.server.normalize import normalize_message
+from service.server.policy import policy_from_env
+from service.server.retention import (
+    FirstSeen,
+    RetentionPolicy,
+    approx_size,
+    idle_conversations,
+    task_finished,
+    trim_events,
+)
+from service.server.tracing import tracer
+from service.types import Conversation, Message, patch_a2a_message
+
+
+@dataclass
+class SimulationConfig:
+    """Knobs of the simulated agent.
+
+    Every field can be set from the environment as A2A_SIM_<FIELD> (for
+    example A2A_SIM_LATENCY_SECONDS=0.2). Random choices are seeded with the
+    message id, so the same message always gets the same simulated reply.
+    """
+
+    # Response latency: uniform in latency_seconds ± latency_jitter_seconds
+    latency_seconds: float = 0.5
+    latency_jitter_seconds: float = 0.0
+    # Chance that a message is handled as a task (shown in the task list)
+    task_probability: float = 0.3
+    # Chance that a task produces an artifact with the response
+    artifact_probability: float = 0.5
+    # Chance of answering with a form / an image instead of text
+    form_probability: float = 0.1
+    image_probability: float = 0.1
+    # States a task goes through before it completes, one step each
+    task_states: list[str] = field(
+        default_factory=lambda: ['submitted', 'working', 'completed']
+    )
+    task_step_seconds: float = 0.1
+    seed: int = 0
+
+    @classmethod
+    def from_env(cls) -> 'SimulationConfig':
+        return policy_from_env(cls, 'SIM')
 
 
 class InMemoryFakeAgentManager(ApplicationManager):
@@ -27,30 +89,44 @@ class InMemoryFakeAgentManager(ApplicationManager):
     This implements the interface of the ApplicationManager to plug into
     the AgentServer. This acts as the service contract that the Mesop app
     uses to send messages to the agent and provide information for the frontend.
+
+    Replies are simulated according to a SimulationConfig (latency, tasks with
+    state progressions, artifacts, forms and images), which makes this manager
+    a stand-in for load testing the UI and server without the ADK.
     """
 
     _conversations: list[Conversation]
-    _messages: list[Message]
     _tasks: list[Task]
-    _events: list[Event]
+    _events: list[EventRecord]
     _pending_messageids: list[str]
-    _next_message_idx: int
     _agents: list[AgentCard]
 
-    def __init__(self):
+    def __init__(self, config: SimulationConfig | None = None):
+        patch_a2a_message()
+        self.config = config or SimulationConfig.from_env()
         self._conversations = []
-        self._messages = []
+        self._conversation_index: dict[str, Conversation] = {}
+        self.messages = MessageStore()
         self._tasks = []
+        self._task_index: dict[str, Task] = {}
         self._events = []
+        # The same events by conversation (publish, export)
+        self._events_index = ConversationIndex()
+        self._tasks_index = ConversationIndex()
         self._pending_messageids = []
-        self._next_message_idx = 0
         self._agents = []
-        self._task_map = {}
+        self._task_map: dict[str, str] = {}
+        self._finished_tasks = FirstSeen()
+        self._last_active: dict[str, float] = {}
 
-    def create_conversation(self) -> Conversation:
-        conversationid = str(uuid.uuid4())
+    async def create_conversation(
+        self, conversationid: str | None = None
+    ) -> Conversation:
+        conversationid = conversationid or str(uuid.uuid4())
         c = Conversation(conversationid=conversationid, isactive=True)
         self._conversations.append(c)
+        self._conversation_index[conversationid] = c
+        self._last_active[conversationid] = time.time()
         return c
 
     def sanitize_message(self, message: Message) -> Message:
@@ -58,161 +134,362 @@ class InMemoryFakeAgentManager(ApplicationManager):
         if not conversation:
             return message
         # Check if the last event in the conversation was tied to a task.
-        if conversation.messages:
-            if conversation.messages[-1].taskId and task_still_open(
-                next(
-                    filter(
-                        lambda x: x.id == conversation.messages[-1].taskId,
-                        self._tasks,
-                    ),
-                    None,
-                )
-            ):
-                message.taskId = conversation.messages[-1].taskId
-
+        if conversation.messageIds:
+            taskid = self.messages.get(conversation.messageIds[-1]).taskId
+            if taskid and task_still_open(self._task_index.get(taskid)):
+                message.taskId = taskid
         return message
 
     async def process_message(self, message: Message):
-        self._messages.append(message)
-        messageid = message.messageId
+        with tracer.span(
+            'process_message', trace_id=message.messageId, manager='in_memory'
+        ):
+            await self._simulate(message)
+
+    def _receive(self, message: Message) -> Message:
+        """Store the user message, mark it pending and add it to its
+        conversation."""
+        message = self.messages.add(normalize_message(message))
+        if message.messageId:
+            self._pending_messageids.append(message.messageId)
         contextid = message.contextId or ''
-        taskid = message.taskId or ''
-        if messageid:
-            self._pending_messageids.append(messageid)
         conversation = self.get_conversation(contextid)
         if conversation:
-            conversation.messages.append(message)
-        self._events.append(
-            Event(
-                id=str(uuid.uuid4()),
-                actor='host',
-                content=message,
-                timestamp=datetime.datetime.utcnow().timestamp(),
+            conversation.messageIds.append(message.messageId)
+            self._last_active[contextid] = time.time()
+        self.add_event(self.make_event('user', message))
+        return message
+
+    async def _simulate(self, message: Message):
+        config = self.config
+        messageid = message.messageId
+        contextid = message.contextId or ''
+        rng = random.Random(f'{config.seed}:{messageid}')
+        message = self._receive(message)
+        conversation = self.get_conversation(contextid)
+
+        task = self._task_index.get(message.taskId or '')
+        if task:
+            # Resuming an open task (see sanitize_message)
+            self.messages.add_to_history(task.id, message)
+            self._task_map[messageid] = task.id
+        elif rng.random() < config.task_probability:
+            task = Task(
+                id=message.taskId or str(uuid.uuid4()),
+                context_id=contextid,
+                status=TaskStatus(state=TaskState.submitted, message=message),
             )
-        )
-        # Now actually process the message. If the response is async, return None
-        # for the message response and the updated message information for the
-        # incoming message (with ids attached).
-        task = Task(
-            id=taskid,
-            contextid=context_id,
-            status=TaskStatus(
-                state=TaskState.submitted,
-                message=message,
-            ),
-            history=[message],
-        )
-        if self._next_message_idx != 0:
             self.add_task(task)
-        await asyncio.sleep(self._next_message_idx)
-        response = self.next_message()
-        if conversation:
-            conversation.messages.append(response)
-        self._events.append(
-            Event(
-                id=str(uuid.uuid4()),
-                actor='host',
-                content=response,
-                timestamp=datetime.datetime.utcnow().timestamp(),
+            self.messages.add_to_history(task.id, message)
+            self._task_map[messageid] = task.id
+
+        try:
+            delay = max(
+                0.0,
+                rng.uniform(
+                    config.latency_seconds - config.latency_jitter_seconds,
+                    config.latency_seconds + config.latency_jitter_seconds,
+                ),
             )
-        )
-        self._pending_messageids.remove(messageid)
-        # Now clean up the task
-        if task:
-            task.status.state = TaskState.completed
-            task.artifacts = [
-                Artifact(
-                    name='response',
-                    parts=response.parts,
-                    artifact_id=str(uuid.uuid4()),
+            if task:
+                # Intermediate states before the final one
+                for state in config.task_states[:-1]:
+                    await asyncio.sleep(config.task_step_seconds)
+                    self.update_task_state(task, TaskState(state), contextid)
+            await asyncio.sleep(delay)
+
+            response = self.messages.add(
+                normalize_message(self.make_response(message, rng, task))
+            )
+            if conversation:
+                conversation.messageIds.append(response.messageId)
+            self.add_event(self.make_event('host', response))
+
+            if task:
+                if rng.random() < config.artifact_probability:
+                    task.artifacts = [
+                        Artifact(
+                            name='response',
+                            parts=response.parts,
+                            artifact_id=str(uuid.uuid4()),
+                        )
+                    ]
+                self.messages.add_to_history(task.id, response)
+                final_state = (
+                    config.task_states[-1] if config.task_states else 'completed'
                 )
-            ]
-            if not task.history:
-                task.history = [response]
-            else:
-                task.history.append(response)
-            self.update_task(task)
+                task.status = TaskStatus(
+                    state=TaskState(final_state), message=response
+                )
+        finally:
+            if messageid in self._pending_messageids:
+                self._pending_messageids.remove(messageid)
+
+    def make_response(
+        self, message: Message, rng: random.Random, task: Task | None
+    ) -> Message:
+        contextid = message.contextId or ''
+        roll = rng.random()
+        if roll < self.config.form_probability:
+            parts = [Part(root=DataPart(data=make_form()))]
+        elif roll < self.config.form_probability + self.config.image_probability:
+            parts = [make_image_part()]
+        else:
+            parts = [Part(root=TextPart(text=rng.choice(_text_replies)))]
+        return Message(
+            role=Role.agent,
+            parts=parts,
+            contextId=contextid,
+            taskId=task.id if task else None,
+            messageId=str(uuid.uuid4()),
+        )
+
+    def update_task_state(self, task: Task, state: TaskState, contextid: str):
+        status_message = Message(
+            role=Role.agent,
+            parts=[Part(root=TextPart(text=f'Tarefa {state.value}...'))],
+            contextId=contextid,
+            taskId=task.id,
+            messageId=str(uuid.uuid4()),
+        )
+        task.status = TaskStatus(state=state, message=status_message)
+        self.messages.add_to_history(task.id, status_message)
+        self.add_event(self.make_event('agent', status_message))
 
     def add_task(self, task: Task):
-        self._tasks.append(task)
+        self._tasks.append(self.messages.intern_task(task))
+        self._task_index[task.id] = task
+        self._tasks_index.add(task, task_context_id(task))
 
     def update_task(self, task: Task):
         for i, t in enumerate(self._tasks):
             if t.id == task.id:
-                self._tasks[i] = task
+                self._tasks[i] = self.messages.intern_task(task)
+                self._task_index[task.id] = task
+                self._tasks_index.add(task, task_context_id(task))
                 return
 
-    def add_event(self, event: Event):
+    def make_event(self, actor: str, message: Message) -> EventRecord:
+        return self.messages.record_event(
+            str(uuid.uuid4()),
+            actor,
+            message,
+            datetime.datetime.utcnow().timestamp(),
+        )
+
+    def add_event(self, event: EventRecord):
         self._events.append(event)
+        self._events_index.add(event, self._event_context(event))
 
-    def next_message(self) -> Message:
-        message = _message_queue[self._next_message_idx]
-        self._next_message_idx = (self._next_message_idx + 1) % len(
-            _message_queue
-        )
-        return message
+    def conversation_events(self, conversationid: str | None) -> list[EventRecord]:
+        return self._events_index.get(conversationid)
+
+    def conversation_tasks(self, conversationid: str | None) -> list[Task]:
+        return self._tasks_index.get(conversationid)
+
+    def _event_context(self, event: EventRecord) -> str | None:
+        return getattr(self.messages.get(event.messageId), 'contextId', None)
 
     def get_conversation(
         self, conversationid: str | None
     ) -> Conversation | None:
         if not conversationid:
             return None
-        return next(
-            filter(
-                lambda c: c and c.conversationId == conversationid,
-                self._conversations,
-            ),
-            None,
-        )
+        return self._conversation_index.get(conversationid)
+
+    def pending_count(self) -> int:
+        return len(self._pending_messageids)
+
+    def abort_pending(
+        self,
+        reason: str,
+        state: TaskState = TaskState.failed,
+        messageids: list[str] | None = None,
+    ) -> list[str]:
+        aborted = [
+            m
+            for m in self._pending_messageids
+            if messageids is None or m in messageids
+        ]
+        for messageid in aborted:
+            self._pending_messageids.remove(messageid)
+            contextid = getattr(self.messages.get(messageid), 'contextId', None)
+            task = self._task_index.get(self._task_map.get(messageid, ''))
+            response = self.messages.add(
+                normalize_message(
+                    Message(
+                        role=Role.agent,
+                        parts=[Part(root=TextPart(text=reason))],
+                        contextId=contextid,
+                        taskId=task.id if task else None,
+                        messageId=str(uuid.uuid4()),
+                    )
+                )
+            )
+            conversation = self.get_conversation(contextid)
+            if conversation:
+                conversation.messageIds.append(response.messageId)
+            self.add_event(self.make_event('host', response))
+            if task and task_still_open(task):
+                task.status = TaskStatus(state=state, message=response)
+                self.messages.add_to_history(task.id, response)
+        return aborted
+
+    def fail_unstarted(self, message: Message, reason: str) -> bool:
+        if not message.messageId or message.messageId in self._pending_messageids:
+            return False
+        self._receive(message)
+        return bool(self.abort_pending(reason, messageids=[message.messageId]))
 
     def get_pending_messages(self) -> list[tuple[str, str]]:
         rval: list[tuple[str, str]] = []
-        for messageid in self._pending_messageids:
-            if messageid in self._task_map:
-                taskid = self._task_map[messageid]
-                task = next(
-                    filter(lambda x: x.id == taskid, self._tasks), None
-                )
-                if not task:
-                    rval.append((messageid, ''))
-                elif task.history and task.history[-1].parts:
-                    if len(task.history) == 1:
-                        rval.append((messageid, 'Pensando...'))
-                    else:
-                        part = task.history[-1].parts[0]
-                        # Handle both dict and object formats
-                        if isinstance(part, dict):
-                            if 'root' in part:
-                                p = part['root']
-                            else:
-                                p = part
-                        elif hasattr(part, 'root'):
-                            p = part.root
-                        else:
-                            p = part
-                            
-                        # Get text content safely
-                        text = None
-                        if hasattr(p, 'text') or (isinstance(p, dict) and 'text' in p):
-                            text = p.get('text') if isinstance(p, dict) else getattr(p, 'text', None)
-                        
-                        rval.append(
-                            (
-                                messageid,
-                                text if text else 'Pensando...',
-                            )
-                        )
-            else:
+        for messageid in list(self._pending_messageids):
+            taskid = self._task_map.get(messageid, '')
+            history = self.messages.history(taskid)
+            last = self.messages.get(history[-1]) if history else None
+            if not self._task_index.get(taskid) or not last or not last.parts:
                 rval.append((messageid, ''))
-            return rval
-        return [(x, '') for x in self._pending_messageids]
+            elif len(history) == 1:
+                rval.append((messageid, 'Pensando...'))
+            else:
+                part = last.parts[0]
+                text = getattr(getattr(part, 'root', part), 'text', None)
+                rval.append((messageid, text if text else 'Pensando...'))
+        return rval
+
+    async def prune(
+        self, policy: RetentionPolicy, now: float
+    ) -> dict[str, int]:
+        pending = set(self._pending_messageids)
+        busy = {getattr(self.messages.get(m), 'contextId', None) for m in pending}
+        idle = idle_conversations(
+            self._conversations,
+            self._last_active,
+            busy,
+            policy.conversation_ttl_seconds,
+            now,
+        )
+        for conversation in idle:
+            del self._conversation_index[conversation.conversationId]
+            self._last_active.pop(conversation.conversationId, None)
+        self._conversations = list(self._conversation_index.values())
+        dropped_conversations = {c.conversationId for c in idle}
+
+        expired = [
+            t
+            for t in self._tasks
+            if task_finished(t)
+            and self._finished_tasks.age(t.id, now) > policy.task_ttl_seconds
+        ]
+        for task in expired:
+            self.messages.drop_history(task.id)
+            del self._task_index[task.id]
+        self._tasks_index.discard(expired)
+        self._tasks = [t for t in self._tasks if t.id in self._task_index]
+        self._finished_tasks.retain(self._task_index)
+
+        stale = [
+            m
+            for m, t in self._task_map.items()
+            if t not in self._task_index and m not in pending
+        ]
+        for messageid in stale:
+            del self._task_map[messageid]
+
+        self._events, dropped_events = trim_events(
+            self._events,
+            self.messages,
+            policy.events_per_conversation,
+            dropped_conversations,
+        )
+        self._events_index.rebuild((e, self._event_context(e)) for e in self._events)
+
+        keep = set(pending)
+        for conversation in self._conversations:
+            keep.update(conversation.messageIds)
+        keep.update(e.messageId for e in self._events)
+        for task in self._tasks:
+            keep.update(self.messages.history(task.id))
+            if task.status.message:
+                keep.add(task.status.message.messageId)
+        dropped = self.messages.prune(keep)
+        return {
+            'conversations': len(idle),
+            'tasks': len(expired),
+            'task_map': len(stale),
+            'events': len(dropped_events),
+            'messages': len(dropped),
+            'bytes': approx_size([*idle, *expired, *dropped_events, *dropped]),
+        }
+
+    def export_conversation(self, conversationid: str) -> dict | None:
+        """Bundle (see service.server.bundle) of a conversation; the
+        simulation has no ADK session nor artifacts."""
+        conversation = self._conversation_index.get(conversationid)
+        if conversation is None:
+            return None
+        events = self._events_index.get(conversationid)
+        ids = dict.fromkeys(
+            [*conversation.messageIds, *(e.messageId for e in events)]
+        )
+        return {
+            'version': BUNDLE_VERSION,
+            'conversation': encode_conversation(conversation),
+            'messages': [encode_message(m) for m in self.messages.resolve(ids)],
+            'events': [encode_event(e) for e in events],
+            'session': None,
+            'artifacts': {},
+            'last_active': self._last_active.get(conversationid, time.time()),
+        }
+
+    def import_conversation(self, bundle: dict) -> Conversation:
+        conversation = decode_conversation(bundle['conversation'])
+        conversationid = conversation.conversationId
+        for data in bundle['messages']:
+            self.messages.add(decode_message(data))
+        for data in bundle['events']:
+            self.add_event(decode_event(data))
+        self._conversations.append(conversation)
+        self._conversation_index[conversationid] = conversation
+        self._last_active[conversationid] = bundle.get('last_active') or time.time()
+        return conversation
+
+    def drop_conversation(self, conversationid: str) -> list:
+        conversation = self._conversation_index.pop(conversationid, None)
+        if conversation is None:
+            return []
+        self._conversations = list(self._conversation_index.values())
+        self._last_active.pop(conversationid, None)
+        keep = set(self._pending_messageids)
+        for task in self._tasks:
+            keep.update(self.messages.history(task.id))
+        events = self._events_index.pop(conversationid)
+        dropped = {e.id for e in events}
+        self._events = [e for e in self._events if e.id not in dropped]
+        ids = {*conversation.messageIds, *(e.messageId for e in events)} - keep
+        return [conversation, *events, *self.messages.discard(ids)]
+
+    def last_active(self, conversationid: str) -> float | None:
+        return self._last_active.get(conversationid)
+
+    def import_task(self, task: Task) -> bool:
+        if task.id in self._task_index:
+            return False
+        self.add_task(task)
+        return True
 
     def register_agent(self, url):
-        agent_data = get_agent_card(url)
+        deadlines = DeadlinePolicy.from_env()
+        agent_data = get_agent_card(
+            url, deadlines.limit(deadlines.remote_call_seconds)
+        )
         if not agent_data.url:
             agent_data.url = url
         self._agents.append(agent_data)
 
+    def add_agents(self, cards: list[AgentCard]):
+        self._agents.extend(cards)
+
     @property
     def agents(self) -> list[AgentCard]:
         return self._agents
@@ -226,67 +503,62 @@ class InMemoryFakeAgentManager(ApplicationManager):
         return self._tasks
 
     @property
-    def events(self) -> list[Event]:
-        return []
-
-
-_contextId = str(uuid.uuid4())
-
-# This represents the precanned responses that will be returned in order.
-# Extend this list to test more functionality of the UI
-_message_queue: list[Message] = [
-    Message(
-        role=Role.agent,
-        parts=[Part(root=TextPart(text='Hello'))],
-        context_id=_contextId,
-        message_id=str(uuid.uuid4()),
-    ),
-    Message(
-        role=Role.agent,
-        parts=[
-            Part(
-                root=DataPart(
-                    data={
-                        'type': 'form',
-                        'form': {
-                            'type': 'object',
-                            'properties': {
-                                'name': {
-                                    'type': 'string',
-                                    'description': 'Enter your name',
-                                    'title': 'Name',
-                                },
-                                'date': {
-                                    'type': 'string',
-                                    'format': 'date',
-                                    'description': 'Birthday',
-                                    'title': 'Birthday',
-                                },
-                            },
-                            'required': ['date'],
-                        },
-                        'form_data': {
-                            'name': 'John Smith',
-                        },
-                        'instructions': 'Please provide your birthday and name',
-                    }
-                )
+    def events(self) -> list[EventRecord]:
+        return self._events
+
+
+def task_still_open(task: Task | None) -> bool:
+    if not task:
+        return False
+    return task.status.state in [
+        TaskState.submitted,
+        TaskState.working,
+        TaskState.input_required,
+    ]
+
+
+def make_form() -> dict:
+    return {
+        'type': 'form',
+        'form': {
+            'type': 'object',
+            'properties': {
+                'name': {
+                    'type': 'string',
+                    'description': 'Enter your name',
+                    'title': 'Name',
+                },
+                'date': {
+                    'type': 'string',
+                    'format': 'date',
+                    'description': 'Birthday',
+                    'title': 'Birthday',
+                },
+            },
+            'required': ['date'],
+        },
+        'form_data': {
+            'name': 'John Smith',
+        },
+        'instructions': 'Please provide your birthday and name',
+    }
+
+
+def make_image_part() -> Part:
+    return Part(
+        root=FilePart(
+            file=FileWithUri(
+                name='a2a-banner.png',
+                mime_type='image/png',
+                uri='https://a2a-protocol.org/latest/assets/a2a-banner.png',
             ),
-        ],
-        context_id=_contextId,
-        message_id=str(uuid.uuid4()),
-    ),
-    Message(
-        role=Role.agent,
-        parts=[Part(root=TextPart(text='I like cats'))],
-        context_id=_contextId,
-        message_id=str(uuid.uuid4()),
-    ),
-    test_image.make_test_image(_contextId),
-    Message(
-        role=Role.agent,
-        parts=[Part(root=TextPart(text='And I like dogs'))],
-        context_id=_contextId,
-        message_id=str(uuid.uuid4()),
-    ),
+        )
+    )
+
+
+# Precanned text replies; extend this list to test more of the UI
+_text_replies = [
+    'Hello',
+    'I like cats',
+    'And I like dogs',
 ]
@@ -0,0 +1,58 @@
+"""Compact message type for messages produced by the server itself.
+
+`service.types.Message` validates every field, normalizes aliases in
+`__init__` and re-validates on assignment. That is what the HTTP ingress
+needs, but the messages the managers build from ADK events and task updates
+are already well formed, and paying the pydantic cost for each of them adds
+up (several per turn, plus one per streamed event).
+
+`InternalMessage` is a slotted dataclass with the same attribute names, so
+code reading `messageId`, `taskId`, `parts`... works on both. It is turned
+into the pydantic wire model only when a response is serialized, with
+`model_construct` (no re-validation of trusted data).
+"""
+
+import uuid
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from a2a.types import Part, Role
+
+from service.types import Message
+
+
+@dataclass(slots=True)
+class InternalMessage:
+    parts: list[Part] = field(default_factory=list)
+    role: Role = Role.agent
+    contextId: str | None = None
+    taskId: str | None = None
+    messageId: str = field(default_factory=lambda: str(uuid.uuid4()))
+    metadata: dict[str, Any] | None = None
+    version: int = 0
+
+    def to_wire(self) -> Message:
+        return Message.model_construct(
+            messageId=self.messageId,
+            contextId=self.contextId,
+            taskId=self.taskId,
+            role=self.role,
+            parts=list(self.parts),
+            metadata=self.metadata,
+            version=self.version,
+        )
+
+
+def to_wire(message):
+    """Pydantic Message for a stored message (internal or not)."""
+    if isinstance(message, InternalMessage):
+        return message.to_wire()
+    return message
+
+
+def get_message_id(m) -> str | None:
+    if not m or not m.metadata:
+        return None
+    # Tentar messageId primeiro (padrão), depois messageid (compatibilidade)
+    return m.metadata.get('messageId', m.metadata.get('messageid', None))
@@ -0,0 +1,181 @@
+"""Single store for the messages a manager knows about.
+
+A message used to live in the manager's message list, in
+`conversation.messages`, inside `Event.content` and inside `task.history`,
+sometimes as the same object and sometimes as a copy. Now the store holds the
+only reference, keyed by messageId; conversations (`messageIds`), events
+(`EventRecord.messageId`) and task histories keep ids, and the full messages
+are put back only when a response is serialized (the `*_to_wire` methods).
+
+The first object stored for an id is the canonical one: a copy of the same
+message arriving later (e.g. echoed back in a remote task's history) is
+dropped in favour of the stored object.
+"""
+
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from a2a.types import Task
+
+from service.server.internal_message import InternalMessage, to_wire
+from service.types import Conversation, Event, Message
+
+
+@dataclass(slots=True)
+class EventRecord:
+    id: str
+    actor: str
+    messageId: str
+    timestamp: float
+
+
+class MessageStore:
+    def __init__(self):
+        self._messages: dict[str, Message | InternalMessage] = {}
+        # task id -> ids of the messages in its history, in order
+        self._task_history: dict[str, list[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __contains__(self, messageid: str) -> bool:
+        return messageid in self._messages
+
+    def __iter__(self) -> Iterator[Message | InternalMessage]:
+        return iter(self._messages.values())
+
+    def add(self, message):
+        """Store `message` and return the canonical object for its id."""
+        return self._messages.setdefault(message.messageId, message)
+
+    def get(self, messageid: str | None):
+        if not messageid:
+            return None
+        return self._messages.get(messageid)
+
+    def resolve(self, messageids: Iterable[str]) -> list:
+        messages = []
+        for messageid in messageids:
+            message = self._messages.get(messageid)
+            if message is not None:
+                messages.append(message)
+        return messages
+
+    def record_event(
+        self, event_id: str, actor: str, message, timestamp: float
+    ) -> EventRecord:
+        self.add(message)
+        return EventRecord(event_id, actor, message.messageId, timestamp)
+
+    def add_to_history(self, taskid: str, message) -> bool:
+        """Append `message` to the task history; False if already there."""
+        self.add(message)
+        history = self._task_history.setdefault(taskid, [])
+        if message.messageId in history:
+            return False
+        history.append(message.messageId)
+        return True
+
+    def history(self, taskid: str) -> list[str]:
+        return self._task_history.get(taskid, [])
+
+    def drop_history(self, taskid: str) -> list[str]:
+        """Forget the history of a task; its messages stay until pruned."""
+        return self._task_history.pop(taskid, [])
+
+    def discard(self, messageids: Iterable[str]) -> list:
+        """Remove the given messages; return the ones that were stored."""
+        return [
+            m
+            for m in (self._messages.pop(i, None) for i in messageids)
+            if m is not None
+        ]
+
+    def prune(self, keep: set[str]) -> list:
+        """Remove every message whose id is not in `keep`; return them."""
+        ids = [i for i in self._messages if i not in keep]
+        return [self._messages.pop(i) for i in ids]
+
+    def intern_task(self, task: Task) -> Task:
+        """Move the messages of `task.history` into the store."""
+        for message in task.history or []:
+            self.add_to_history(task.id, message)
+        if task.status and task.status.message:
+            self.add(task.status.message)
+        task.history = None
+        return task
+
+    # Serialization: resolve the id references into wire models
+
+    def conversation_to_wire(self, conversation: Conversation) -> Conversation:
+        return conversation.model_copy(
+            update={
+                'messages': [
+                    to_wire(m) for m in self.resolve(conversation.messageIds)
+                ]
+            }
+        )
+
+    def event_to_wire(self, event: EventRecord) -> Event:
+        return Event.model_construct(
+            id=event.id,
+            actor=event.actor,
+            content=to_wire(self._messages.get(event.messageId)),
+            timestamp=event.timestamp,
+        )
+
+    def task_to_wire(self, task: Task) -> Task:
+        history = self.history(task.id)
+        if not history:
+            return task
+        return task.model_copy(
+            update={'history': [to_wire(m) for m in self.resolve(history)]}
+        )
+
+
+def task_context_id(task: Task) -> str | None:
+    return getattr(task, 'contextId', getattr(task, 'context_id', None))
+
+
+class ConversationIndex:
+    """Items with an `id` (events, tasks) by conversation, kept by the
+    managers next to their lists so the items of one conversation are found
+    without a scan over all of them."""
+
+    def __init__(self):
+        self._items: dict[str | None, dict[str, object]] = {}
+        self._context: dict[str, str | None] = {}
+
+    def add(self, item, contextid: str | None):
+        self.discard([item])
+        self._items.setdefault(contextid, {})[item.id] = item
+        self._context[item.id] = contextid
+
+    def get(self, contextid: str | None) -> list:
+        return list(self._items.get(contextid, {}).values())
+
+    def contexts(self) -> list[str | None]:
+        return list(self._items)
+
+    def discard(self, items: Iterable):
+        for item in items:
+            if item.id not in self._context:
+                continue
+            contextid = self._context.pop(item.id)
+            bucket = self._items[contextid]
+            del bucket[item.id]
+            if not bucket:
+                del self._items[contextid]
+
+    def pop(self, contextid: str | None) -> list:
+        items = list(self._items.pop(contextid, {}).values())
+        for item in items:
+            del self._context[item.id]
+        return items
+
+    def rebuild(self, items: Iterable[tuple[object, str | None]]):
+        """Index (item, contextid) pairs instead of the current items."""
+        self._items.clear()
+        self._context.clear()
+        for item, contextid in items:
+            self.add(item, contextid)
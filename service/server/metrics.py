@@ -0,0 +1,79 @@
+"""In-process counters, gauges and timings for the conversation server.
+
+Kept deliberately small: names are free-form strings (`gc.sweeps`,
+`gc.reclaimed_bytes`...), values live in memory and `snapshot()` returns a
+JSON-serializable dict, served by the `metrics/get` JSON-RPC method.
+
+Timings keep the last `window` samples per name, enough for p50/p95 without
+growing with the uptime of the server.
+"""
+
+import math
+import threading
+
+from collections import deque
+
+
+class Metrics:
+    def __init__(self, window: int = 1024):
+        self._window = window
+        self._lock = threading.Lock()
+        self._counters: dict[str, float] = {}
+        self._gauges: dict[str, float] = {}
+        self._timings: dict[str, deque[float]] = {}
+        self._timing_counts: dict[str, int] = {}
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set(self, name: str, value: float):
+        with self._lock:
+            self._gauges[name] = value
+
+    def observe(self, name: str, value: float):
+        with self._lock:
+            samples = self._timings.get(name)
+            if samples is None:
+                samples = self._timings[name] = deque(maxlen=self._window)
+            samples.append(value)
+            self._timing_counts[name] = self._timing_counts.get(name, 0) + 1
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._timings.clear()
+            self._timing_counts.clear()
+
+    def get(self, name: str, default: float = 0) -> float:
+        with self._lock:
+            return self._counters.get(name, self._gauges.get(name, default))
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            timings = {}
+            for name, samples in self._timings.items():
+                ordered = sorted(samples)
+                timings[name] = {
+                    'count': self._timing_counts[name],
+                    'p50': _percentile(ordered, 50),
+                    'p95': _percentile(ordered, 95),
+                    'max': ordered[-1] if ordered else 0.0,
+                }
+            return {
+                'counters': dict(self._counters),
+                'gauges': dict(self._gauges),
+                'timings': timings,
+            }
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    # Nearest rank
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return round(ordered[rank], 6)
+
+
+metrics = Metrics()
@@ -0,0 +1,57 @@
+"""Canonical form of stored messages.
+
+Messages reach the server as JSON (parts as plain dicts, role as a string)
+or are built by the managers (typed parts, Role enum). They are normalized
+once, when they are stored, so every later reader can rely on typed `Part`
+objects and a `Role` enum instead of re-detecting both on every poll.
+
+`version` is set to 1 when a message is stored. Stored messages are not
+edited afterwards: the store keeps the first object seen for an id, and
+readers that need a changed message (e.g. cache_content replacing file
+parts) work on a copy. So (messageId, version) identifies the content and
+consumers can memoize conversions on it. An edit made in place would have to
+bump `version`.
+"""
+
+from typing import Any
+
+from a2a.types import Part, Role
+
+
+_AGENT_ROLES = {'agent', 'model', 'assistant'}
+
+
+def normalize_role(role: Any, has_task: bool = False) -> Role:
+    if isinstance(role, Role):
+        return role
+    name = getattr(role, 'name', role)
+    if isinstance(name, str):
+        name = name.lower()
+        if name == 'user':
+            return Role.user
+        if name in _AGENT_ROLES:
+            return Role.agent
+    # No usable role: messages tied to a task come from agents
+    return Role.agent if has_task else Role.user
+
+
+def normalize_part(part: Any) -> Part:
+    if isinstance(part, Part):
+        return part
+    if isinstance(part, dict):
+        return Part.model_validate(part.get('root', part))
+    # A bare TextPart/DataPart/FilePart
+    return Part(root=part)
+
+
+def normalize_message(message):
+    """Normalize a message in place and return it."""
+    parts = message.parts or []
+    if not all(isinstance(p, Part) for p in parts):
+        message.parts = [normalize_part(p) for p in parts]
+    role = normalize_role(message.role, bool(message.taskId))
+    if message.role is not role:
+        message.role = role
+    if not message.version:
+        message.version = 1
+    return message
@@ -0,0 +1,46 @@
+"""Policies read from the environment.
+
+The settings of the server (AdmissionPolicy, DeadlinePolicy, HealthPolicy,
+IdempotencyPolicy, RetentionPolicy, SnapshotPolicy, WarmupPolicy,
+SimulationConfig, TracePolicy) are dataclasses of plain fields with
+defaults, and every field can be set as A2A_<PREFIX>_<FIELD>.
+`policy_from_env` reads them all the same way: booleans accept 1/true/yes/on
+(anything else is false), lists are comma separated and other fields take
+the type of their default.
+
+ClusterConfig and A2A_SHARD_URLS are not settings: main.py writes them for
+the worker and shard processes it starts, and they are read where used.
+"""
+
+import os
+
+from dataclasses import fields
+from typing import Any, TypeVar
+
+
+P = TypeVar('P')
+
+_TRUE = ('1', 'true', 'yes', 'on')
+
+
+def parse_value(default: Any, value: Any) -> Any:
+    """`value` (a string from the environment, or a JSON value) as the type
+    of `default`."""
+    if not isinstance(value, str):
+        return type(default)(value)
+    if isinstance(default, bool):
+        return value.strip().lower() in _TRUE
+    if isinstance(default, list):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return type(default)(value)
+
+
+def policy_from_env(cls: type[P], prefix: str) -> P:
+    """A `cls()` with the fields set in the environment as
+    A2A_<prefix>_<FIELD> applied."""
+    policy = cls()
+    for f in fields(cls):
+        value = os.environ.get(f'A2A_{prefix}_{f.name.upper()}')
+        if value is not None:
+            setattr(policy, f.name, parse_value(getattr(policy, f.name), value))
+    return policy
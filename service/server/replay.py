@@ -0,0 +1,350 @@
+"""Offline replay of recorded conversations through a manager.
+
+Streams a JSONL dataset of user turns (plain or .gz, `-` for stdin) into
+`process_message` of a manager (the ADKHostManager by default) and writes
+one JSONL result per turn, in completion order, with its latency and the
+text of the reply. For regression runs (compare the replies) and capacity
+runs (raise the concurrency or the rate until the latency bends).
+
+A dataset line is one user turn:
+
+  {"conversation": "c1", "text": "oi"}
+  {"conversation": "c1", "parts": [{"kind": "text", "text": "e agora?"}],
+   "messageId": "c1-2", "metadata": {...}}
+
+Turns of a conversation run one after the other, in file order; different
+conversations run concurrently, at most `concurrency` turns at a time and,
+with `rate`, starting at most `rate` turns per second. The file is read
+only as fast as turns start, and a conversation is dropped from the manager
+once it has no turn in flight or queued (and finished tasks are pruned
+every `prune_interval_seconds`), so memory stays flat whatever the size of
+the dataset. A conversation whose turns are far apart in the file may
+therefore come back as a new one: keep the turns of a conversation close
+together, or set `keep_conversations`.
+
+run:
+  python -m service.server.replay dataset.jsonl --output results.jsonl
+  python -m service.server.replay dataset.jsonl.gz --concurrency 32 --rate 10
+  A2A_HOST=in_memory python -m service.server.replay dataset.jsonl
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import sys
+import time
+import uuid
+
+from collections.abc import Iterable, Iterator
+from dataclasses import asdict, dataclass, fields
+from typing import TextIO
+
+from a2a.types import Part, Role, TextPart
+
+from service.server.application_manager import ApplicationManager
+from service.server.metrics import metrics
+from service.server.retention import RetentionPolicy
+from service.types import Message
+
+
+@dataclass
+class ReplayConfig:
+    concurrency: int = 8
+    # Turns started per second (0: as fast as the concurrency allows)
+    rate: float = 0.0
+    turn_timeout_seconds: float = 300.0
+    keep_conversations: bool = False
+    prune_interval_seconds: float = 10.0
+
+
+@dataclass
+class ReplaySummary:
+    turns: int = 0
+    ok: int = 0
+    errors: int = 0
+    timeouts: int = 0
+    invalid: int = 0
+    seconds: float = 0.0
+    latency_total_ms: float = 0.0
+    latency_max_ms: float = 0.0
+
+    def add(self, result: dict):
+        self.turns += 1
+        status = result['status']
+        if status == 'ok':
+            self.ok += 1
+        elif status == 'timeout':
+            self.timeouts += 1
+        elif status == 'invalid':
+            self.invalid += 1
+        else:
+            self.errors += 1
+        latency = result.get('latency_ms') or 0.0
+        self.latency_total_ms += latency
+        self.latency_max_ms = max(self.latency_max_ms, latency)
+
+    def report(self) -> dict:
+        run = self.turns - self.invalid
+        timing = metrics.snapshot()['timings'].get('replay.turn_seconds', {})
+        return {
+            **asdict(self),
+            'turns_per_second': round(run / self.seconds, 2) if self.seconds else 0.0,
+            'latency_mean_ms': round(self.latency_total_ms / run, 1) if run else 0.0,
+            # Over the last turns only (the metrics window)
+            'latency_p50_ms': round(timing.get('p50', 0.0) * 1000, 1),
+            'latency_p95_ms': round(timing.get('p95', 0.0) * 1000, 1),
+        }
+
+
+def read_turns(path: str) -> Iterator[tuple[int, dict | str]]:
+    """(line number, turn) for every non-empty line of `path`; a line that
+    is not a JSON object comes as the error text instead."""
+    if path == '-':
+        stream = sys.stdin
+    elif path.endswith('.gz'):
+        stream = gzip.open(path, 'rt', encoding='utf-8')
+    else:
+        stream = open(path, encoding='utf-8')
+    try:
+        for number, line in enumerate(stream, 1):
+            if not line.strip():
+                continue
+            try:
+                turn = json.loads(line)
+            except json.JSONDecodeError as e:
+                yield number, f'invalid JSON: {e}'
+                continue
+            yield number, turn if isinstance(turn, dict) else 'not an object'
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def to_message(turn: dict, contextid: str) -> Message:
+    if 'parts' in turn:
+        parts = [Part.model_validate(p) for p in turn['parts']]
+    elif isinstance(turn.get('text'), str):
+        parts = [Part(root=TextPart(text=turn['text']))]
+    else:
+        raise ValueError('a turn needs "text" or "parts"')
+    return Message(
+        messageId=turn.get('messageId') or str(uuid.uuid4()),
+        contextId=contextid,
+        role=Role.user,
+        parts=parts,
+        metadata=turn.get('metadata'),
+    )
+
+
+def conversation_of(turn: dict) -> str | None:
+    for key in ('conversation', 'conversationId', 'contextId'):
+        if turn.get(key):
+            return str(turn[key])
+    return None
+
+
+class Replayer:
+    def __init__(
+        self,
+        manager: ApplicationManager,
+        output: TextIO,
+        config: ReplayConfig | None = None,
+    ):
+        self.manager = manager
+        self.output = output
+        self.config = config or ReplayConfig()
+        self.summary = ReplaySummary()
+        self._slots = asyncio.Semaphore(self.config.concurrency)
+        # Conversation -> its last turn in flight or queued
+        self._tails: dict[str, asyncio.Task] = {}
+        # Conversations created in the manager and not dropped yet
+        self._open: set[str] = set()
+
+    async def run(self, turns: Iterable[tuple[int, dict | str]]) -> ReplaySummary:
+        start = time.monotonic()
+        pruner = asyncio.create_task(self._prune_periodically())
+        try:
+            for index, (number, turn) in enumerate(turns):
+                if self.config.rate > 0:
+                    delay = start + index / self.config.rate - time.monotonic()
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                # Back pressure: the next line is read once a turn can start
+                await self._slots.acquire()
+                self._submit(number, turn)
+            if self._tails:
+                await asyncio.gather(*self._tails.values())
+        finally:
+            pruner.cancel()
+            self.output.flush()
+        self.summary.seconds = round(time.monotonic() - start, 3)
+        return self.summary
+
+    def _submit(self, number: int, turn: dict | str):
+        contextid = conversation_of(turn) if isinstance(turn, dict) else None
+        if contextid is None:
+            error = turn if isinstance(turn, str) else 'a turn needs "conversation"'
+            self._write({'line': number, 'status': 'invalid', 'error': error})
+            self._slots.release()
+            return
+        previous = self._tails.get(contextid)
+        task = asyncio.create_task(self._turn(number, turn, contextid, previous))
+        self._tails[contextid] = task
+
+    async def _turn(
+        self,
+        number: int,
+        turn: dict,
+        contextid: str,
+        previous: asyncio.Task | None,
+    ):
+        try:
+            if previous is not None:
+                await asyncio.wait([previous])
+            self._write(await self._process(number, turn, contextid))
+        finally:
+            self._slots.release()
+            if self._tails.get(contextid) is asyncio.current_task():
+                del self._tails[contextid]
+                if not self.config.keep_conversations:
+                    self._open.discard(contextid)
+                    self.manager.drop_conversation(contextid)
+
+    async def _process(self, number: int, turn: dict, contextid: str) -> dict:
+        result = {'line': number, 'conversation': contextid}
+        try:
+            message = to_message(turn, contextid)
+        except Exception as e:
+            return {**result, 'status': 'invalid', 'error': str(e)}
+        result['messageId'] = message.messageId
+        if contextid not in self._open:
+            if not self.manager.get_conversation(contextid):
+                await self.manager.create_conversation(contextid)
+            self._open.add(contextid)
+        message = self.manager.sanitize_message(message)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                self.manager.process_message(message),
+                self.config.turn_timeout_seconds or None,
+            )
+            result['status'] = 'ok'
+        except asyncio.TimeoutError:
+            self.manager.abort_pending(
+                f'Tempo esgotado: {self.config.turn_timeout_seconds:.0f}s',
+                messageids=[message.messageId],
+            )
+            result['status'] = 'timeout'
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = repr(e)
+        elapsed = time.perf_counter() - start
+        metrics.observe('replay.turn_seconds', elapsed)
+        result['latency_ms'] = round(elapsed * 1000, 1)
+        result['reply'] = self._reply(contextid, message.messageId)
+        return result
+
+    def _reply(self, contextid: str, messageid: str) -> list[str]:
+        """Texts of the messages added to the conversation after the turn."""
+        conversation = self.manager.get_conversation(contextid)
+        if not conversation or messageid not in conversation.messageIds:
+            return []
+        after = conversation.messageIds[conversation.messageIds.index(messageid) + 1 :]
+        texts = []
+        for message in self.manager.messages.resolve(after):
+            for part in message.parts or []:
+                text = getattr(getattr(part, 'root', part), 'text', None)
+                if text:
+                    texts.append(text)
+        return texts
+
+    def _write(self, result: dict):
+        self.summary.add(result)
+        self.output.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    async def _prune_periodically(self):
+        """Finished tasks of dropped conversations stay in the manager
+        until a prune."""
+        if self.config.keep_conversations or self.config.prune_interval_seconds <= 0:
+            return
+        policy = RetentionPolicy(task_ttl_seconds=0)
+        while True:
+            await asyncio.sleep(self.config.prune_interval_seconds)
+            await self.manager.prune(policy, time.time())
+
+
+async def replay(
+    manager: ApplicationManager,
+    turns: Iterable[tuple[int, dict | str]],
+    output: TextIO,
+    config: ReplayConfig | None = None,
+) -> ReplaySummary:
+    """Replay `turns` (see read_turns) through `manager`, writing one JSON
+    line per turn to `output`."""
+    return await Replayer(manager, output, config).run(turns)
+
+
+def make_manager(http_client) -> ApplicationManager:
+    """The manager selected by A2A_HOST, as ConversationServer builds it."""
+    if os.environ.get('A2A_HOST', 'ADK').upper() == 'ADK':
+        from service.server.adk_host_manager import ADKHostManager
+
+        return ADKHostManager(
+            http_client,
+            api_key=os.environ.get('GOOGLE_API_KEY', ''),
+            uses_vertex_ai=(
+                os.environ.get('GOOGLE_GENAI_USE_VERTEXAI', '').upper() == 'TRUE'
+            ),
+        )
+    from service.server.in_memory_manager import InMemoryFakeAgentManager
+
+    return InMemoryFakeAgentManager()
+
+
+async def _main(args, config: ReplayConfig) -> ReplaySummary:
+    from service.server.deadlines import http_client
+
+    output = (
+        sys.stdout
+        if args.output == '-'
+        else await asyncio.to_thread(
+            open, args.output, 'w', encoding='utf-8', buffering=1
+        )
+    )
+    try:
+        async with http_client() as client:
+            manager = make_manager(client)
+            if args.agents:
+                for url in args.agents.split(','):
+                    manager.register_agent(url.strip())
+            return await replay(manager, read_turns(args.dataset), output, config)
+    finally:
+        if output is not sys.stdout:
+            await asyncio.to_thread(output.close)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('dataset', help='JSONL of user turns (.gz ok, - for stdin)')
+    parser.add_argument('--output', default='-', help='JSONL results (default stdout)')
+    parser.add_argument('--agents', default='', help='Remote agent urls, comma separated')
+    defaults = ReplayConfig()
+    for f in fields(ReplayConfig):
+        value = getattr(defaults, f.name)
+        if isinstance(value, bool):
+            parser.add_argument('--' + f.name.replace('_', '-'), action='store_true')
+        else:
+            parser.add_argument(
+                '--' + f.name.replace('_', '-'), type=type(value), default=value
+            )
+    args = parser.parse_args(argv)
+    config = ReplayConfig(**{f.name: getattr(args, f.name) for f in fields(ReplayConfig)})
+    summary = asyncio.run(_main(args, config))
+    print(json.dumps(summary.report()), file=sys.stderr)
+    return 0 if not (summary.errors or summary.timeouts) else 1
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
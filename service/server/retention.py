@@ -0,0 +1,212 @@
+"""Retention of the managers' bookkeeping and the background sweeper.
+
+Without pruning, the task map, the message store, the events, the artifact
+chunk buffers and the server's file cache grow for as long as the process
+runs. `Sweeper` periodically calls `ConversationServer.prune`, which asks
+the manager to drop what the `RetentionPolicy` no longer covers and then
+drops the server caches that point at removed messages.
+
+What is kept:
+- conversations until they have been idle for `conversation_ttl_seconds`
+  (0, the default, keeps them for as long as the process runs); managers
+  that support it move conversations idle for `evict_idle_seconds` to a
+  compressed file in `eviction_dir` and load them back on the next access;
+- messages referenced by a kept conversation, event or task or by a pending
+  request;
+- tasks until they have been finished (completed, failed, canceled...) for
+  `task_ttl_seconds`;
+- the last `events_per_conversation` events of each conversation;
+- artifact chunk buffers until `artifact_chunk_ttl_seconds` after they were
+  first seen (an append that never gets its last chunk).
+
+Every field can be set from the environment as A2A_RETENTION_<FIELD>.
+"""
+
+import asyncio
+import sys
+import time
+
+from collections import defaultdict
+from collections.abc import Awaitable, Callable, Hashable, Iterable
+from dataclasses import dataclass
+
+from a2a.types import Task, TaskState
+
+from service.server.metrics import metrics
+from service.server.policy import policy_from_env
+
+
+FINISHED_STATES = {
+    TaskState.completed,
+    TaskState.canceled,
+    TaskState.failed,
+    TaskState.rejected,
+}
+
+
+@dataclass
+class RetentionPolicy:
+    sweep_interval_seconds: float = 60.0
+    task_ttl_seconds: float = 3600.0
+    events_per_conversation: int = 1000
+    artifact_chunk_ttl_seconds: float = 600.0
+    conversation_ttl_seconds: float = 0.0
+    evict_idle_seconds: float = 0.0
+    # Empty: <tempdir>/a2a-evicted
+    eviction_dir: str = ''
+
+    @classmethod
+    def from_env(cls) -> 'RetentionPolicy':
+        return policy_from_env(cls, 'RETENTION')
+
+
+class FirstSeen:
+    """Remembers when each key was first seen by a sweep.
+
+    Tasks and chunk buffers carry no reliable timestamps, so their age is
+    measured from the first sweep that saw them in a prunable state.
+    """
+
+    def __init__(self):
+        self._seen: dict[Hashable, float] = {}
+
+    def age(self, key: Hashable, now: float) -> float:
+        return now - self._seen.setdefault(key, now)
+
+    def retain(self, keys: Iterable[Hashable]):
+        keys = set(keys)
+        for key in [k for k in self._seen if k not in keys]:
+            del self._seen[key]
+
+
+def task_finished(task: Task) -> bool:
+    return bool(task.status and task.status.state in FINISHED_STATES)
+
+
+def idle_conversations(
+    conversations: list,
+    last_active: dict[str, float],
+    busy: set[str | None],
+    ttl: float,
+    now: float,
+) -> list:
+    """Conversations idle for longer than `ttl` seconds (0 disables)."""
+    if ttl <= 0:
+        return []
+    return [
+        c
+        for c in conversations
+        if c.conversationId not in busy
+        and now - last_active.get(c.conversationId, now) > ttl
+    ]
+
+
+def trim_events(
+    events: list,
+    messages,
+    keep_last: int,
+    dropped_conversations: set[str] | frozenset = frozenset(),
+) -> tuple[list, list]:
+    """Split `events` into (kept, removed), keeping the last `keep_last`
+    of each conversation (by the contextId of the event's message) and
+    none of the `dropped_conversations`."""
+    by_conversation: dict[str | None, list] = defaultdict(list)
+    kept, removed = [], []
+    for event in events:
+        message = messages.get(event.messageId)
+        contextid = message.contextId if message else None
+        if contextid in dropped_conversations:
+            removed.append(event)
+        else:
+            by_conversation[contextid].append(event)
+    for group in by_conversation.values():
+        group.sort(key=lambda e: e.timestamp)
+        cut = max(0, len(group) - keep_last)
+        removed.extend(group[:cut])
+        kept.extend(group[cut:])
+    kept.sort(key=lambda e: e.timestamp)
+    return kept, removed
+
+
+def approx_size(objects: Iterable) -> int:
+    """Approximate deep size in bytes of `objects` (shared parts counted once)."""
+    seen: set[int] = set()
+    stack = list(objects)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or obj is None or isinstance(obj, (bool, int, float)):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, (str, bytes)):
+            continue
+        else:
+            if hasattr(obj, '__dict__'):
+                stack.append(obj.__dict__)
+            for slot in getattr(type(obj), '__slots__', ()):
+                stack.append(getattr(obj, slot, None))
+            extra = getattr(obj, '__pydantic_extra__', None)
+            if extra:
+                stack.append(extra)
+    return total
+
+
+class Sweeper:
+    """Runs `prune(policy, now)` every `policy.sweep_interval_seconds`.
+
+    `prune` returns the number of entries removed per structure plus
+    `bytes`, the approximate memory reclaimed; each sweep is logged and
+    added to the `gc.*` metrics.
+    """
+
+    def __init__(
+        self,
+        prune: Callable[[RetentionPolicy, float], Awaitable[dict[str, int]]],
+        policy: RetentionPolicy | None = None,
+    ):
+        self.prune = prune
+        self.policy = policy or RetentionPolicy.from_env()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def sweep(self) -> dict[str, int]:
+        start = time.perf_counter()
+        removed = await self.prune(self.policy, time.time())
+        elapsed = time.perf_counter() - start
+        metrics.inc('gc.sweeps')
+        metrics.observe('gc.sweep_seconds', elapsed)
+        for name, count in removed.items():
+            if name != 'bytes':
+                metrics.inc(f'gc.removed.{name}', count)
+        metrics.inc('gc.reclaimed_bytes', removed.get('bytes', 0))
+        if any(removed.values()):
+            summary = ', '.join(f'{k}={v}' for k, v in sorted(removed.items()))
+            print(f'[GC] sweep em {elapsed * 1000:.1f}ms: {summary}')
+        return removed
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.policy.sweep_interval_seconds)
+            try:
+                await self.sweep()
+            except Exception as e:
+                # A failed sweep must not stop the next ones
+                print(f'[GC] sweep falhou: {e!r}')
@@ -0,0 +1,431 @@
+"""Router in front of N independent manager processes (shards).
+
+Each shard is a plain ConversationServer with its own ADKHostManager and
+keeps its in-memory fast path; the router owns the public API and the UI:
+
+- calls that carry a conversation id (message/send, message/list) go to the
+  shard that owns it by consistent hashing (HashRing);
+- conversation/create picks the id first, then creates it on its owner;
+- conversation/list, events/get, task/list, message/pending and agent/list
+  are sent to every shard and merged;
+- agent/register and api_key/update are applied on every shard.
+
+`add_shard` / `remove_shard` (routes shard/add and shard/remove) change the
+ring and move only the conversations whose owner changed, about 1/N of
+them, as bundles (shard/export, shard/import, shard/drop), up to
+`move_concurrency` at a time. Until its move starts a conversation is still
+served by its old shard; calls for it wait only while it moves. A
+conversation that cannot move (e.g. a message is being processed for longer
+than the move timeout) stays pinned to its old shard.
+
+Configured by main.py from A2A_SHARDS; the router sees A2A_SHARD_URLS
+(name=url, comma separated).
+"""
+
+import asyncio
+import os
+import time
+import uuid
+import zlib
+
+from typing import Any
+
+import httpx
+
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from service.server.admission import forwarded_headers, relay
+from service.server.export import (
+    Selection,
+    add_counts,
+    concat,
+    conversation_groups,
+    conversation_id,
+    encode_records,
+    read_records,
+    remote_export,
+    remote_import,
+)
+from service.server.hashring import HashRing
+from service.server.health import HealthMonitor
+from service.server.metrics import metrics
+from service.server.rpc import Dispatcher, error
+
+
+def shards_from_env() -> dict[str, str]:
+    urls = os.environ.get('A2A_SHARD_URLS', '')
+    return dict(item.split('=', 1) for item in urls.split(',') if item)
+
+
+class ShardRouter:
+    def __init__(
+        self,
+        app: FastAPI,
+        http_client: httpx.AsyncClient,
+        shards: dict[str, str],
+        move_timeout_seconds: float = 30.0,
+        move_concurrency: int = 8,
+    ):
+        self.http_client = http_client
+        self.shards = dict(shards)
+        self.ring = HashRing(self.shards)
+        self.move_timeout_seconds = move_timeout_seconds
+        # Moves of one rebalance in flight at once
+        self.move_concurrency = move_concurrency
+        # Conversations that stay on a shard other than their ring owner
+        self._pinned: dict[str, str] = {}
+        # Conversations being moved: calls for them wait on the event
+        self._moving: dict[str, asyncio.Event] = {}
+        self._rebalance_lock = asyncio.Lock()
+        # Ready when every shard is; started by main
+        self.health = HealthMonitor(self._probe)
+
+        methods = {
+            'conversation/create': self._create_conversation,
+            'conversation/list': self._list_conversation,
+            'message/send': self._send_message,
+            'message/cancel': self._cancel_message,
+            'message/list': self._list_messages,
+            'message/pending': self._pending_messages,
+            'events/get': self._get_events,
+            'task/list': self._list_tasks,
+            'agent/register': self._broadcast,
+            'agent/list': self._list_agents,
+            'api_key/update': self._broadcast,
+            'trace/get': self._get_trace,
+            'metrics/get': self._get_metrics,
+            'admission/config': self._broadcast,
+            'shard/add': self._add_shard,
+            'shard/remove': self._remove_shard,
+            'shard/list': self._list_shards,
+        }
+        for method, handler in methods.items():
+            app.add_api_route(f'/{method}', handler, methods=['POST'])
+        # The same methods as a JSON-RPC batch (see rpc.py)
+        app.add_api_route('/rpc', Dispatcher(methods).handle, methods=['POST'])
+        app.add_api_route('/message/file/{file_id}', self._files, methods=['GET'])
+        app.add_api_route('/healthz', self.health.healthz, methods=['GET'])
+        app.add_api_route('/readyz', self.health.readyz, methods=['GET'])
+        app.add_api_route(
+            '/conversation/export', self._export_conversations, methods=['POST']
+        )
+        app.add_api_route(
+            '/conversation/import', self._import_conversations, methods=['POST']
+        )
+
+    # Placement
+
+    def owner(self, conversationid: str | None) -> str:
+        if not conversationid:
+            return self.ring.nodes[0]
+        return self._pinned.get(conversationid) or self.ring.owner(conversationid)
+
+    async def _owner_when_settled(self, conversationid: str | None) -> str:
+        moving = self._moving.get(conversationid) if conversationid else None
+        if moving is not None:
+            await moving.wait()
+        return self.owner(conversationid)
+
+    def serving(self) -> list[str]:
+        """The shards of the ring, then those out of it that still hold
+        conversations that could not move (see remove_shard)."""
+        return list(dict.fromkeys([*self.ring.nodes, *self._pinned.values()]))
+
+    async def call(self, shard: str, method: str, body: dict) -> dict:
+        response = await self.http_client.post(
+            f'{self.shards[shard]}/{method}', json=body
+        )
+        response.raise_for_status()
+        return response.json()
+
+    async def fan_out(self, method: str, body: dict) -> list[dict]:
+        return await asyncio.gather(
+            *(self.call(shard, method, body) for shard in self.serving())
+        )
+
+    # Routed calls
+
+    async def _create_conversation(self, request: Request):
+        body = await _body(request)
+        params = body.get('params') or {}
+        conversationid = params.get('conversationid') or str(uuid.uuid4())
+        body['params'] = {'conversationid': conversationid}
+        return await self.call(self.owner(conversationid), 'conversation/create', body)
+
+    async def _send_message(self, request: Request):
+        body = await _body(request)
+        params = body.get('params') or {}
+        shard = await self._owner_when_settled(
+            params.get('contextId') or params.get('context_id')
+        )
+        metrics.inc(f'router.sends.{shard}')
+        response = await self.http_client.post(
+            f'{self.shards[shard]}/message/send',
+            json=body,
+            headers=forwarded_headers(request),
+        )
+        return relay(response)
+
+    async def _cancel_message(self, request: Request):
+        body = await _body(request)
+        params = body.get('params') or {}
+        shard = await self._owner_when_settled(
+            params.get('contextId') or params.get('contextid')
+        )
+        return await self.call(shard, 'message/cancel', body)
+
+    async def _list_messages(self, request: Request):
+        body = await _body(request)
+        shard = await self._owner_when_settled(body.get('params'))
+        return await self.call(shard, 'message/list', body)
+
+    # Fan-out calls
+
+    async def _list_conversation(self, request: Request):
+        return _merge(await self.fan_out('conversation/list', await _body(request)))
+
+    async def _pending_messages(self, request: Request):
+        return _merge(await self.fan_out('message/pending', await _body(request)))
+
+    async def _list_tasks(self, request: Request):
+        return _merge(await self.fan_out('task/list', await _body(request)))
+
+    async def _get_events(self, request: Request):
+        merged = _merge(await self.fan_out('events/get', await _body(request)))
+        merged['result'].sort(key=lambda e: e.get('timestamp') or 0)
+        return merged
+
+    async def _list_agents(self, request: Request):
+        # Every shard registered the same agents: the first answer is enough
+        return await self.call(self.ring.nodes[0], 'agent/list', await _body(request))
+
+    async def _broadcast(self, request: Request):
+        body = await _body(request)
+        responses = await self.fan_out(request.url.path.lstrip('/'), body)
+        return responses[0]
+
+    async def _get_trace(self, request: Request):
+        merged = _merge(await self.fan_out('trace/get', await _body(request)))
+        merged['result'].sort(key=lambda s: s.get('start') or 0)
+        return merged
+
+    async def _get_metrics(self, request: Request):
+        body = await _body(request)
+        shards = self.serving()
+        responses = await self.fan_out('metrics/get', body)
+        return {
+            'jsonrpc': '2.0',
+            'id': body.get('id'),
+            'result': {
+                'router': metrics.snapshot(),
+                'shards': {
+                    shard: r.get('result')
+                    for shard, r in zip(shards, responses)
+                },
+            },
+        }
+
+    async def _files(self, file_id: str):
+        # File ids are per shard and carry no conversation id: ask each one
+        for shard in self.serving():
+            response = await self.http_client.get(
+                f'{self.shards[shard]}/message/file/{file_id}'
+            )
+            if response.status_code == 200:
+                return Response(
+                    content=response.content,
+                    media_type=response.headers.get('content-type'),
+                )
+        return Response(status_code=404)
+
+    # Export and import (see export.py)
+
+    async def _export_conversations(self, request: Request):
+        """The dumps of every shard, one after the other."""
+        body = await _body(request)
+        try:
+            Selection.from_params(body.get('params'))
+        except (TypeError, ValueError) as e:
+            return JSONResponse(error(body.get('id'), -32602, f'Invalid params: {e}'))
+        filename = time.strftime('conversations-%Y%m%d-%H%M%S.jsonl.gz')
+        return StreamingResponse(
+            concat(
+                *(
+                    remote_export(self.http_client, self.shards[shard], body)
+                    for shard in self.serving()
+                )
+            ),
+            media_type='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
+
+    async def _import_conversations(self, request: Request):
+        """Each conversation of the dump goes to the shard that owns it."""
+        replace = request.query_params.get('replace', '').lower() in ('1', 'true')
+        counts: dict[str, int] = {}
+        try:
+            async for group in conversation_groups(read_records(request.stream())):
+                shard = await self._owner_when_settled(conversation_id(group[0]))
+                add_counts(
+                    counts,
+                    await remote_import(
+                        self.http_client,
+                        self.shards[shard],
+                        encode_records(group),
+                        replace,
+                    ),
+                )
+        except (zlib.error, ValueError, KeyError, httpx.HTTPError) as e:
+            print(f'[ROUTER] importação interrompida: {e!r}')
+            answer = error(None, -32602, f'Invalid dump: {e}')
+            answer['error']['data'] = counts
+            return JSONResponse(answer)
+        return {'jsonrpc': '2.0', 'result': counts}
+
+    async def _probe(self) -> tuple[dict[str, bool], dict]:
+        shards = self.serving()
+
+        async def ready(shard: str) -> bool:
+            try:
+                response = await self.http_client.get(
+                    f'{self.shards[shard]}/readyz',
+                    # Well within a beat, so a hung shard cannot make the
+                    # router look dead
+                    timeout=self.health.policy.interval_seconds / 2,
+                )
+                return response.status_code == 200
+            except httpx.HTTPError:
+                return False
+
+        results = await asyncio.gather(*(ready(s) for s in shards))
+        return {f'shard.{s}': ok for s, ok in zip(shards, results)}, {}
+
+    # Shard membership
+
+    async def _add_shard(self, request: Request):
+        params = (await _body(request)).get('params') or {}
+        moved = await self.add_shard(params['name'], params['url'])
+        return {'jsonrpc': '2.0', 'result': {'moved': moved}}
+
+    async def _remove_shard(self, request: Request):
+        params = (await _body(request)).get('params') or {}
+        moved = await self.remove_shard(params['name'])
+        return {'jsonrpc': '2.0', 'result': {'moved': moved}}
+
+    def _list_shards(self):
+        return {
+            'jsonrpc': '2.0',
+            'result': {
+                'shards': self.shards,
+                'pinned': self._pinned,
+                'moving': list(self._moving),
+            },
+        }
+
+    async def add_shard(self, name: str, url: str) -> int:
+        async with self._rebalance_lock:
+            self.shards[name] = url
+            ring = HashRing(self.ring.nodes, self.ring.replicas)
+            ring.add(name)
+            return await self._rebalance(ring)
+
+    async def remove_shard(self, name: str) -> int:
+        async with self._rebalance_lock:
+            ring = HashRing(self.ring.nodes, self.ring.replicas)
+            ring.remove(name)
+            return await self._rebalance(ring)
+
+    async def _rebalance(self, ring: HashRing) -> int:
+        """Switch to `ring` and move the conversations whose owner changed,
+        including those left pinned by an earlier rebalance."""
+        start = time.perf_counter()
+        placement: dict[str, str] = {}
+        for shard in self.serving():
+            response = await self.call(
+                shard, 'shard/conversations', _request('shard/conversations')
+            )
+            for conversationid in response['result']:
+                placement[conversationid] = shard
+        moves = {
+            c: (old, ring.owner(c))
+            for c, old in placement.items()
+            if ring.owner(c) != old
+        }
+        for conversationid, shard in placement.items():
+            if ring.owner(conversationid) == shard:
+                self._pinned.pop(conversationid, None)
+        # Pinned to their old shard until their own move starts: calls for
+        # them go on there meanwhile, and the others follow the new ring
+        self._pinned.update({c: old for c, (old, _) in moves.items()})
+        self.ring = ring
+        slots = asyncio.Semaphore(max(1, self.move_concurrency))
+
+        async def move(conversationid: str, old: str, new: str) -> bool:
+            async with slots:
+                # Calls for it wait from here until it settles
+                self._moving[conversationid] = asyncio.Event()
+                try:
+                    if await self._move(conversationid, old, new):
+                        self._pinned.pop(conversationid, None)
+                        return True
+                except httpx.HTTPError as e:
+                    print(f'[ROUTER] conversa {conversationid} fica em {old}: {e!r}')
+                finally:
+                    self._moving.pop(conversationid).set()
+                return False
+
+        results = await asyncio.gather(
+            *(move(c, old, new) for c, (old, new) in moves.items())
+        )
+        moved = sum(results)
+        # A removed shard is kept only while conversations are pinned to it
+        for name in set(self.shards) - set(self.serving()):
+            del self.shards[name]
+        metrics.inc('router.moved', moved)
+        metrics.observe('router.rebalance_seconds', time.perf_counter() - start)
+        print(
+            f'[ROUTER] {len(ring)} shards; {moved}/{len(placement)} conversas '
+            f'movidas, {len(moves) - moved} fixadas'
+        )
+        return moved
+
+    async def _move(self, conversationid: str, old: str, new: str) -> bool:
+        deadline = time.monotonic() + self.move_timeout_seconds
+        while True:
+            response = await self.call(
+                old, 'shard/export', _request('shard/export', conversationid)
+            )
+            bundle = response.get('result')
+            if bundle is not None:
+                break
+            if time.monotonic() > deadline:
+                return False
+            # A message is in flight on the old shard
+            await asyncio.sleep(0.1)
+        await self.call(new, 'shard/import', _request('shard/import', bundle))
+        await self.call(old, 'shard/drop', _request('shard/drop', conversationid))
+        return True
+
+
+async def _body(request: Request) -> dict[str, Any]:
+    raw = await request.body()
+    return await request.json() if raw else {}
+
+
+def _request(method: str, params=None) -> dict[str, Any]:
+    return {
+        'jsonrpc': '2.0',
+        'id': str(uuid.uuid4()),
+        'method': method,
+        'params': params,
+    }
+
+
+def _merge(responses: list[dict]) -> dict[str, Any]:
+    """One JSON-RPC response with the `result` lists of every shard."""
+    result = []
+    for response in responses:
+        result.extend(response.get('result') or [])
+    first = responses[0] if responses else {}
+    return {'jsonrpc': '2.0', 'id': first.get('id'), 'result': result}
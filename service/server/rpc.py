@@ -0,0 +1,113 @@
+"""JSON-RPC 2.0 over a single url (`POST /rpc`).
+
+The methods are also served one per url (`POST /message/list`...); `/rpc`
+takes a request object or a batch array of them, runs the calls of a batch
+concurrently through the same handlers and answers in one response, so a
+client that refreshes several lists pays for one round trip.
+
+Each call is handed to its handler as a request of its own, with the body
+of that call and the headers of the batch (x-a2a-user-id...). Answers carry
+the id of their call; calls without an id (notifications) are run and get
+no answer. Errors are per call: -32600 for a malformed call, -32601 for an
+unknown method and -32603 when the handler raises; a notification gets
+no error either, only a malformed call does (its id is not known).
+"""
+
+import asyncio
+import inspect
+import json
+
+from collections.abc import Callable
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
+
+from service.server.metrics import metrics
+
+
+def error(call_id, code: int, message: str) -> dict:
+    return {
+        'jsonrpc': '2.0',
+        'id': call_id,
+        'error': {'code': code, 'message': message},
+    }
+
+
+class Dispatcher:
+    def __init__(self, methods: dict[str, Callable]):
+        self.methods = methods
+        # Whether each handler takes the request (FastAPI allows both)
+        self._takes_request = {
+            name: bool(inspect.signature(handler).parameters)
+            for name, handler in methods.items()
+        }
+
+    async def handle(self, request: Request) -> Response:
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return JSONResponse(error(None, -32700, 'Parse error'))
+        if isinstance(payload, list):
+            if not payload:
+                return JSONResponse(error(None, -32600, 'Invalid Request'))
+            metrics.observe('rpc.batch_size', len(payload))
+            answers = await asyncio.gather(
+                *(self.call(request, call) for call in payload)
+            )
+            answers = [a for a in answers if a is not None]
+        else:
+            answers = await self.call(request, payload)
+        if not answers:
+            return Response(status_code=204)
+        return JSONResponse(answers)
+
+    async def call(self, request: Request, call: Any) -> dict | None:
+        if (
+            not isinstance(call, dict)
+            or call.get('jsonrpc') != '2.0'
+            or not isinstance(call.get('method'), str)
+        ):
+            return error(
+                call.get('id') if isinstance(call, dict) else None,
+                -32600,
+                'Invalid Request',
+            )
+        method = call['method']
+        notification = 'id' not in call
+        handler = self.methods.get(method)
+        if handler is None:
+            if notification:
+                return None
+            return error(call['id'], -32601, f'Method not found: {method}')
+        try:
+            result = await self._invoke(method, handler, request, call)
+        except Exception as e:
+            metrics.inc('rpc.errors')
+            print(f'[RPC] {method} falhou: {e!r}')
+            return None if notification else error(call['id'], -32603, str(e))
+        if notification:
+            return None
+        if isinstance(result, Response):
+            answer = json.loads(result.body)
+        else:
+            answer = jsonable_encoder(result)
+        answer['id'] = call['id']
+        return answer
+
+    async def _invoke(self, method: str, handler, request: Request, call: dict):
+        args = ()
+        if self._takes_request[method]:
+            body = json.dumps(call).encode()
+
+            async def receive():
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            scope = {**request.scope, 'path': '/' + method}
+            args = (Request(scope, receive),)
+        if inspect.iscoroutinefunction(handler):
+            return await handler(*args)
+        # Sync handlers run in the thread pool, as FastAPI runs them
+        return await run_in_threadpool(handler, *args)
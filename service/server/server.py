@@ -1,32 +1,67 @@
 import asyncio
 import base64
+import json
 import os
-import threading
+import time
 import uuid
-
-from typing import cast
+import zlib
 
 import httpx
 
-from a2a.types import FilePart, FileWithUri, Message, Part
+from a2a.types import FilePart, FileWithUri, Part
 from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 
 from service.types import (
+    CancelMessageResponse,
     CreateConversationResponse,
+    Event,
     GetEventResponse,
+    GetMetricsResponse,
+    GetTraceResponse,
     ListAgentResponse,
     ListConversationResponse,
     ListMessageResponse,
     ListTaskResponse,
+    Message,
     MessageInfo,
     PendingMessageResponse,
     RegisterAgentResponse,
     SendMessageResponse,
 )
 
-from .adk_host_manager import ADKHostManager, get_message_id
+from .admission import (
+    PRIORITIES,
+    PRIORITY_HEADER,
+    USER_HEADER,
+    AdmissionControl,
+    Rejection,
+    forwarded_headers,
+)
 from .application_manager import ApplicationManager
-from .in_memory_manager import InMemoryFakeAgentManager
+from .cluster import FORWARDED_HEADER, Cluster, CoalescedWrites
+from .deadlines import DeadlinePolicy
+from .export import (
+    Selection,
+    add_counts,
+    concat,
+    conversation_groups,
+    conversation_id,
+    encode_records,
+    export_stream,
+    import_group,
+    read_records,
+    remote_export,
+    remote_import,
+)
+from .health import HealthMonitor
+from .idempotency import RecentSends
+from .internal_message import get_message_id, to_wire
+from .metrics import metrics
+from .normalize import normalize_message
+from .retention import RetentionPolicy, approx_size
+from .rpc import Dispatcher, error
+from .tracing import tracer
 
 
 class ConversationServer:
@@ -36,7 +71,13 @@ class ConversationServer:
     agents and provide details about the executions.
     """
 
-    def __init__(self, app: FastAPI, http_client: httpx.AsyncClient):
+    def __init__(
+        self,
+        app: FastAPI,
+        http_client: httpx.AsyncClient,
+        manager: ApplicationManager | None = None,
+        cluster: Cluster | None = None,
+    ):
         agent_manager = os.environ.get('A2A_HOST', 'ADK')
         self.manager: ApplicationManager
 
@@ -46,90 +87,500 @@ class ConversationServer:
             os.environ.get('GOOGLE_GENAI_USE_VERTEXAI', '').upper() == 'TRUE'
         )
 
-        if agent_manager.upper() == 'ADK':
+        if manager is not None:
+            # Injected manager (benchmarks, tests)
+            self.manager = manager
+        elif agent_manager.upper() == 'ADK':
+            # google.adk (and google.genai, vertexai...) takes seconds to
+            # import: only load it when the ADK manager is selected
+            from .adk_host_manager import ADKHostManager
+
             self.manager = ADKHostManager(
                 http_client,
                 api_key=api_key,
                 uses_vertex_ai=uses_vertex_ai,
             )
         else:
+            from .in_memory_manager import InMemoryFakeAgentManager
+
             self.manager = InMemoryFakeAgentManager()
         self._file_cache = {}  # dict[str, FilePart] maps file id to message data
         self._message_to_cache = {}  # dict[str, str] maps message id to cache id
-
-        app.add_api_route(
-            '/conversation/create', self._create_conversation, methods=['POST']
+        # Message id -> the task processing it (message/cancel, drain)
+        self._runs: dict[str, asyncio.Task] = {}
+        # Messages of the runs not yet handed to the manager (drain fails
+        # them too)
+        self._waiting: dict[str, Message] = {}
+        self.deadlines = DeadlinePolicy.from_env()
+        # Rate limits and run slots (see admission.py)
+        self.admission = AdmissionControl()
+        # Answers of the last sends, so a retried one is not run twice
+        self.recent_sends = RecentSends()
+        # Set by warmup.warm_up once the first message will not pay for it
+        self.ready = False
+        # Set by drain(): message/send answers 503 from then on
+        self.draining = False
+        # Probes served from cached state (see health.py); started by main
+        self.health = HealthMonitor(self._probe)
+        # Multi-worker mode (see cluster.py); None in a single process
+        self.cluster = cluster or Cluster.from_env(http_client)
+        # How often an owner publishes a conversation while it is processed
+        self._publish_seconds = float(
+            os.environ.get('A2A_CLUSTER_PUBLISH_SECONDS', '0.5')
         )
+        # Shared store writes of this worker (see publish)
+        self._publishes = CoalescedWrites()
+        if self.cluster:
+            # Pending rows of a previous run of this worker are stale
+            self.cluster.store.publish_pending(self.cluster.worker_id, [])
+
+        # JSON-RPC methods: one url each, and all of them through /rpc
+        methods = {
+            'conversation/create': self._create_conversation,
+            'conversation/list': self._list_conversation,
+            'message/send': self._send_message,
+            'message/cancel': self._cancel_message,
+            'events/get': self._get_events,
+            'message/list': self._list_messages,
+            'message/pending': self._pending_messages,
+            'task/list': self._list_tasks,
+            'agent/register': self._register_agent,
+            'agent/list': self._list_agents,
+            'api_key/update': self._update_api_key,
+            'trace/get': self._get_trace,
+            'metrics/get': self._get_metrics,
+            'admission/config': self._admission_config,
+        }
+        for method, handler in methods.items():
+            app.add_api_route('/' + method, handler, methods=['POST'])
+        app.add_api_route('/rpc', Dispatcher(methods).handle, methods=['POST'])
         app.add_api_route(
-            '/conversation/list', self._list_conversation, methods=['POST']
-        )
-        app.add_api_route('/message/send', self._send_message, methods=['POST'])
-        app.add_api_route('/events/get', self._get_events, methods=['POST'])
-        app.add_api_route(
-            '/message/list', self._list_messages, methods=['POST']
+            '/message/file/{file_id}', self._files, methods=['GET']
         )
+        app.add_api_route('/healthz', self.health.healthz, methods=['GET'])
+        app.add_api_route('/readyz', self.health.readyz, methods=['GET'])
+        # Streamed gzip bodies, not JSON: outside of /rpc (see export.py)
         app.add_api_route(
-            '/message/pending', self._pending_messages, methods=['POST']
+            '/conversation/export', self._export_conversations, methods=['POST']
         )
-        app.add_api_route('/task/list', self._list_tasks, methods=['POST'])
         app.add_api_route(
-            '/agent/register', self._register_agent, methods=['POST']
+            '/conversation/import', self._import_conversations, methods=['POST']
         )
-        app.add_api_route('/agent/list', self._list_agents, methods=['POST'])
+        # Used by the shard router (router.py) to move conversations
         app.add_api_route(
-            '/message/file/{file_id}', self._files, methods=['GET']
-        )
-        app.add_api_route(
-            '/api_key/update', self._update_api_key, methods=['POST']
+            '/shard/conversations', self._shard_conversations, methods=['POST']
         )
+        app.add_api_route('/shard/export', self._shard_export, methods=['POST'])
+        app.add_api_route('/shard/import', self._shard_import, methods=['POST'])
+        app.add_api_route('/shard/drop', self._shard_drop, methods=['POST'])
 
     # Update API key in manager
     def update_api_key(self, api_key: str):
-        if isinstance(self.manager, ADKHostManager):
+        if hasattr(self.manager, 'update_api_key'):
             self.manager.update_api_key(api_key)
 
-    async def _create_conversation(self):
-        c = await self.manager.create_conversation()
+    async def _create_conversation(self, request: Request):
+        body = await request.body()
+        params = (json.loads(body) if body else {}).get('params') or {}
+        # Set by the shard router and by other workers
+        conversationid = params.get('conversationid')
+        if self.cluster:
+            # The id decides the owner: pick it here, create it there
+            conversationid = conversationid or str(uuid.uuid4())
+            owner = self.cluster.owner(conversationid)
+            if owner != self.cluster.worker_id and not _forwarded(request):
+                return await self.cluster.forward(
+                    owner,
+                    'conversation/create',
+                    {
+                        'jsonrpc': '2.0',
+                        'id': str(uuid.uuid4()),
+                        'method': 'conversation/create',
+                        'params': {'conversationid': conversationid},
+                    },
+                )
+        c = await self.manager.create_conversation(conversationid)
+        if self.cluster:
+            await self.publish(c.conversationId)
         return CreateConversationResponse(result=c)
 
     async def _send_message(self, request: Request):
         message_data = await request.json()
-        message = Message(**message_data['params'])
-        message = self.manager.sanitize_message(message)
-        loop = asyncio.get_event_loop()
-        if isinstance(self.manager, ADKHostManager):
-            t = threading.Thread(
-                target=lambda: cast(
-                    'ADKHostManager', self.manager
-                ).process_message_threadsafe(message, loop)
+        if self.cluster and not _forwarded(request):
+            params = message_data.get('params') or {}
+            owner = self.cluster.owner(
+                params.get('contextId') or params.get('context_id')
             )
-        else:
-            t = threading.Thread(
-                target=lambda: asyncio.run(
-                    self.manager.process_message(message)
+            if owner != self.cluster.worker_id:
+                return await self.cluster.forward_send(
+                    owner, message_data, forwarded_headers(request)
                 )
+        params = message_data.get('params') or {}
+        messageid = params.get('messageId') or params.get('message_id')
+        known = messageid and self._known_send(
+            messageid, params.get('contextId') or params.get('context_id')
+        )
+        if known:
+            metrics.inc('messages.duplicates')
+            return SendMessageResponse(result=known)
+        if self.draining:
+            return self._unavailable(message_data.get('id'), 'server is draining')
+        metadata = params.get('metadata') or {}
+        priority = (
+            request.headers.get(PRIORITY_HEADER)
+            or metadata.get('priority')
+            or 'interactive'
+        )
+        if priority not in PRIORITIES:
+            return {
+                'jsonrpc': '2.0',
+                'id': message_data.get('id'),
+                'error': {
+                    'code': -32602,
+                    'message': f'unknown priority: {priority}',
+                    'data': {'priorities': list(PRIORITIES)},
+                },
+            }
+        rejection = self.admission.admit(
+            request.headers.get(USER_HEADER) or metadata.get('userId'),
+            params.get('contextId') or params.get('context_id'),
+        )
+        if rejection:
+            return self._rejected(message_data.get('id'), rejection)
+        message = normalize_message(Message(**message_data['params']))
+        # The trace of a message starts at the HTTP ingress
+        root = tracer.start_trace(
+            message.messageId,
+            'message/send',
+            contextId=message.contextId or '',
+        )
+        message = self.manager.sanitize_message(message)
+        info = MessageInfo(
+            messageid=message.messageId,
+            contextid=message.contextId if message.contextId else '',
+        )
+        self.recent_sends.add(info)
+        # Every manager runs on this loop (the ADK one used to be scheduled
+        # here from a thread); the task is kept so the run can be cancelled
+        self._start_run(
+            message.messageId,
+            lambda: self._process_and_publish(message)
+            if self.cluster
+            else self._process(message),
+            priority,
+            message,
+        )
+        tracer.finish(root)
+        return SendMessageResponse(result=info)
+
+    def _known_send(self, messageid: str, contextid: str | None) -> MessageInfo | None:
+        """The answer already given to a send of `messageid`, if it is in
+        flight, was accepted within the dedup window or is stored."""
+        info = self.recent_sends.get(messageid)
+        if info is None and messageid in self._runs:
+            # Out of the window but still running
+            info = MessageInfo(messageid=messageid, contextid=contextid or '')
+        if info is None and messageid in self.manager.messages:
+            # Out of the window and processed already
+            stored = self.manager.messages.get(messageid)
+            info = MessageInfo(
+                messageid=messageid,
+                contextid=getattr(stored, 'contextId', None) or contextid or '',
             )
-        t.start()
-        return SendMessageResponse(
-            result=MessageInfo(
-                messageid=message.messageId,
-                contextid=message.contextId if message.contextId else '',
+        return info
+
+    def _start_run(
+        self,
+        messageid: str,
+        start,
+        priority: str = 'interactive',
+        message: Message | None = None,
+    ):
+        """Run `start()` once a run slot of its priority class is free,
+        within the run deadline."""
+
+        # Queued now, so message/pending lists it before the task starts
+        ticket = self.admission.enqueue(messageid, priority)
+        if message is not None:
+            self._waiting[messageid] = message
+
+        async def run():
+            await self.admission.wait(ticket)
+            await self._run_with_deadline(messageid, start())
+
+        task = asyncio.get_running_loop().create_task(run())
+        self._runs[messageid] = task
+
+        def done(_):
+            # Also when the task was cancelled before it ever ran
+            self.admission.release(ticket)
+            # Unconditionally: message/cancel pops the run before it ends
+            self._waiting.pop(messageid, None)
+            if self._runs.get(messageid) is task:
+                del self._runs[messageid]
+
+        task.add_done_callback(done)
+
+    async def _run_with_deadline(self, messageid: str, coroutine):
+        """Run `coroutine`; past `deadlines.run_seconds` cancel it and end
+        the message with a timeout reply (its task fails)."""
+        run = asyncio.ensure_future(coroutine)
+        try:
+            done, _ = await asyncio.wait(
+                {run}, timeout=self.deadlines.limit(self.deadlines.run_seconds)
+            )
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        if done:
+            return run.result()
+        # Before cancelling: managers drop the pending entry when unwinding
+        self.manager.abort_pending(
+            f'Tempo esgotado: a mensagem passou de {self.deadlines.run_seconds:g}s '
+            'sem concluir.',
+            messageids=[messageid],
+        )
+        run.cancel()
+        metrics.inc('timeouts.run')
+        print(f'[DEADLINE] {messageid} cancelada após {self.deadlines.run_seconds:g}s')
+        if self.cluster:
+            await self.publish(
+                getattr(self.manager.messages.get(messageid), 'contextId', None)
+            )
+
+    async def _cancel_message(self, request: Request):
+        message_data = await request.json()
+        info = MessageInfo(**message_data['params'])
+        if self.cluster and not _forwarded(request):
+            owner = self.cluster.owner(info.contextId)
+            if owner != self.cluster.worker_id:
+                return await self.cluster.forward(owner, 'message/cancel', message_data)
+        # A run still waiting for its slot has nothing else to end
+        queued = info.messageId in self.admission.slots.queued
+        # Canceled before it ran: drain must not answer it later
+        self._waiting.pop(info.messageId, None)
+        run = self._runs.pop(info.messageId, None)
+        if run:
+            # Stops the runner (and its model call) at its next await
+            run.cancel()
+        canceled = await self.manager.cancel_message(info.messageId) or queued
+        if canceled:
+            metrics.inc('messages.canceled')
+            if self.cluster:
+                await self.publish(info.contextId)
+        return CancelMessageResponse(result=canceled)
+
+    def _rejected(self, request_id, rejection: Rejection) -> JSONResponse:
+        return JSONResponse(
+            {'jsonrpc': '2.0', 'id': request_id, 'error': rejection.to_error()},
+            status_code=429,
+            headers={'Retry-After': str(max(1, round(rejection.retry_after)))},
+        )
+
+    async def _admission_config(self, request: Request):
+        """Current admission policy; `params` (a dict) changes fields."""
+        message_data = await request.json()
+        try:
+            policy = self.admission.configure(message_data.get('params'))
+        except (TypeError, ValueError) as e:
+            return {
+                'jsonrpc': '2.0',
+                'id': message_data.get('id'),
+                'error': {'code': -32602, 'message': str(e)},
+            }
+        if self.cluster and message_data.get('params') and not _forwarded(request):
+            for worker in self.cluster.peers():
+                await self.cluster.forward(worker, 'admission/config', message_data)
+        return {'jsonrpc': '2.0', 'id': message_data.get('id'), 'result': policy}
+
+    def _unavailable(self, request_id, reason: str) -> JSONResponse:
+        """503 with a JSON-RPC error, for load balancers and clients."""
+        return JSONResponse(
+            {
+                'jsonrpc': '2.0',
+                'id': request_id,
+                'error': {
+                    'code': -32000,
+                    'message': reason,
+                    'data': {'pending': self.manager.pending_count()},
+                },
+            },
+            status_code=503,
+            headers={'Retry-After': '1'},
+        )
+
+    async def drain(self, timeout_seconds: float) -> list[str]:
+        """Stop accepting sends, wait up to `timeout_seconds` for the
+        pending messages and fail the ones still running. Returns their ids."""
+        if self.draining and not self.manager.pending_count():
+            # Drained already (exit signal, then the lifespan shutdown)
+            return []
+        print(f'[DRAIN] aguardando até {timeout_seconds}s pelas mensagens pendentes')
+        self.draining = True
+        metrics.set('server.draining', 1)
+        # /readyz turns 503 now, not on the next beat
+        await self.health.beat()
+        start = time.monotonic()
+        last_report = 0.0
+        while True:
+            pending = self.manager.pending_count() + len(self.admission.slots.queued)
+            metrics.set('server.pending', pending)
+            elapsed = time.monotonic() - start
+            if not pending or elapsed >= timeout_seconds:
+                break
+            if elapsed - last_report >= 1:
+                print(f'[DRAIN] {pending} mensagens pendentes')
+                last_report = elapsed
+            await asyncio.sleep(0.1)
+        reason = 'Falhou: o servidor foi encerrado antes de concluir esta mensagem.'
+        failed = self.manager.abort_pending(reason)
+        # Never reached the manager (waiting for a slot): recorded as
+        # received, then the same reply
+        for messageid, message in list(self._waiting.items()):
+            del self._waiting[messageid]
+            if self.manager.fail_unstarted(message, reason):
+                failed.append(messageid)
+        for task in list(self._runs.values()):
+            task.cancel()
+        if self.cluster:
+            for conversationid in {
+                getattr(self.manager.messages.get(m), 'contextId', None)
+                for m in failed
+            }:
+                await self.publish(conversationid)
+            await asyncio.to_thread(
+                self.cluster.store.publish_pending, self.cluster.worker_id, []
             )
+        metrics.inc('drain.failed', len(failed))
+        metrics.set('server.pending', self.manager.pending_count())
+        if failed:
+            print(f'[DRAIN] {len(failed)} mensagens marcadas como falhas')
+        print(f'[DRAIN] concluído em {time.monotonic() - start:.1f}s')
+        return failed
+
+    async def _process(self, message: Message):
+        # Both managers mark the message pending in this same first step,
+        # so from here on drain ends it through abort_pending
+        if self._waiting.pop(message.messageId, None) is None:
+            # Failed by drain already, while this step was scheduled
+            return
+        await self.manager.process_message(message)
+
+    async def _process_and_publish(self, message: Message):
+        """Process a message on its owner and keep the shared store current:
+        right away (the user's message), every `_publish_seconds` while the
+        run lasts and once more at the end."""
+        run = asyncio.ensure_future(self._process(message))
+        await asyncio.sleep(0)
+        try:
+            while True:
+                await self.publish(message.contextId)
+                if run.done():
+                    break
+                await asyncio.wait({run}, timeout=self._publish_seconds)
+        except asyncio.CancelledError:
+            run.cancel()
+            raise
+        if run.cancelled():
+            return
+        if run.exception():
+            print(f'[CLUSTER] falha ao processar {message.messageId}: {run.exception()!r}')
+
+    async def publish(self, conversationid: str | None):
+        """Copy a conversation, its tasks and the pending messages of this
+        worker to the shared store.
+
+        The state is copied here, on the loop, and written from a thread;
+        publishes of a conversation made while it is being written share
+        the next write (see cluster.CoalescedWrites).
+        """
+        await self._publishes.run(
+            conversationid or '',
+            lambda: self._publish_state(conversationid),
+            self._write_published,
         )
 
+    def _publish_state(self, conversationid: str | None) -> tuple:
+        """What publish writes, copied so that the runs going on in the
+        loop do not change it while the thread encodes it."""
+        messages = self.manager.messages
+        conversation = self.manager.get_conversation(conversationid)
+        published = None
+        if conversation:
+            events = self.manager.conversation_events(conversationid)
+            ids = dict.fromkeys(
+                [*conversation.messageIds, *(e.messageId for e in events)]
+            )
+            published = (
+                conversation.model_copy(
+                    update={'messageIds': list(conversation.messageIds)}
+                ),
+                messages.resolve(ids),
+                events,
+            )
+        tasks = [
+            messages.task_to_wire(t).model_copy(
+                update={
+                    'artifacts': None if t.artifacts is None else list(t.artifacts)
+                }
+            )
+            for t in self.manager.conversation_tasks(conversationid)
+        ]
+        return published, tasks, list(self.manager.get_pending_messages())
+
+    def _write_published(self, state: tuple):
+        published, tasks, pending = state
+        store = self.cluster.store
+        worker = self.cluster.worker_id
+        if published:
+            store.publish_conversation(worker, *published)
+        if tasks:
+            store.publish_tasks(worker, tasks)
+        store.publish_pending(worker, pending)
+
+    def _retain_published(
+        self, conversations: set[str], tasks: list
+    ) -> dict[str, int]:
+        """After a prune: publish every task of this worker and drop from
+        the shared store what it no longer has."""
+        store = self.cluster.store
+        worker = self.cluster.worker_id
+        store.publish_tasks(worker, tasks)
+        return {
+            'shared_conversations': store.retain_conversations(worker, conversations),
+            'shared_tasks': store.retain_tasks(worker, {t.id for t in tasks}),
+        }
+
     async def _list_messages(self, request: Request):
         message_data = await request.json()
         conversationid = message_data['params']
+        if self.cluster:
+            # Off the loop: the store may wait on another worker's write,
+            # and cache_content records file parts in it
+            return ListMessageResponse(
+                result=await asyncio.to_thread(
+                    lambda: self.cache_content(
+                        self.cluster.store.messages(conversationid)
+                    )
+                )
+            )
         conversation = self.manager.get_conversation(conversationid)
         if conversation:
             return ListMessageResponse(
-                result=self.cache_content(conversation.messages)
+                result=self.cache_content(
+                    self.manager.messages.resolve(conversation.messageIds)
+                )
             )
         return ListMessageResponse(result=[])
 
-    def cache_content(self, messages: list[Message]):
+    def cache_content(self, messages: list[Message]) -> list[Message]:
+        """Wire copies of `messages` with file parts replaced by urls.
+
+        The stored messages are not modified.
+        """
         rval = []
         for m in messages:
+            m = to_wire(m)
             messageid = get_message_id(m)
             if not messageid:
                 rval.append(m)
@@ -158,6 +609,9 @@ class ConversationServer:
                 else:
                     cache_id = str(uuid.uuid4())
                     self._message_to_cache[message_part_id] = cache_id
+                    if self.cluster:
+                        # The file may be requested from another worker
+                        self.cluster.store.add_file(cache_id, messageid, i)
                 # Replace the part data with a url reference
                 file_obj = part.get('file') if isinstance(part, dict) else getattr(part, 'file', None)
                 mime_type = file_obj.mime_type if file_obj and hasattr(file_obj, 'mime_type') else ''
@@ -173,34 +627,113 @@ class ConversationServer:
                 )
                 if cache_id not in self._file_cache:
                     self._file_cache[cache_id] = part
-            m.parts = new_parts
-            rval.append(m)
+            rval.append(m.model_copy(update={'parts': new_parts}))
         return rval
 
+    async def prune(
+        self, policy: RetentionPolicy, now: float
+    ) -> dict[str, int]:
+        """Prune the manager, then the file cache entries of removed messages."""
+        removed = await self.manager.prune(policy, now)
+        messages = self.manager.messages
+        stale = [
+            k
+            for k in self._message_to_cache
+            if k.rsplit(':', 1)[0] not in messages
+        ]
+        files = []
+        for key in stale:
+            cache_id = self._message_to_cache.pop(key)
+            files.append(self._file_cache.pop(cache_id, None))
+        removed['file_cache'] = len(stale)
+        if self.cluster:
+            # Also the tasks of no conversation, which publish misses
+            removed.update(
+                await asyncio.to_thread(
+                    self._retain_published,
+                    {c.conversationId for c in self.manager.conversations},
+                    [messages.task_to_wire(t) for t in self.manager.tasks],
+                )
+            )
+        removed['bytes'] = removed.get('bytes', 0) + approx_size(files)
+        metrics.set('store.messages', len(messages))
+        metrics.set('store.tasks', len(self.manager.tasks))
+        metrics.set('store.events', len(self.manager.events))
+        metrics.set('store.file_cache', len(self._file_cache))
+        return removed
+
     async def _pending_messages(self):
+        if self.cluster:
+            return PendingMessageResponse(
+                result=await asyncio.to_thread(self.cluster.store.pending)
+            )
         return PendingMessageResponse(
             result=self.manager.get_pending_messages()
+            + [(m, 'Na fila...') for m in self.admission.slots.queued]
         )
 
     def _list_conversation(self):
-        return ListConversationResponse(result=self.manager.conversations)
+        if self.cluster:
+            return ListConversationResponse(
+                result=[
+                    c.model_copy(update={'messages': [to_wire(m) for m in messages]})
+                    for c, messages in self.cluster.store.conversations_with_messages()
+                ]
+            )
+        messages = self.manager.messages
+        return ListConversationResponse(
+            result=[
+                messages.conversation_to_wire(c)
+                for c in self.manager.conversations
+            ]
+        )
 
     def _get_events(self):
-        return GetEventResponse(result=self.manager.events)
+        if self.cluster:
+            return GetEventResponse(
+                result=[
+                    Event.model_construct(
+                        id=e.id,
+                        actor=e.actor,
+                        content=to_wire(m),
+                        timestamp=e.timestamp,
+                    )
+                    for e, m in self.cluster.store.events()
+                ]
+            )
+        messages = self.manager.messages
+        return GetEventResponse(
+            result=[messages.event_to_wire(e) for e in self.manager.events]
+        )
 
     def _list_tasks(self):
-        return ListTaskResponse(result=self.manager.tasks)
+        if self.cluster:
+            return ListTaskResponse(result=self.cluster.store.tasks())
+        messages = self.manager.messages
+        return ListTaskResponse(
+            result=[messages.task_to_wire(t) for t in self.manager.tasks]
+        )
 
     async def _register_agent(self, request: Request):
         message_data = await request.json()
         url = message_data['params']
         self.manager.register_agent(url)
+        if self.cluster and not _forwarded(request):
+            # Every worker runs its own host agent
+            for worker in self.cluster.peers():
+                await self.cluster.forward(worker, 'agent/register', message_data)
         return RegisterAgentResponse()
 
     async def _list_agents(self):
         return ListAgentResponse(result=self.manager.agents)
 
     def _files(self, file_id):
+        if file_id not in self._file_cache and self.cluster:
+            ref = self.cluster.store.file(file_id)
+            message = self.cluster.store.message(ref[0]) if ref else None
+            if message and ref[1] < len(message.parts):
+                part = message.parts[ref[1]]
+                self._file_cache[file_id] = getattr(part, 'root', part)
         if file_id not in self._file_cache:
             raise Exception('file not found')
         part = self._file_cache[file_id]
@@ -211,6 +744,140 @@ class ConversationServer:
             )
         return Response(content=part.file.bytes, media_type=part.file.mime_type)
 
+    async def _get_trace(self, request: Request):
+        message_data = await request.json()
+        messageid = message_data['params']
+        return GetTraceResponse(
+            result=[s.to_dict() for s in tracer.get_trace(messageid)]
+        )
+
+    async def _probe(self) -> tuple[dict[str, bool], dict]:
+        """Readiness checks, run by the health monitor on every beat."""
+        pending = self.manager.pending_count()
+        metrics.set('server.pending', pending)
+        storage = True
+        if self.cluster:
+            storage = await asyncio.to_thread(self.cluster.store.ping)
+        checks = {
+            'warm': self.ready,
+            'accepting': not self.draining,
+            'queue': pending < self.health.policy.max_pending,
+            'storage': storage,
+        }
+        return checks, {'pending': pending, 'draining': self.draining}
+
+    def _get_metrics(self):
+        return GetMetricsResponse(result=metrics.snapshot())
+
+    def _shard_conversations(self):
+        return {
+            'jsonrpc': '2.0',
+            'result': [c.conversationId for c in self.manager.conversations],
+        }
+
+    async def _shard_export(self, request: Request):
+        """Bundle of a conversation, or None while it has a message in
+        flight (the router tries again later)."""
+        conversationid = (await request.json())['params']
+        bundle = None
+        if conversationid not in self._busy_conversations() and (
+            self.manager.get_conversation(conversationid)
+        ):
+            bundle = self.manager.export_conversation(conversationid)
+        return {'jsonrpc': '2.0', 'result': bundle}
+
+    def _busy_conversations(self) -> set[str | None]:
+        """Conversations with a message pending in the manager or accepted
+        by message/send and still running (or waiting for a run slot)."""
+        messageids = [m for m, _ in self.manager.get_pending_messages()]
+        busy = {
+            getattr(self.manager.messages.get(m), 'contextId', None)
+            for m in [*messageids, *self._runs]
+        }
+        busy.update(m.contextId for m in self._waiting.values())
+        return busy
+
+    async def _shard_import(self, request: Request):
+        bundle = (await request.json())['params']
+        conversation = self.manager.import_conversation(bundle)
+        return {'jsonrpc': '2.0', 'result': conversation.conversationId}
+
+    async def _shard_drop(self, request: Request):
+        conversationid = (await request.json())['params']
+        removed = self.manager.drop_conversation(conversationid)
+        return {'jsonrpc': '2.0', 'result': len(removed)}
+
+    async def _export_conversations(self, request: Request):
+        """Dump of the selected conversations (export.py), of every worker
+        in cluster mode."""
+        body = await request.body()
+        message_data = json.loads(body) if body else {}
+        try:
+            selection = Selection.from_params(message_data.get('params'))
+        except (TypeError, ValueError) as e:
+            return JSONResponse(
+                error(message_data.get('id'), -32602, f'Invalid params: {e}')
+            )
+        chunks = export_stream(self.manager, selection)
+        if self.cluster and not _forwarded(request):
+            chunks = concat(
+                chunks,
+                *(
+                    remote_export(
+                        self.cluster.http_client,
+                        self.cluster.config.workers[worker],
+                        message_data,
+                        {FORWARDED_HEADER: self.cluster.worker_id},
+                    )
+                    for worker in self.cluster.peers()
+                ),
+            )
+        filename = time.strftime('conversations-%Y%m%d-%H%M%S.jsonl.gz')
+        return StreamingResponse(
+            chunks,
+            media_type='application/gzip',
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+        )
+
+    async def _import_conversations(self, request: Request):
+        """Apply a dump, read as it arrives; `?replace=true` replaces the
+        conversations that exist. In cluster mode each conversation goes
+        to its owner."""
+        replace = request.query_params.get('replace', '').lower() in ('1', 'true')
+        counts: dict[str, int] = {}
+        try:
+            async for group in conversation_groups(read_records(request.stream())):
+                add_counts(counts, await self._import_group(request, group, replace))
+        except (zlib.error, ValueError, KeyError, httpx.HTTPError) as e:
+            print(f'[EXPORT] importação interrompida: {e!r}')
+            answer = error(None, -32602, f'Invalid dump: {e}')
+            # What was applied before the error stays applied
+            answer['error']['data'] = counts
+            return JSONResponse(answer)
+        metrics.inc('export.imported', counts.get('conversations', 0))
+        return {'jsonrpc': '2.0', 'result': counts}
+
+    async def _import_group(
+        self, request: Request, group: list[dict], replace: bool
+    ) -> dict[str, int]:
+        conversationid = conversation_id(group[0])
+        if self.cluster and not _forwarded(request):
+            owner = self.cluster.owner(conversationid)
+            if owner != self.cluster.worker_id:
+                return await remote_import(
+                    self.cluster.http_client,
+                    self.cluster.config.workers[owner],
+                    encode_records(group),
+                    replace,
+                    {FORWARDED_HEADER: self.cluster.worker_id},
+                )
+        counts = import_group(
+            self.manager, group, replace, self._busy_conversations()
+        )
+        if self.cluster:
+            await self.publish(conversationid)
+        return counts
+
     async def _update_api_key(self, request: Request):
         """Update the API key"""
         try:
@@ -224,3 +891,7 @@ class ConversationServer:
             return {'status': 'error', 'message': 'No API key provided'}
         except Exception as e:
             return {'status': 'error', 'message': str(e)}
+
+
+def _forwarded(request: Request) -> bool:
+    return FORWARDED_HEADER in request.headers
@@ -0,0 +1,345 @@
+"""SQLite (WAL) store shared by the workers of a multi-worker server.
+
+Each worker keeps its conversations in its own manager and publishes them
+here; every worker answers the read endpoints (conversation/list,
+message/list, events/get, task/list, message/pending) from this file. WAL
+lets many readers run while one worker writes, and SQLite serializes the
+writers.
+
+A published conversation replaces what the store had for it (its messages
+and events included), so the store mirrors the owner's state after each
+publish, retention trims included. Tasks are upserted one by one with the
+conversation they belong to; `retain_tasks` drops the ones the owner pruned.
+"""
+
+import json
+import sqlite3
+import threading
+
+from collections.abc import Iterable
+
+from a2a.types import Task
+
+from service.server.bundle import (
+    decode_conversation,
+    decode_event,
+    decode_message,
+    encode_conversation,
+    encode_event,
+    encode_message,
+)
+from service.server.internal_message import InternalMessage
+from service.server.message_store import EventRecord
+from service.types import Conversation
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id TEXT PRIMARY KEY,
+    context_id TEXT,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_context ON messages (context_id);
+CREATE TABLE IF NOT EXISTS events (
+    id TEXT PRIMARY KEY,
+    context_id TEXT,
+    message_id TEXT,
+    timestamp REAL NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS events_context ON events (context_id);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pending (
+    message_id TEXT PRIMARY KEY,
+    worker TEXT NOT NULL,
+    status TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS files (
+    id TEXT PRIMARY KEY,
+    message_id TEXT NOT NULL,
+    part INTEGER NOT NULL
+);
+"""
+
+
+def _dumps(data) -> str:
+    return json.dumps(data, separators=(',', ':'))
+
+
+class SharedStore:
+    def __init__(self, path: str):
+        self.path = path
+        # One connection per process, used from the event loop and from the
+        # ADK threads; the lock keeps transactions from interleaving
+        self._db = sqlite3.connect(
+            path, check_same_thread=False, isolation_level=None, timeout=30
+        )
+        self._lock = threading.Lock()
+        with self._lock:
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _write(self, statements: Iterable[tuple[str, Iterable]]):
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                for sql, rows in statements:
+                    self._db.executemany(sql, rows)
+            except BaseException:
+                self._db.execute('ROLLBACK')
+                raise
+            self._db.execute('COMMIT')
+
+    def _read(self, sql: str, args: Iterable = ()) -> list[tuple]:
+        with self._lock:
+            return self._db.execute(sql, tuple(args)).fetchall()
+
+    # Writes (owner worker)
+
+    def publish_conversation(
+        self,
+        worker: str,
+        conversation: Conversation,
+        messages: list,
+        events: list[EventRecord],
+    ):
+        conversationid = conversation.conversationId
+        self._write(
+            [
+                ('DELETE FROM messages WHERE context_id = ?', [(conversationid,)]),
+                ('DELETE FROM events WHERE context_id = ?', [(conversationid,)]),
+                (
+                    'INSERT INTO conversations (id, worker, seq, payload) '
+                    'VALUES (?, ?, (SELECT COALESCE(MAX(seq), 0) + 1 FROM '
+                    'conversations), ?) ON CONFLICT (id) DO UPDATE SET '
+                    'worker = excluded.worker, payload = excluded.payload',
+                    [
+                        (
+                            conversationid,
+                            worker,
+                            _dumps(encode_conversation(conversation)),
+                        )
+                    ],
+                ),
+                (
+                    'INSERT OR REPLACE INTO messages (id, context_id, payload) '
+                    'VALUES (?, ?, ?)',
+                    [
+                        (
+                            m.messageId,
+                            conversationid,
+                            _dumps(encode_message(m)),
+                        )
+                        for m in messages
+                    ],
+                ),
+                (
+                    'INSERT OR REPLACE INTO events (id, context_id, message_id, '
+                    'timestamp, payload) VALUES (?, ?, ?, ?, ?)',
+                    [
+                        (
+                            e.id,
+                            conversationid,
+                            e.messageId,
+                            e.timestamp,
+                            _dumps(encode_event(e)),
+                        )
+                        for e in events
+                    ],
+                ),
+            ]
+        )
+
+    def publish_tasks(self, worker: str, tasks: list[Task]):
+        """Insert or update `tasks` (history included in the payload)."""
+        self._write(
+            [
+                (
+                    'INSERT OR REPLACE INTO tasks (id, worker, payload) '
+                    'VALUES (?, ?, ?)',
+                    [
+                        (
+                            t.id,
+                            worker,
+                            _dumps(t.model_dump(mode='json', exclude_none=True)),
+                        )
+                        for t in tasks
+                    ],
+                ),
+            ]
+        )
+
+    def publish_pending(self, worker: str, pending: list[tuple[str, str]]):
+        self._write(
+            [
+                ('DELETE FROM pending WHERE worker = ?', [(worker,)]),
+                (
+                    'INSERT OR REPLACE INTO pending (message_id, worker, status) '
+                    'VALUES (?, ?, ?)',
+                    [(m, worker, status) for m, status in pending],
+                ),
+            ]
+        )
+
+    def retain_conversations(self, worker: str, keep: set[str]) -> int:
+        """Drop the conversations of `worker` that are not in `keep`."""
+        ids = [
+            (i,)
+            for (i,) in self._read(
+                'SELECT id FROM conversations WHERE worker = ?', (worker,)
+            )
+            if i not in keep
+        ]
+        if ids:
+            self._write(
+                [
+                    ('DELETE FROM conversations WHERE id = ?', ids),
+                    ('DELETE FROM messages WHERE context_id = ?', ids),
+                    ('DELETE FROM events WHERE context_id = ?', ids),
+                ]
+            )
+        return len(ids)
+
+    def retain_tasks(self, worker: str, keep: set[str]) -> int:
+        """Drop the tasks of `worker` whose id is not in `keep`."""
+        ids = [
+            (i,)
+            for (i,) in self._read('SELECT id FROM tasks WHERE worker = ?', (worker,))
+            if i not in keep
+        ]
+        if ids:
+            self._write([('DELETE FROM tasks WHERE id = ?', ids)])
+        return len(ids)
+
+    def add_file(self, file_id: str, messageid: str, part: int):
+        self._write(
+            [
+                (
+                    'INSERT OR IGNORE INTO files (id, message_id, part) '
+                    'VALUES (?, ?, ?)',
+                    [(file_id, messageid, part)],
+                )
+            ]
+        )
+
+    # Reads (any worker)
+
+    def conversations(self) -> list[Conversation]:
+        return [
+            decode_conversation(json.loads(payload))
+            for (payload,) in self._read(
+                'SELECT payload FROM conversations ORDER BY seq'
+            )
+        ]
+
+    def conversation(self, conversationid: str) -> Conversation | None:
+        rows = self._read(
+            'SELECT payload FROM conversations WHERE id = ?', (conversationid,)
+        )
+        return decode_conversation(json.loads(rows[0][0])) if rows else None
+
+    def messages(self, conversationid: str) -> list[InternalMessage]:
+        """Messages of a conversation, in the order of its messageIds."""
+        conversation = self.conversation(conversationid)
+        if conversation is None:
+            return []
+        by_id = {
+            i: payload
+            for i, payload in self._read(
+                'SELECT id, payload FROM messages WHERE context_id = ?',
+                (conversationid,),
+            )
+        }
+        return [
+            decode_message(json.loads(by_id[i]))
+            for i in conversation.messageIds
+            if i in by_id
+        ]
+
+    def conversations_with_messages(
+        self,
+    ) -> list[tuple[Conversation, list[InternalMessage]]]:
+        """Every conversation with its messages (conversation/list): two
+        queries in one read transaction, not one per conversation."""
+        with self._lock:
+            self._db.execute('BEGIN')
+            try:
+                conversations = self._db.execute(
+                    'SELECT payload FROM conversations ORDER BY seq'
+                ).fetchall()
+                messages = self._db.execute(
+                    'SELECT id, context_id, payload FROM messages'
+                ).fetchall()
+            finally:
+                self._db.execute('COMMIT')
+        by_conversation: dict[str, dict[str, str]] = {}
+        for messageid, contextid, payload in messages:
+            by_conversation.setdefault(contextid, {})[messageid] = payload
+        result = []
+        for (payload,) in conversations:
+            conversation = decode_conversation(json.loads(payload))
+            by_id = by_conversation.get(conversation.conversationId, {})
+            result.append(
+                (
+                    conversation,
+                    [
+                        decode_message(json.loads(by_id[i]))
+                        for i in conversation.messageIds
+                        if i in by_id
+                    ],
+                )
+            )
+        return result
+
+    def message(self, messageid: str) -> InternalMessage | None:
+        rows = self._read('SELECT payload FROM messages WHERE id = ?', (messageid,))
+        return decode_message(json.loads(rows[0][0])) if rows else None
+
+    def events(self) -> list[tuple[EventRecord, InternalMessage | None]]:
+        rows = self._read(
+            'SELECT e.payload, m.payload FROM events e LEFT JOIN messages m '
+            'ON m.id = e.message_id ORDER BY e.timestamp'
+        )
+        return [
+            (
+                decode_event(json.loads(event)),
+                decode_message(json.loads(message)) if message else None,
+            )
+            for event, message in rows
+        ]
+
+    def tasks(self) -> list[Task]:
+        return [
+            Task.model_validate(json.loads(payload))
+            for (payload,) in self._read('SELECT payload FROM tasks')
+        ]
+
+    def pending(self) -> list[tuple[str, str]]:
+        return [tuple(row) for row in self._read('SELECT message_id, status FROM pending')]
+
+    def ping(self) -> bool:
+        """The database answers (health probes)."""
+        try:
+            return self._read('SELECT 1') == [(1,)]
+        except sqlite3.Error:
+            return False
+
+    def file(self, file_id: str) -> tuple[str, int] | None:
+        rows = self._read('SELECT message_id, part FROM files WHERE id = ?', (file_id,))
+        return tuple(rows[0]) if rows else None
@@ -0,0 +1,229 @@
+"""Binary snapshots of the manager state for warm restarts.
+
+Layout (little endian, no pickle):
+
+    b'A2ASNAP1'                                     magic
+    [kind: u8][length: u32][payload: length bytes]  frame, repeated
+    [index_offset: u64][b'A2ASNAP1']                trailer
+
+Each payload is zlib-compressed JSON. Conversation frames hold a bundle
+(see service.server.bundle); task, agent and state frames (events and
+messages outside conversations, ADK user/app state) hold their own dicts. The last frame is the index: where every other frame starts, plus
+what `conversation/list` needs (name, isActive, last activity) so a restore
+reads the trailer, the index and the small frames, and leaves each
+conversation on disk until it is first accessed.
+
+Snapshots are written to `<path>.tmp` and renamed, so a crash while writing
+keeps the previous snapshot.
+"""
+
+import asyncio
+import json
+import os
+import struct
+import time
+import zlib
+
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from service.server.metrics import metrics
+from service.server.policy import policy_from_env
+
+
+MAGIC = b'A2ASNAP1'
+_FRAME = struct.Struct('<BI')
+_TRAILER = struct.Struct('<Q8s')
+
+FRAME_CONVERSATION = 1
+FRAME_TASK = 2
+FRAME_AGENT = 3
+FRAME_STATE = 4
+FRAME_INDEX = 5
+
+
+def encode_payload(data: dict[str, Any]) -> bytes:
+    return zlib.compress(
+        json.dumps(data, separators=(',', ':')).encode('utf-8'), 1
+    )
+
+
+def decode_payload(raw: bytes) -> dict[str, Any]:
+    return json.loads(zlib.decompress(raw))
+
+
+class SnapshotWriter:
+    def __init__(self, path: str):
+        self.path = path
+        self._tmp = f'{path}.tmp'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(self._tmp, 'wb')
+        self._file.write(MAGIC)
+
+    def write(self, kind: int, data: dict[str, Any]) -> int:
+        """Append a frame and return its offset."""
+        return self.write_raw(kind, encode_payload(data))
+
+    def write_raw(self, kind: int, raw: bytes) -> int:
+        offset = self._file.tell()
+        self._file.write(_FRAME.pack(kind, len(raw)))
+        self._file.write(raw)
+        return offset
+
+    def close(self, index: dict[str, Any]):
+        self.finish(index)
+        self.commit(self.path)
+
+    def finish(self, index: dict[str, Any]):
+        """Write the index and the trailer to `<path>.tmp`; `commit` then
+        puts it in place."""
+        offset = self.write(FRAME_INDEX, index)
+        self._file.write(_TRAILER.pack(offset, MAGIC))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+
+    @staticmethod
+    def commit(path: str):
+        os.replace(f'{path}.tmp', path)
+
+    def abort(self):
+        self._file.close()
+        os.remove(self._tmp)
+
+
+class SnapshotReader:
+    """Random access to the frames of a snapshot; reads only what is asked."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(MAGIC)) != MAGIC:
+            self._file.close()
+            raise ValueError(f'{path} is not a snapshot')
+        size = os.fstat(self._file.fileno()).st_size
+        if size >= len(MAGIC) + _TRAILER.size:
+            self._file.seek(-_TRAILER.size, os.SEEK_END)
+            offset, magic = _TRAILER.unpack(self._file.read(_TRAILER.size))
+        else:
+            magic = b''
+        if magic != MAGIC:
+            self._file.close()
+            raise ValueError(f'{path} is truncated')
+        kind, self.index = self.read(offset)
+        if kind != FRAME_INDEX:
+            self._file.close()
+            raise ValueError(f'{path} has no index')
+
+    def __enter__(self) -> 'SnapshotReader':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_raw(self, offset: int) -> tuple[int, bytes]:
+        self._file.seek(offset)
+        kind, length = _FRAME.unpack(self._file.read(_FRAME.size))
+        return kind, self._file.read(length)
+
+    def read(self, offset: int) -> tuple[int, dict[str, Any]]:
+        kind, raw = self.read_raw(offset)
+        return kind, decode_payload(raw)
+
+    def close(self):
+        self._file.close()
+
+
+def read_frame_raw(path: str, offset: int) -> bytes:
+    """Read one frame without loading the index (lazy conversation loads)."""
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        _, length = _FRAME.unpack(f.read(_FRAME.size))
+        return f.read(length)
+
+
+def read_frame(path: str, offset: int) -> dict[str, Any]:
+    return decode_payload(read_frame_raw(path, offset))
+
+
+@dataclass
+class SnapshotPolicy:
+    # Empty disables snapshots
+    path: str = ''
+    # 0 only writes on shutdown
+    interval_seconds: float = 300.0
+
+    @classmethod
+    def from_env(cls) -> 'SnapshotPolicy':
+        return policy_from_env(cls, 'SNAPSHOT')
+
+
+class Snapshotter:
+    """Awaits `write(path)` every `interval_seconds` and once more on `stop()`.
+
+    `write` (ApplicationManager.save_snapshot) copies the state on the event
+    loop and encodes it in a thread, so requests and health probes keep
+    being served while a snapshot is written. One write at a time.
+
+    Configured with A2A_SNAPSHOT_PATH (empty disables snapshots) and
+    A2A_SNAPSHOT_INTERVAL_SECONDS (default 300; 0 only writes on shutdown).
+    """
+
+    def __init__(
+        self,
+        write: Callable[[str], Awaitable[bool]],
+        path: str,
+        interval_seconds: float,
+    ):
+        self.write = write
+        self.path = path
+        self.interval_seconds = interval_seconds
+        self._task: asyncio.Task | None = None
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def from_env(
+        cls, write: Callable[[str], Awaitable[bool]]
+    ) -> 'Snapshotter | None':
+        policy = SnapshotPolicy.from_env()
+        if not policy.path:
+            return None
+        return cls(write, policy.path, policy.interval_seconds)
+
+    def start(self):
+        if self._task is None and self.interval_seconds > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.snapshot()
+
+    async def snapshot(self):
+        async with self._lock:
+            start = time.perf_counter()
+            try:
+                if not await self.write(self.path):
+                    return
+            except Exception as e:
+                print(f'[SNAPSHOT] falhou: {e!r}')
+                metrics.inc('snapshot.failures')
+                return
+            elapsed = time.perf_counter() - start
+            metrics.inc('snapshot.writes')
+            metrics.observe('snapshot.write_seconds', elapsed)
+            metrics.set('snapshot.bytes', os.path.getsize(self.path))
+            print(f'[SNAPSHOT] {self.path} gravado em {elapsed:.2f}s')
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            # stop() cancelling the loop does not cut a write in half: the
+            # final snapshot waits for it on the lock
+            await asyncio.shield(self.snapshot())
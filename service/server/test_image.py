@@ -3,11 +3,12 @@ import uuid
 from a2a.types import (
     FilePart,
     FileWithUri,
-    Message,
     Part,
     Role,
 )
 
+from service.types import Message
+
 
 test_image = Message(
     role=Role.agent,
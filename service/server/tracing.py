@@ -0,0 +1,208 @@
+"""Span-based tracing of message processing.
+
+Every trace is keyed by the messageId that started it at `/message/send`. Spans
+are kept in a bounded in-memory ring buffer so the latest traces can be
+inspected through `/trace/get`, and can optionally be appended to a local JSONL
+collector file (A2A_TRACE_EXPORT) for offline analysis.
+"""
+
+import asyncio
+import contextvars
+import json
+import threading
+import time
+import uuid
+
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Iterator
+
+from service.server.policy import policy_from_env
+
+
+@dataclass
+class Span:
+    """A timed step of a trace. Instant events have start == end."""
+
+    trace_id: str
+    span_id: str
+    name: str
+    start: float
+    end: float | None = None
+    parent_id: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def duration_ms(self) -> float:
+        if self.end is None:
+            return 0.0
+        return (self.end - self.start) * 1000
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data['duration_ms'] = round(self.duration_ms, 3)
+        return data
+
+
+_current_span: contextvars.ContextVar[Span | None] = contextvars.ContextVar(
+    'a2a_current_span', default=None
+)
+
+
+@dataclass
+class TracePolicy:
+    # Traces kept in memory, the oldest dropped first (A2A_TRACE_BUFFER)
+    buffer: int = 1000
+    # JSONL collector file; empty keeps traces in memory only
+    export: str = ''
+
+    @classmethod
+    def from_env(cls) -> 'TracePolicy':
+        return policy_from_env(cls, 'TRACE')
+
+
+class Tracer:
+    """Collects spans per message id in a bounded ring buffer."""
+
+    def __init__(
+        self,
+        capacity: int = 1000,
+        max_spans_per_trace: int = 512,
+        export_path: str | None = None,
+    ):
+        self.capacity = capacity
+        self.max_spans_per_trace = max_spans_per_trace
+        self.export_path = export_path
+        self._traces: OrderedDict[str, list[Span]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        policy = TracePolicy.from_env()
+        return cls(capacity=policy.buffer, export_path=policy.export or None)
+
+    def start_trace(self, trace_id: str, name: str, **attributes) -> Span:
+        """Open the root span of a trace. It must be closed with finish()."""
+        span = Span(
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            name=name,
+            start=time.time(),
+            attributes=attributes,
+        )
+        self._add(span)
+        return span
+
+    def finish(self, span: Span | None, **attributes):
+        if not span or span.end is not None:
+            return
+        span.end = time.time()
+        span.attributes.update(attributes)
+        self._export(span)
+
+    @contextmanager
+    def span(
+        self, name: str, trace_id: str | None = None, **attributes
+    ) -> Iterator[Span | None]:
+        """Time a block as a child of the current span.
+
+        Without an explicit trace_id the span joins the trace of the current
+        context; when there is none the block runs untraced.
+        """
+        parent = _current_span.get()
+        trace_id = trace_id or (parent.trace_id if parent else None)
+        if not trace_id:
+            yield None
+            return
+        span = Span(
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            name=name,
+            start=time.time(),
+            parent_id=self._parent_id(trace_id, parent),
+            attributes=attributes,
+        )
+        self._add(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.attributes['error'] = type(e).__name__
+            raise
+        finally:
+            _current_span.reset(token)
+            self.finish(span)
+
+    def record(
+        self,
+        name: str,
+        start: float,
+        end: float | None = None,
+        trace_id: str | None = None,
+        **attributes,
+    ) -> Span | None:
+        """Record an already measured span (or an instant event)."""
+        parent = _current_span.get()
+        trace_id = trace_id or (parent.trace_id if parent else None)
+        if not trace_id:
+            return None
+        span = Span(
+            trace_id=trace_id,
+            span_id=uuid.uuid4().hex[:16],
+            name=name,
+            start=start,
+            end=start if end is None else end,
+            parent_id=self._parent_id(trace_id, parent),
+            attributes=attributes,
+        )
+        self._add(span)
+        self._export(span)
+        return span
+
+    def get_trace(self, trace_id: str) -> list[Span]:
+        with self._lock:
+            return list(self._traces.get(trace_id, []))
+
+    def trace_ids(self) -> list[str]:
+        with self._lock:
+            return list(self._traces.keys())
+
+    def _parent_id(self, trace_id: str, parent: Span | None) -> str | None:
+        if parent and parent.trace_id == trace_id:
+            return parent.span_id
+        # Work resumed on another thread/task hangs off the root span.
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return spans[0].span_id if spans else None
+
+    def _add(self, span: Span):
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > self.capacity:
+                    self._traces.popitem(last=False)
+            if len(spans) < self.max_spans_per_trace:
+                spans.append(span)
+
+    def _export(self, span: Span):
+        if not self.export_path:
+            return
+        line = json.dumps(span.to_dict(), default=str)
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Finished in a worker thread: it can wait for the file
+            self._append(line)
+            return
+        # The event loop does not wait for the file
+        loop.run_in_executor(None, self._append, line)
+
+    def _append(self, line: str):
+        with self._lock:
+            with open(self.export_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+
+
+tracer = Tracer.from_env()
@@ -0,0 +1,176 @@
+"""Warm-up phase run by the FastAPI lifespan before the server is ready.
+
+Without it the first message after a deploy pays for everything built on
+demand: the host runner and its session service, the agent cards of the
+remote agents, the first validation and serialization of the a2a / pydantic
+types on every response path and, for the real model, the first request.
+`warm_up` does that work once, each step timed as `warmup.<step>_seconds`,
+and only then sets `ConversationServer.ready`.
+
+A step that fails is logged and skipped: a cold path is better than a
+server that never becomes ready. The whole phase is bounded by
+`timeout_seconds`.
+
+Every field can be set from the environment as A2A_WARMUP_<FIELD>.
+"""
+
+import asyncio
+import time
+
+from dataclasses import dataclass
+
+from a2a.types import (
+    AgentCard,
+    Part,
+    Role,
+    Task,
+    TaskState,
+    TaskStatus,
+    TextPart,
+)
+from fastapi.encoders import jsonable_encoder
+
+from service.server.bundle import decode_message, encode_message
+from service.server.deadlines import DeadlinePolicy
+from service.server.internal_message import to_wire
+from service.server.message_store import MessageStore
+from service.server.metrics import metrics
+from service.server.normalize import normalize_message
+from service.server.policy import policy_from_env
+from service.types import (
+    Conversation,
+    GetEventResponse,
+    ListConversationResponse,
+    ListMessageResponse,
+    ListTaskResponse,
+    Message,
+    MessageInfo,
+    SendMessageResponse,
+)
+from utils.agent_card import get_agent_card
+
+
+@dataclass
+class WarmupPolicy:
+    enabled: bool = True
+    # Remote agents registered at startup (comma separated urls)
+    agent_urls: str = ''
+    # Also run one tiny turn through the model (costs a model call)
+    model_ping: bool = False
+    timeout_seconds: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> 'WarmupPolicy':
+        return policy_from_env(cls, 'WARMUP')
+
+    @property
+    def urls(self) -> list[str]:
+        return [u.strip() for u in self.agent_urls.split(',') if u.strip()]
+
+
+async def warm_up(server, policy: WarmupPolicy) -> dict[str, float]:
+    """Run the warm-up steps on `server` (a ConversationServer) and mark it
+    ready; returns the seconds spent per step."""
+    timings: dict[str, float] = {}
+    if policy.enabled:
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(
+                _steps(server, policy, timings), policy.timeout_seconds
+            )
+        except asyncio.TimeoutError:
+            print(f'[WARMUP] tempo esgotado após {policy.timeout_seconds}s')
+        timings['total'] = time.perf_counter() - start
+        metrics.observe('warmup.seconds', timings['total'])
+        print(
+            '[WARMUP] '
+            + ', '.join(f'{k}={v * 1000:.0f}ms' for k, v in timings.items())
+        )
+    server.ready = True
+    metrics.set('server.ready', 1)
+    return timings
+
+
+async def _steps(server, policy: WarmupPolicy, timings: dict[str, float]):
+    # Independent of each other: the agent cards are network bound
+    await asyncio.gather(
+        _step('agents', _register_agents(server.manager, policy.urls), timings),
+        _step('runner', server.manager.warm_up(ping_model=False), timings),
+    )
+    await _step('serialization', _serialization(), timings)
+    if policy.model_ping:
+        await _step('model_ping', server.manager.warm_up(ping_model=True), timings)
+
+
+async def _step(name: str, coroutine, timings: dict[str, float]):
+    start = time.perf_counter()
+    try:
+        await coroutine
+    except Exception as e:
+        metrics.inc('warmup.failures')
+        print(f'[WARMUP] etapa {name} falhou: {e!r}')
+    timings[name] = time.perf_counter() - start
+    metrics.observe(f'warmup.{name}_seconds', timings[name])
+
+
+async def _register_agents(manager, urls: list[str]):
+    """Fetch the agent cards concurrently, then register them at once."""
+    if not urls:
+        return
+    results = await asyncio.gather(
+        *(asyncio.to_thread(_agent_card, url) for url in urls),
+        return_exceptions=True,
+    )
+    cards = []
+    for url, result in zip(urls, results):
+        if isinstance(result, Exception):
+            print(f'[WARMUP] agente {url} indisponível: {result!r}')
+        else:
+            cards.append(result)
+    manager.add_agents(cards)
+
+
+def _agent_card(url: str) -> AgentCard:
+    deadlines = DeadlinePolicy.from_env()
+    card = get_agent_card(url, deadlines.limit(deadlines.remote_call_seconds))
+    if not card.url:
+        card.url = url
+    return card
+
+
+async def _serialization():
+    """One pass over the conversions every response goes through, on a
+    scratch store."""
+    store = MessageStore()
+    message = store.add(
+        normalize_message(
+            Message(
+                messageId='warmup',
+                contextId='warmup',
+                role=Role.user,
+                parts=[Part(root=TextPart(text='warm-up'))],
+            )
+        )
+    )
+    decode_message(encode_message(message))
+    conversation = Conversation(conversationid='warmup', isactive=True)
+    conversation.messageIds.append(message.messageId)
+    event = store.record_event('warmup', 'user', message, time.time())
+    task = store.intern_task(
+        Task(
+            id='warmup',
+            contextId='warmup',
+            status=TaskStatus(state=TaskState.completed, message=to_wire(message)),
+        )
+    )
+    # The same encoder FastAPI applies to the route results
+    for response in (
+        SendMessageResponse(
+            result=MessageInfo(messageid='warmup', contextid='warmup')
+        ),
+        ListMessageResponse(result=[to_wire(message)]),
+        ListConversationResponse(result=[store.conversation_to_wire(conversation)]),
+        GetEventResponse(result=[store.event_to_wire(event)]),
+        ListTaskResponse(result=[store.task_to_wire(task)]),
+    ):
+        jsonable_encoder(response)
@@ -6,15 +6,15 @@ Conformidade total com A2A Protocol, Google ADK e Pydantic.
 from typing import Annotated, Any, Literal, Optional, Union, List, Tuple, Dict
 from uuid import uuid4
 from pydantic import BaseModel, Field, TypeAdapter
-import sys
 
 # Tentar importar Role do a2a se disponível
 try:
-    from a2a.types import Role, Message as A2AMessage
+    from a2a.types import Role, Message as A2AMessage, Task as A2ATask
     HAS_A2A = True
 except ImportError:
     Role = None
     A2AMessage = None
+    A2ATask = None
     HAS_A2A = False
 
 
@@ -51,6 +51,9 @@ class Message(BaseModel):
     parts: List[Any] = Field(default_factory=list)
     role: Optional[Any] = Field(default="user")
     metadata: Optional[Dict[str, Any]] = Field(default=None)
+    # 1 para mensagens armazenadas, que não são alteradas depois (ver
+    # service/server/normalize.py): (messageId, version) identifica o conteúdo
+    version: int = Field(default=0)
     
     def __init__(self, **data):
         """
@@ -142,6 +145,9 @@ class ConversationFixed(BaseModel):
     isActive: bool = Field(alias="isactive")
     name: str = ''
     task_ids: List[str] = Field(default_factory=list)
+    # Ids das mensagens, na ordem; no servidor as mensagens ficam no
+    # MessageStore e `messages` só é preenchido ao serializar a resposta
+    messageIds: List[str] = Field(default_factory=list)
     messages: List[Any] = Field(default_factory=list)  # Lista de mensagens
     
     class Config:
@@ -256,7 +262,8 @@ class ListTaskRequest(JSONRPCRequest):
 
 
 class ListTaskResponse(JSONRPCResponse):
-    result: Union[List[Task], None] = None
+    # Tarefas do protocolo A2A (os managers trabalham com a2a.types.Task)
+    result: Union[List[A2ATask if HAS_A2A else Task], None] = None
 
 
 class RegisterAgentRequest(JSONRPCRequest):
@@ -276,6 +283,34 @@ class ListAgentResponse(JSONRPCResponse):
     result: Union[List[AgentCard], None] = None
 
 
+class GetTraceRequest(JSONRPCRequest):
+    method: Literal['trace/get'] = 'trace/get'
+    params: str  # messageId
+
+
+class GetTraceResponse(JSONRPCResponse):
+    result: Union[List[Dict[str, Any]], None] = None
+
+
+class CancelMessageRequest(JSONRPCRequest):
+    method: Literal['message/cancel'] = 'message/cancel'
+    params: MessageInfoFixed  # contextId decide o worker/shard dono
+
+
+class CancelMessageResponse(JSONRPCResponse):
+    # False quando a mensagem já não estava pendente
+    result: Union[bool, None] = None
+
+
+class GetMetricsRequest(JSONRPCRequest):
+    method: Literal['metrics/get'] = 'metrics/get'
+
+
+class GetMetricsResponse(JSONRPCResponse):
+    # {'counters': {...}, 'gauges': {...}, 'timings': {nome: {count, p50, p95, max}}}
+    result: Union[Dict[str, Any], None] = None
+
+
 # ========== ADAPTERS E EXCEPTIONS ==========
 
 AgentRequest = TypeAdapter(
@@ -305,29 +340,45 @@ class AgentClientJSONError(AgentClientError):
 
 # ========== PATCH A2A.TYPES SE DISPONÍVEL ==========
 
+_a2a_patched = False
+
+
 def patch_a2a_message():
     """
     Aplica o patch no módulo a2a.types para usar nossa versão consolidada de Message.
     Garante conformidade total com A2A Protocol.
+
+    Não roda ao importar este módulo: o código do repositório importa Message
+    daqui, e só os modelos do a2a que contêm mensagens (Task, TaskStatus...)
+    precisam do patch. Os managers e o ConversationClient chamam ao serem
+    criados; processos sem eles (o router, ferramentas) não pagam o rebuild.
+    Chamar de novo não faz nada.
     """
-    if HAS_A2A:
-        import a2a.types
-        
-        # Substituir a classe Message no módulo a2a.types
-        a2a.types.Message = Message
-        
-        # Também atualizar no cache de módulos
-        if 'a2a.types' in sys.modules:
-            sys.modules['a2a.types'].Message = Message
-        
-        print("[TYPES] a2a.types.Message patchado - conformidade total com A2A Protocol")
+    global _a2a_patched
+    if not HAS_A2A:
+        return False
+    if _a2a_patched:
         return True
-    return False
-
-
-# Aplicar patch automaticamente ao importar este módulo
-if HAS_A2A:
-    patch_a2a_message()
+    import a2a.types
+
+    # Substituir a classe Message no módulo a2a.types
+    a2a.types.Message = Message
+
+    # Modelos do a2a que referenciam Message precisam validar a versão
+    # consolidada, senão Task(history=[message]) é rejeitado
+    a2a.types.TaskStatus.model_fields['message'].annotation = Optional[Message]
+    a2a.types.Task.model_fields['history'].annotation = Optional[List[Message]]
+    for model in (
+        a2a.types.TaskStatus,
+        a2a.types.Task,
+        a2a.types.TaskStatusUpdateEvent,
+        ListTaskResponse,
+    ):
+        model.model_rebuild(force=True)
+    _a2a_patched = True
+
+    print("[TYPES] a2a.types.Message patchado - conformidade total com A2A Protocol")
+    return True
 
 
 # ========== ALIASES PARA COMPATIBILIDADE ==========
@@ -1,14 +1,17 @@
 import json
 import os
 import sys
+import threading
 import traceback
 import uuid
 
+from collections import OrderedDict
 from typing import Any
 
-from a2a.types import FileWithBytes, Message, Part, Task, TaskState
+from a2a.types import FileWithBytes, Part, Task, TaskState
 from service.client.client import ConversationClient
 from service.types import (
+    CancelMessageRequest,
     Conversation,
     CreateConversationRequest,
     Event,
@@ -17,6 +20,7 @@ from service.types import (
     ListConversationRequest,
     ListMessageRequest,
     ListTaskRequest,
+    Message,
     MessageInfo,
     PendingMessageRequest,
     RegisterAgentRequest,
@@ -57,6 +61,20 @@ async def SendMessage(message: Message) -> Message | MessageInfo | None:
     return None
 
 
+async def CancelMessage(messageid: str, conversationid: str) -> bool:
+    client = ConversationClient(server_url)
+    try:
+        response = await client.cancel_message(
+            CancelMessageRequest(
+                params=MessageInfo(messageId=messageid, contextId=conversationid)
+            )
+        )
+        return bool(response.result)
+    except Exception as e:
+        print('Failed to cancel message: ', e)
+    return False
+
+
 async def CreateConversation() -> Conversation:
     client = ConversationClient(server_url)
     try:
@@ -136,29 +154,27 @@ async def ListMessages(conversationid: str) -> list[Message]:
 async def UpdateAppState(state: AppState, conversationid: str):
     """Update the app state."""
     try:
+        # Every list of a refresh in one round trip
+        requests = [
+            ListConversationRequest(),
+            ListTaskRequest(),
+            PendingMessageRequest(),
+        ]
+        if conversationid:
+            requests.append(ListMessageRequest(params=conversationid))
+        responses = await ConversationClient(server_url).batch(requests)
+        for response in responses:
+            if response.error:
+                print('Failed to update state: ', response.error.message)
+        conversations, tasks, pending = (r.result for r in responses[:3])
         if conversationid:
             state.current_conversation_id = conversationid
-            messages = await ListMessages(conversationid)
-            if not messages:
-                state.messages = []
-            else:
-                # Converter mensagens e aplicar lógica alternada para detectar role
-                converted_messages = []
-                for i, msg in enumerate(messages):
-                    # Mensagens ímpares (0, 2, 4...) são do usuário
-                    # Mensagens pares (1, 3, 5...) são do agente
-                    state_msg = convert_message_to_state(msg)
-                    
-                    # Se o role não foi detectado corretamente, usar posição
-                    if state_msg.role == 'user' and i % 2 == 1:
-                        # Posição ímpar deve ser agente
-                        state_msg.role = 'agent'
-                        print(f"[DEBUG] Corrigido message {state_msg.messageId} para agent pela posição {i}")
-                    
-                    converted_messages.append(state_msg)
-                
-                state.messages = converted_messages
-        conversations = await ListConversations()
+            messages = responses[3].result or []
+            # Roles come normalized from the server; unchanged messages hit
+            # the conversion cache and an unchanged list is not reassigned.
+            keys = [(m.messageId, m.version) for m in messages]
+            if keys != [(m.messageId, m.version) for m in state.messages]:
+                state.messages = [convert_message_to_state(m) for m in messages]
         if not conversations:
             state.conversations = []
         else:
@@ -167,14 +183,14 @@ async def UpdateAppState(state: AppState, conversationid: str):
             ]
 
         state.task_list = []
-        for task in await GetTasks():
+        for task in tasks or []:
             state.task_list.append(
                 SessionTask(
                     contextId=extract_conversation_id(task),
                     task=convert_task_to_state(task),
                 )
             )
-        state.background_tasks = await GetProcessingMessages()
+        state.background_tasks = dict(pending or [])
         state.message_aliases = GetMessageAliases()
     except Exception as e:
         print('Failed to update state: ', e)
@@ -201,56 +217,47 @@ async def UpdateApiKey(api_key: str):
         return False
 
 
+# Conversions of server-stored messages, keyed by (messageId, version).
+# The cached StateMessage objects are shared and must not be mutated.
+_STATE_MESSAGE_CACHE_SIZE = 10_000
+_state_message_cache: OrderedDict[tuple[str, int], StateMessage] = OrderedDict()
+_state_message_cache_lock = threading.Lock()
+
+
 def convert_message_to_state(message: Message) -> StateMessage:
     if not message:
         return StateMessage()
-
-    # Estratégia múltipla para detectar role
-    role_value = 'user'  # Valor padrão
-    
-    # 1. Verificar se role existe e é enum ou string
-    if hasattr(message, 'role') and message.role is not None:
-        if hasattr(message.role, 'name'):
-            role_value = message.role.name
-            print(f"[DEBUG] Message {message.messageId}: Role enum = {role_value}")
-        else:
-            role_value = str(message.role)
-            print(f"[DEBUG] Message {message.messageId}: Role string = {role_value}")
-    
-    # 2. Se não tem role, verificar taskId (mensagens com taskId geralmente são do agente)
-    elif hasattr(message, 'taskId') and message.taskId:
-        role_value = 'agent'
-        print(f"[DEBUG] Message {message.messageId}: Detectado como agent pelo taskId: {message.taskId}")
-    
-    # 3. Verificar se tem author e contém 'agent' ou 'gemini'
-    elif hasattr(message, 'author'):
-        author_str = str(message.author).lower()
-        if 'agent' in author_str or 'gemini' in author_str or 'ai' in author_str:
-            role_value = 'agent'
-            print(f"[DEBUG] Message {message.messageId}: Detectado como agent pelo author: {message.author}")
-        else:
-            print(f"[DEBUG] Message {message.messageId}: Author encontrado mas não é agent: {message.author}")
-    
-    # 4. Verificar conteúdo da mensagem (heurística adicional)
-    elif hasattr(message, 'parts') and message.parts:
-        # Se a mensagem tem conteúdo complexo ou formatado, pode ser do agente
-        content_str = str(message.parts).lower()
-        if 'olá' in content_str and 'como posso' in content_str:
-            role_value = 'agent'
-            print(f"[DEBUG] Message {message.messageId}: Detectado como agent pelo conteúdo")
+    version = getattr(message, 'version', 0)
+    key = (message.messageId, version)
+    if version:
+        with _state_message_cache_lock:
+            cached = _state_message_cache.get(key)
+            if cached is not None:
+                _state_message_cache.move_to_end(key)
+                return cached
+
+    role = message.role
+    if role is None:
+        role_value = 'agent' if message.taskId else 'user'
     else:
-        print(f"[DEBUG] Message {message.messageId}: Usando padrão user - nenhuma detecção funcionou")
-
-    # Log final
-    print(f"[DEBUG] Final role for message {message.messageId}: {role_value}")
+        role_value = getattr(role, 'name', None) or str(role)
+        if role_value == 'model':
+            role_value = 'agent'
 
-    return StateMessage(
+    state_message = StateMessage(
         messageId=message.messageId,  # Usando camelCase padrão
         contextId=message.contextId if message.contextId else '',
-        taskId=getattr(message, 'taskId', '') or '',  # Garante string vazia se None
+        taskId=message.taskId or '',  # Garante string vazia se None
         role=role_value,
         content=extract_content(message.parts),
+        version=version,
     )
+    if version:
+        with _state_message_cache_lock:
+            _state_message_cache[key] = state_message
+            if len(_state_message_cache) > _STATE_MESSAGE_CACHE_SIZE:
+                _state_message_cache.popitem(last=False)
+    return state_message
 
 
 def convert_conversation_to_state(
@@ -260,7 +267,8 @@ def convert_conversation_to_state(
         conversationId=conversation.conversationId,  # Usar campo real camelCase
         conversationName=conversation.name,
         isActive=conversation.isActive,  # Usar campo real camelCase
-        messageIds=[extract_message_id(x) for x in conversation.messages],
+        messageIds=conversation.messageIds
+        or [extract_message_id(x) for x in conversation.messages],
     )
 
 
@@ -342,38 +350,36 @@ def extract_content(
     if not message_parts:
         return []
     for part in message_parts:
-        # Handle both dict and object formats
-        if isinstance(part, dict):
-            if 'root' in part:
-                p = part['root']
-            else:
-                p = part
-        elif hasattr(part, 'root'):
-            p = part.root
+        p = part.root if isinstance(part, Part) else part
+        if isinstance(p, dict):
+            # Not normalized by the server (e.g. built locally from JSON)
+            p = p.get('root', p)
+            kind = p.get('kind')
+            text, file_obj, data = p.get('text', ''), p.get('file'), p.get('data')
         else:
-            p = part
-            
-        # Get kind attribute safely
-        kind = p.get('kind') if isinstance(p, dict) else getattr(p, 'kind', None)
-        
+            kind = getattr(p, 'kind', None)
+            text = getattr(p, 'text', '')
+            file_obj = getattr(p, 'file', None)
+            data = getattr(p, 'data', None)
+
         if kind == 'text':
-            text = p.get('text') if isinstance(p, dict) else getattr(p, 'text', '')
             parts.append((text, 'text/plain'))
         elif kind == 'file':
-            file_obj = p.get('file') if isinstance(p, dict) else getattr(p, 'file', None)
-            if file_obj and isinstance(file_obj, FileWithBytes):
+            if isinstance(file_obj, dict):
+                content = file_obj.get('bytes') or file_obj.get('uri')
+                mime_type = file_obj.get('mime_type') or file_obj.get('mimeType')
+                parts.append((content or '', mime_type or ''))
+            elif isinstance(file_obj, FileWithBytes):
                 parts.append((file_obj.bytes, file_obj.mime_type or ''))
             elif file_obj:
                 parts.append((file_obj.uri, file_obj.mime_type or ''))
         elif kind == 'data':
-            data = p.get('data') if isinstance(p, dict) else getattr(p, 'data', None)
             if data:
                 try:
-                    jsonData = json.dumps(data)
                     if 'type' in data and data['type'] == 'form':
                         parts.append((data, 'form'))
                     else:
-                        parts.append((jsonData, 'application/json'))
+                        parts.append((json.dumps(data), 'application/json'))
                 except Exception as e:
                     print('Failed to dump data', e)
                     parts.append(('<data>', 'text/plain'))
@@ -35,6 +35,8 @@ class StateMessage:
     content: list[tuple[ContentPart, str]] = dataclasses.field(
         default_factory=list
     )
+    # Server-side version of the message (0 = not stored by the server yet)
+    version: int = 0
 
 
 @dataclass
@@ -0,0 +1,78 @@
+"""ADKHostManager with the offline FakeLlm backend (no model calls)."""
+
+import asyncio
+
+import httpx
+
+from a2a.types import Part, Task, TaskState, TaskStatus, TextPart
+
+from service.server.adk_host_manager import ADKHostManager
+from service.types import Message
+from utils.fake_llm import FakeLlm
+
+
+def _manager() -> ADKHostManager:
+    return ADKHostManager(httpx.AsyncClient(), model_backend=FakeLlm())
+
+
+def _message(messageid: str, contextid: str, taskid: str | None = None) -> Message:
+    return Message(
+        role='user',
+        parts=[Part(root=TextPart(text='oi'))],
+        messageId=messageid,
+        contextId=contextid,
+        taskId=taskid,
+    )
+
+
+def test_cancel_closes_the_task_the_message_resumes():
+    async def test():
+        manager = _manager()
+        conversation = await manager.create_conversation()
+        contextid = conversation.conversationId
+        manager.add_task(
+            Task(
+                id='t1',
+                contextId=contextid,
+                status=TaskStatus(state=TaskState.input_required),
+            )
+        )
+        # What process_message does before the run reaches the model
+        manager._pending_messageIds.append('m1')
+        manager._receive(_message('m1', contextid, 't1'), contextid)
+
+        assert await manager.cancel_message('m1') is True
+        assert manager.pending_count() == 0
+        task = manager.conversation_tasks(contextid)[0]
+        assert task.status.state == TaskState.canceled
+
+    asyncio.run(test())
+
+
+def test_snapshot_keeps_a_conversation_rehydrated_while_writing(tmp_path):
+    async def test():
+        manager = _manager()
+        conversation = await manager.create_conversation()
+        contextid = conversation.conversationId
+        manager._receive(_message('m1', contextid), contextid)
+        manager.evict_conversation(contextid, str(tmp_path / 'evicted'))
+
+        write = manager._write_conversations
+
+        def rehydrate_first(conversations, writer, index):
+            # Read back after the capture: its file is gone by the write
+            if contextid in manager._evicted:
+                manager.rehydrate_conversation(contextid)
+            return write(conversations, writer, index)
+
+        manager._write_conversations = rehydrate_first
+        path = str(tmp_path / 'state.snap')
+        assert await manager.save_snapshot(path) is True
+
+        restored = _manager()
+        assert restored.restore_snapshot(path)['conversations'] == 1
+        conversation = restored.get_conversation(contextid)
+        assert conversation is not None
+        assert conversation.messageIds == ['m1']
+
+    asyncio.run(test())
@@ -0,0 +1,135 @@
+"""Token buckets and run slots of admission control."""
+
+import asyncio
+
+from service.server.admission import (
+    AdmissionControl,
+    AdmissionPolicy,
+    RunSlots,
+    TokenBucket,
+)
+
+
+def test_token_bucket_refills_up_to_its_burst():
+    bucket = TokenBucket(2, now=0.0)
+    bucket.tokens = 0.0
+    bucket.refill(rate=0.5, burst=2, now=1.0)
+    assert bucket.tokens == 0.5
+    assert bucket.wait(0.5) == 1.0
+    bucket.refill(rate=0.5, burst=2, now=100.0)
+    assert bucket.tokens == 2
+    assert bucket.wait(0.5) == 0.0
+
+
+def test_admit_rejects_once_the_burst_is_spent():
+    control = AdmissionControl(AdmissionPolicy(user_rate=1.0, user_burst=2))
+    assert control.admit('u1', 'c1', now=0.0) is None
+    assert control.admit('u1', 'c2', now=0.0) is None
+    rejection = control.admit('u1', 'c3', now=0.0)
+    assert rejection.scope == 'user'
+    assert rejection.retry_after == 1.0
+    assert rejection.to_error()['data'] == {'scope': 'user', 'retryAfter': 1.0}
+    # Buckets are per user
+    assert control.admit('u2', 'c3', now=0.0) is None
+    assert control.admit('u1', 'c3', now=1.0) is None
+
+
+def test_a_rejected_send_takes_no_token():
+    control = AdmissionControl(
+        AdmissionPolicy(
+            user_rate=1.0, user_burst=2, conversation_rate=1.0, conversation_burst=1
+        )
+    )
+    assert control.admit('u1', 'c1', now=0.0) is None
+    assert control.admit('u1', 'c1', now=0.0).scope == 'conversation'
+    # The user token was not spent by the rejected send
+    assert control.admit('u1', 'c2', now=0.0) is None
+
+
+def test_released_queued_ticket_leaves_the_queue():
+    async def test():
+        slots = RunSlots(AdmissionPolicy(max_concurrent_runs=1))
+        running = slots.enqueue('a')
+        first = slots.enqueue('b')
+        second = slots.enqueue('c')
+        assert running.held
+        assert slots.queued == ['b', 'c']
+
+        slots.release(first)
+        assert first.future.cancelled()
+        assert slots.queued == ['c']
+        slots.release(first)
+
+        slots.release(running)
+        assert second.held
+        assert slots.active == 1
+        slots.release(second)
+        assert slots.active == 0
+        assert slots.running == {'interactive': 0, 'batch': 0}
+
+    asyncio.run(test())
+
+
+def test_cancelled_waiter_does_not_take_the_slot():
+    async def test():
+        slots = RunSlots(AdmissionPolicy(max_concurrent_runs=1))
+        running = slots.enqueue('a')
+        cancelled = slots.enqueue('b')
+        waiting = slots.enqueue('c')
+        # What happens when the task awaiting the ticket is cancelled
+        cancelled.future.cancel()
+
+        slots.release(running)
+        assert not cancelled.held
+        assert waiting.held
+        assert slots.active == 1
+
+    asyncio.run(test())
+
+
+def _grant_order(slots: RunSlots, tickets: list) -> list[str]:
+    """Release the running ticket until every one has run; the keys in the
+    order they got the slot."""
+    order = []
+    while True:
+        held = [t for t in tickets if t.held]
+        if not held:
+            return order
+        order.append(held[0].key)
+        slots.release(held[0])
+        tickets.remove(held[0])
+
+
+def test_free_slots_go_to_the_classes_by_weight():
+    async def test():
+        slots = RunSlots(
+            AdmissionPolicy(max_concurrent_runs=1, interactive_weight=2)
+        )
+        tickets = [slots.enqueue('i0')]
+        tickets += [slots.enqueue(f'b{i}', 'batch') for i in range(1, 4)]
+        tickets += [slots.enqueue(f'i{i}') for i in range(1, 6)]
+        assert _grant_order(slots, tickets) == [
+            # i0 took the first interactive credit of the round
+            'i0', 'i1', 'b1',
+            'i2', 'i3', 'b2',
+            'i4', 'i5', 'b3',
+        ]
+
+    asyncio.run(test())
+
+
+def test_batch_max_runs_leaves_slots_to_interactive():
+    async def test():
+        slots = RunSlots(AdmissionPolicy(max_concurrent_runs=3, batch_max_runs=1))
+        first = slots.enqueue('b1', 'batch')
+        second = slots.enqueue('b2', 'batch')
+        interactive = slots.enqueue('i1')
+        assert first.held and interactive.held
+        assert not second.held
+        assert slots.queued == ['b2']
+
+        slots.release(first)
+        assert second.held
+        assert slots.running == {'interactive': 1, 'batch': 1}
+
+    asyncio.run(test())
@@ -0,0 +1,64 @@
+"""Reading conversation dumps (gzip JSONL, possibly concatenated)."""
+
+import asyncio
+import zlib
+
+import pytest
+
+from service.server.export import (
+    EXPORT_VERSION,
+    conversation_groups,
+    encode_records,
+    read_records,
+)
+
+
+def _dump(*ids: str) -> bytes:
+    records = [{'type': 'header', 'version': EXPORT_VERSION}]
+    for conversationid in ids:
+        records.append(
+            {'type': 'conversation', 'bundle': {'conversation': {'id': conversationid}}}
+        )
+        records.append({'type': 'task', 'task': {'contextId': conversationid}})
+    return encode_records(records)
+
+
+async def _chunks(data: bytes, size: int):
+    for start in range(0, len(data), size):
+        yield data[start : start + size]
+
+
+def _read(data: bytes, size: int) -> list[dict]:
+    async def read():
+        return [r async for r in read_records(_chunks(data, size))]
+
+    return asyncio.run(read())
+
+
+@pytest.mark.parametrize('size', [1, 7, 1 << 20])
+def test_concatenated_dumps_are_read_as_one(size):
+    records = _read(_dump('c1', 'c2') + _dump('c3'), size)
+    pair = ['conversation', 'task']
+    assert [r['type'] for r in records] == ['header', *pair, *pair, 'header', *pair]
+    ids = [r['bundle']['conversation']['id'] for r in records if 'bundle' in r]
+    assert ids == ['c1', 'c2', 'c3']
+
+
+def test_zlib_streams_are_read_too():
+    data = zlib.compress(b'{"type":"header","version":1}\n{"type":"task"}')
+    assert [r['type'] for r in _read(data, 3)] == ['header', 'task']
+
+
+def test_records_are_grouped_per_conversation():
+    async def groups(data: bytes):
+        records = read_records(_chunks(data, 64))
+        return [group async for group in conversation_groups(records)]
+
+    result = asyncio.run(groups(_dump('c1', 'c2') + _dump('c3')))
+    assert [[r['type'] for r in group] for group in result] == [
+        ['conversation', 'task'],
+    ] * 3
+
+    newer = encode_records([{'type': 'header', 'version': EXPORT_VERSION + 1}])
+    with pytest.raises(ValueError):
+        asyncio.run(groups(newer))
@@ -0,0 +1,50 @@
+"""Consistent hashing of conversation ids to workers."""
+
+from collections import Counter
+
+import pytest
+
+from service.server.hashring import HashRing
+
+
+KEYS = [f'conversation-{i}' for i in range(2000)]
+
+
+def _owners(ring: HashRing) -> dict[str, str]:
+    return {key: ring.owner(key) for key in KEYS}
+
+
+def test_keys_spread_over_every_node():
+    counts = Counter(_owners(HashRing(['w0', 'w1', 'w2', 'w3'])).values())
+    assert set(counts) == {'w0', 'w1', 'w2', 'w3'}
+    assert all(300 < count < 700 for count in counts.values())
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = HashRing(['w0', 'w1', 'w2', 'w3'])
+    before = _owners(ring)
+    ring.add('w4')
+    moved = {key for key, owner in _owners(ring).items() if owner != before[key]}
+    assert all(ring.owner(key) == 'w4' for key in moved)
+    # About 1/5 of them
+    assert 250 < len(moved) < 550
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = HashRing(['w0', 'w1', 'w2', 'w3'])
+    before = _owners(ring)
+    ring.remove('w2')
+    after = _owners(ring)
+    assert {key for key in KEYS if after[key] != before[key]} == {
+        key for key in KEYS if before[key] == 'w2'
+    }
+    assert ring.nodes == ['w0', 'w1', 'w3']
+    assert 'w2' not in ring
+
+
+def test_owner_is_the_same_for_any_order_of_nodes():
+    assert _owners(HashRing(['w0', 'w1', 'w2'])) == _owners(
+        HashRing(['w2', 'w0', 'w1'])
+    )
+    with pytest.raises(LookupError):
+        HashRing().owner('conversation-0')
@@ -0,0 +1,36 @@
+"""The window of recent message/send answers."""
+
+from service.server.idempotency import IdempotencyPolicy, RecentSends
+from service.types import MessageInfo
+
+
+def _info(messageid: str) -> MessageInfo:
+    return MessageInfo(messageId=messageid, contextId='c1')
+
+
+def test_answer_is_kept_for_the_window():
+    sends = RecentSends(IdempotencyPolicy(window_seconds=10.0))
+    sends.add(_info('m1'), now=0.0)
+    assert sends.get('m1', now=10.0).messageId == 'm1'
+    assert sends.get('m2', now=10.0) is None
+    assert sends.get('m1', now=10.5) is None
+    assert len(sends) == 0
+
+
+def test_oldest_answers_are_dropped_past_max_entries():
+    sends = RecentSends(IdempotencyPolicy(max_entries=2))
+    for i, messageid in enumerate(['m1', 'm2', 'm3']):
+        sends.add(_info(messageid), now=float(i))
+    assert len(sends) == 2
+    assert sends.get('m1', now=3.0) is None
+    assert sends.get('m3', now=3.0) is not None
+
+
+def test_a_send_added_again_moves_to_the_end():
+    sends = RecentSends(IdempotencyPolicy(window_seconds=10.0))
+    sends.add(_info('m1'), now=0.0)
+    sends.add(_info('m2'), now=5.0)
+    sends.add(_info('m1'), now=8.0)
+    # m2 expires first now; m1 behind it is still in the window
+    assert sends.get('m2', now=16.0) is None
+    assert sends.get('m1', now=16.0) is not None
@@ -0,0 +1,95 @@
+"""ShardRouter rebalancing, with the shards faked at ShardRouter.call."""
+
+import asyncio
+
+import httpx
+
+from fastapi import FastAPI
+
+from service.server.router import ShardRouter
+
+
+class FakeShards:
+    """Conversations per shard; `busy` ones cannot be exported."""
+
+    def __init__(self, placement: dict[str, str]):
+        self.placement = placement
+        self.busy: set[str] = set()
+        self.fanned_out: list[str] = []
+
+    async def call(self, shard: str, method: str, body: dict) -> dict:
+        params = body.get('params')
+        if method == 'shard/conversations':
+            return {'result': [c for c, s in self.placement.items() if s == shard]}
+        if method == 'shard/export':
+            return {'result': None if params in self.busy else {'id': params}}
+        if method == 'shard/import':
+            self.placement[params['id']] = shard
+            return {'result': params['id']}
+        if method == 'shard/drop':
+            return {'result': 1}
+        self.fanned_out.append(shard)
+        return {'result': []}
+
+
+def _router(shards: list[str], conversations: int) -> tuple[ShardRouter, FakeShards]:
+    router = ShardRouter(
+        FastAPI(),
+        httpx.AsyncClient(),
+        {s: f'http://{s}' for s in shards},
+        move_timeout_seconds=0.05,
+    )
+    fake = FakeShards(
+        {f'c{i}': router.ring.owner(f'c{i}') for i in range(conversations)}
+    )
+    router.call = fake.call
+    return router, fake
+
+
+def test_removed_shard_keeps_serving_its_pinned_conversations():
+    async def test():
+        router, fake = _router(['s0', 's1', 's2'], 60)
+        stranded = next(c for c, s in fake.placement.items() if s == 's2')
+        fake.busy.add(stranded)
+
+        await router.remove_shard('s2')
+        assert router.owner(stranded) == 's2'
+        assert 's2' in router.shards
+        await router.fan_out('conversation/list', {})
+        assert 's2' in fake.fanned_out
+
+        # The next rebalance moves it and forgets the removed shard
+        fake.busy.clear()
+        await router.add_shard('s3', 'http://s3')
+        assert router.owner(stranded) == fake.placement[stranded] != 's2'
+        assert router._pinned == {}
+        assert 's2' not in router.shards
+
+    asyncio.run(test())
+
+
+def test_calls_wait_only_for_their_own_move():
+    async def test():
+        router, fake = _router(['s0', 's1'], 200)
+        gate = asyncio.Event()
+        call = fake.call
+
+        async def slow(shard, method, body):
+            if method == 'shard/export':
+                await gate.wait()
+            return await call(shard, method, body)
+
+        router.call = slow
+        router.move_concurrency = 1
+        task = asyncio.create_task(router.add_shard('s2', 'http://s2'))
+        await asyncio.sleep(0.01)
+        # One move in flight; the others are still served by their old shard
+        assert len(router._moving) == 1
+        waiting = [c for c in router._pinned if c not in router._moving]
+        assert waiting
+        assert router.owner(waiting[0]) == fake.placement[waiting[0]]
+        gate.set()
+        await task
+        assert router._moving == {}
+
+    asyncio.run(test())
@@ -0,0 +1,96 @@
+"""The JSON-RPC 2.0 dispatcher behind POST /rpc."""
+
+import asyncio
+
+import httpx
+
+from fastapi import FastAPI, Request
+
+from service.server.rpc import Dispatcher
+
+
+def _dispatcher(seen: list) -> Dispatcher:
+    async def echo(request: Request):
+        body = await request.json()
+        seen.append(body.get('id', 'notification'))
+        return {
+            'jsonrpc': '2.0',
+            'result': [body['params'], request.headers.get('x-a2a-user-id')],
+        }
+
+    def version():
+        return {'jsonrpc': '2.0', 'result': 1}
+
+    async def fail(request: Request):
+        raise RuntimeError('boom')
+
+    return Dispatcher({'echo': echo, 'version': version, 'fail': fail})
+
+
+def _post(dispatcher: Dispatcher, payload, **kwargs) -> httpx.Response:
+    app = FastAPI()
+    app.post('/rpc')(dispatcher.handle)
+
+    async def post():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://test'
+        ) as client:
+            return await client.post('/rpc', json=payload, **kwargs)
+
+    return asyncio.run(post())
+
+
+def test_batch_answers_each_call_with_its_id():
+    seen = []
+    response = _post(
+        _dispatcher(seen),
+        [
+            {'jsonrpc': '2.0', 'id': 1, 'method': 'echo', 'params': 'a'},
+            {'jsonrpc': '2.0', 'method': 'echo', 'params': 'b'},
+            {'jsonrpc': '2.0', 'id': 'v', 'method': 'version'},
+            {'jsonrpc': '2.0', 'id': 3, 'method': 'missing'},
+            {'jsonrpc': '2.0', 'id': 4, 'method': 'fail'},
+            {'jsonrpc': '1.0', 'id': 5, 'method': 'echo'},
+            7,
+        ],
+        headers={'x-a2a-user-id': 'u1'},
+    )
+    assert response.status_code == 200
+    answers = response.json()
+    assert answers[:2] == [
+        {'jsonrpc': '2.0', 'id': 1, 'result': ['a', 'u1']},
+        {'jsonrpc': '2.0', 'id': 'v', 'result': 1},
+    ]
+    assert [(a['id'], a['error']['code']) for a in answers[2:]] == [
+        (3, -32601),
+        (4, -32603),
+        (5, -32600),
+        (None, -32600),
+    ]
+    # The notification ran, without an answer
+    assert sorted(seen, key=str) == [1, 'notification']
+
+
+def test_only_notifications_get_204():
+    seen = []
+    response = _post(
+        _dispatcher(seen),
+        [
+            {'jsonrpc': '2.0', 'method': 'echo', 'params': 'a'},
+            {'jsonrpc': '2.0', 'method': 'fail'},
+            {'jsonrpc': '2.0', 'method': 'missing'},
+        ],
+    )
+    assert response.status_code == 204
+    assert seen == ['notification']
+
+
+def test_single_call_and_malformed_payloads():
+    dispatcher = _dispatcher([])
+    single = _post(dispatcher, {'jsonrpc': '2.0', 'id': 1, 'method': 'version'})
+    assert single.json() == {'jsonrpc': '2.0', 'id': 1, 'result': 1}
+    empty = _post(dispatcher, [])
+    assert empty.json()['error']['code'] == -32600
+    garbage = _post(dispatcher, None, content=b'{not json')
+    assert garbage.json()['error']['code'] == -32700
@@ -0,0 +1,114 @@
+"""ConversationServer over the in-memory simulation, through its HTTP API."""
+
+import asyncio
+
+import httpx
+
+from fastapi import FastAPI
+
+from service.server.idempotency import RecentSends
+from service.server.in_memory_manager import (
+    InMemoryFakeAgentManager,
+    SimulationConfig,
+)
+from service.server.metrics import metrics
+from service.server.server import ConversationServer
+
+
+async def _call(client: httpx.AsyncClient, method: str, params=None) -> dict:
+    response = await client.post(
+        f'/{method}', json={'jsonrpc': '2.0', 'id': 1, 'params': params}
+    )
+    return response.json()
+
+
+def _message_ids(messages: list[dict]) -> list[str]:
+    return [m.get('messageId') or m.get('message_id') for m in messages]
+
+
+def _send_params(messageid: str, contextid: str) -> dict:
+    return {
+        'messageId': messageid,
+        'contextId': contextid,
+        'role': 'user',
+        'parts': [{'kind': 'text', 'text': 'oi'}],
+    }
+
+
+async def _serve(test, **config):
+    """Run `test(client, server, contextid)` against a fresh server."""
+    app = FastAPI()
+    async with httpx.AsyncClient() as http_client:
+        server = ConversationServer(
+            app,
+            http_client,
+            manager=InMemoryFakeAgentManager(
+                SimulationConfig(task_probability=0.0, **config)
+            ),
+        )
+        async with httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app), base_url='http://test'
+        ) as client:
+            conversation = (await _call(client, 'conversation/create'))['result']
+            await test(client, server, conversation['conversationid'])
+
+
+def test_cancel_while_queued_then_drain():
+    async def test(client, server, contextid):
+        server.admission.configure({'max_concurrent_runs': 1})
+        for messageid in ('running', 'queued'):
+            await _call(client, 'message/send', _send_params(messageid, contextid))
+        await asyncio.sleep(0)
+        assert server.admission.slots.queued == ['queued']
+
+        answer = await _call(
+            client,
+            'message/cancel',
+            {'messageId': 'queued', 'contextId': contextid},
+        )
+        assert answer['result'] is True
+        await asyncio.sleep(0)
+        assert 'queued' not in server._waiting
+
+        failed = await server.drain(0.0)
+        assert failed == ['running']
+        messages = (await _call(client, 'message/list', contextid))['result']
+        assert 'queued' not in _message_ids(messages)
+
+    asyncio.run(_serve(test, latency_seconds=5.0))
+
+
+def test_shard_export_waits_for_a_queued_send():
+    async def test(client, server, contextid):
+        server.admission.configure({'max_concurrent_runs': 1})
+        other = (await _call(client, 'conversation/create'))['result']
+        await _call(
+            client, 'message/send', _send_params('running', other['conversationid'])
+        )
+        await _call(client, 'message/send', _send_params('queued', contextid))
+        await asyncio.sleep(0)
+        assert server.admission.slots.queued == ['queued']
+        # The router must not move it: the queued run would start here
+        assert (await _call(client, 'shard/export', contextid))['result'] is None
+        await server.drain(0.0)
+
+    asyncio.run(_serve(test, latency_seconds=5.0))
+
+
+def test_retry_after_the_window_is_not_processed_again():
+    async def test(client, server, contextid):
+        params = _send_params('m1', contextid)
+        first = (await _call(client, 'message/send', params))['result']
+        while 'm1' in server._runs:
+            await asyncio.sleep(0.01)
+        # As if the dedup window had passed
+        server.recent_sends = RecentSends()
+        ids = server.manager.get_conversation(contextid).messageIds[:]
+
+        again = (await _call(client, 'message/send', params))['result']
+        await asyncio.sleep(0.05)
+        assert again == first
+        assert server.manager.get_conversation(contextid).messageIds == ids
+        assert metrics.snapshot()['counters']['messages.duplicates'] >= 1
+
+    asyncio.run(_serve(test, latency_seconds=0.0))
@@ -0,0 +1,43 @@
+"""SharedStore, the SQLite file the workers of a multi-worker server share."""
+
+from service.server.internal_message import InternalMessage
+from service.server.normalize import normalize_part
+from service.server.shared_store import SharedStore
+from service.types import Conversation
+
+
+def _message(messageid: str, contextid: str) -> InternalMessage:
+    return InternalMessage(
+        parts=[normalize_part({'kind': 'text', 'text': messageid})],
+        role='user',
+        contextId=contextid,
+        taskId=None,
+        messageId=messageid,
+        metadata=None,
+        version=1,
+    )
+
+
+def test_conversations_with_messages_matches_the_per_conversation_reads(tmp_path):
+    store = SharedStore(str(tmp_path / 'store.db'))
+    for contextid, count in (('c1', 3), ('c2', 0), ('c3', 2)):
+        messages = [_message(f'{contextid}-m{i}', contextid) for i in range(count)]
+        store.publish_conversation(
+            'w0',
+            Conversation(
+                conversationid=contextid,
+                isactive=True,
+                messageIds=[m.messageId for m in reversed(messages)],
+            ),
+            messages,
+            [],
+        )
+
+    batched = store.conversations_with_messages()
+    assert [c.conversationId for c, _ in batched] == ['c1', 'c2', 'c3']
+    for conversation, messages in batched:
+        expected = store.messages(conversation.conversationId)
+        assert [m.messageId for m in messages] == [m.messageId for m in expected]
+        # In the order of the conversation's messageIds
+        assert [m.messageId for m in messages] == conversation.messageIds
+    store.close()
@@ -0,0 +1,71 @@
+"""The snapshot file format: frames, index and trailer."""
+
+import os
+
+import pytest
+
+from service.server.snapshot import (
+    FRAME_CONVERSATION,
+    FRAME_TASK,
+    SnapshotReader,
+    SnapshotWriter,
+    read_frame,
+)
+
+
+def _write(path: str) -> dict:
+    writer = SnapshotWriter(path)
+    conversation = writer.write(FRAME_CONVERSATION, {'conversation': {'id': 'c1'}})
+    task = writer.write(FRAME_TASK, {'task': {'id': 't1'}})
+    index = {'conversations': {'c1': {'offset': conversation}}, 'tasks': [task]}
+    writer.close(index)
+    return index
+
+
+def test_frames_read_back_from_the_index(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    index = _write(path)
+    assert not os.path.exists(f'{path}.tmp')
+    with SnapshotReader(path) as reader:
+        assert reader.index == index
+        kind, data = reader.read(index['tasks'][0])
+        assert (kind, data) == (FRAME_TASK, {'task': {'id': 't1'}})
+    offset = index['conversations']['c1']['offset']
+    assert read_frame(path, offset) == {'conversation': {'id': 'c1'}}
+
+
+def test_a_snapshot_is_only_in_place_once_committed(tmp_path):
+    path = str(tmp_path / 'state.snap')
+    _write(path)
+    writer = SnapshotWriter(path)
+    writer.write(FRAME_TASK, {'task': {'id': 't2'}})
+    writer.finish({'tasks': []})
+    with SnapshotReader(path) as reader:
+        assert len(reader.index['tasks']) == 1
+    SnapshotWriter.commit(path)
+    with SnapshotReader(path) as reader:
+        assert reader.index == {'tasks': []}
+
+    aborted = SnapshotWriter(path)
+    aborted.abort()
+    assert not os.path.exists(f'{path}.tmp')
+
+
+@pytest.mark.parametrize('keep', [0.5, 0.99, 12, 8, 3])
+def test_truncated_snapshot_is_rejected(tmp_path, keep):
+    path = str(tmp_path / 'state.snap')
+    _write(path)
+    with open(path, 'rb') as f:
+        data = f.read()
+    size = int(len(data) * keep) if isinstance(keep, float) else keep
+    with open(path, 'wb') as f:
+        f.write(data[:size])
+    with pytest.raises(ValueError):
+        SnapshotReader(path)
+
+
+def test_other_files_are_rejected(tmp_path):
+    path = tmp_path / 'state.snap'
+    path.write_bytes(b'{"not": "a snapshot"}')
+    with pytest.raises(ValueError, match='not a snapshot'):
+        SnapshotReader(str(path))
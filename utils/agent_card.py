@@ -4,11 +4,13 @@ from a2a.types import AgentCard
 from a2a.utils.constants import AGENT_CARD_WELL_KNOWN_PATH
 
 
-def get_agent_card(remote_agent_address: str) -> AgentCard:
+def get_agent_card(
+    remote_agent_address: str, timeout: float | None = 30.0
+) -> AgentCard:
     """Get the agent card."""
     if not remote_agent_address.startswith(('http://', 'https://')):
         remote_agent_address = 'http://' + remote_agent_address
     agent_card = requests.get(
-        f'{remote_agent_address}{AGENT_CARD_WELL_KNOWN_PATH}'
+        f'{remote_agent_address}{AGENT_CARD_WELL_KNOWN_PATH}', timeout=timeout
     )
     return AgentCard(**agent_card.json())
@@ -0,0 +1,246 @@
+"""
+Backend de modelo local e determinístico para rodar o ADK sem rede.
+
+`FakeLlm` implementa o contrato `BaseLlm` do ADK, então o pipeline real
+(Runner, session service, tools, conversão de eventos) roda inteiro offline.
+As respostas vêm de um roteiro (script JSON) ou de um template, com latência
+e tokens por segundo configuráveis, partials de streaming, chamadas de função
+e artefatos roteirizados.
+
+Exemplo de roteiro (A2A_FAKE_LLM_SCRIPT=roteiro.json):
+
+    {
+      "latency_ms": 200, "latency_jitter_ms": 50,
+      "latency_distribution": "lognormal",
+      "tokens_per_second": 40, "stream_partials": true, "seed": 7,
+      "turns": [
+        {"text": "Você disse: {user_text}"},
+        {"function_call": {"name": "gerar_relatorio", "args": {"tema": "{user_text}"}},
+         "tool_result": ["Relatório pronto"], "tool_latency_ms": 500,
+         "artifact": {"filename": "relatorio.txt", "mime_type": "text/plain",
+                      "text": "conteúdo"}},
+        {"text": "Relatório gerado."}
+      ]
+    }
+
+Os turnos são escolhidos pelo número de respostas do modelo já presentes na
+conversa, então cada conversa percorre o roteiro na mesma ordem,
+independentemente da concorrência.
+"""
+
+import asyncio
+import base64
+import json
+import os
+import random
+
+from typing import Any, AsyncGenerator
+
+from google.adk.models.base_llm import BaseLlm
+from google.adk.models.llm_request import LlmRequest
+from google.adk.models.llm_response import LlmResponse
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
+from google.genai import types
+
+
+DEFAULT_TEMPLATE = 'Resposta simulada para: {user_text}'
+
+
+class FakeLlm(BaseLlm):
+    """Modelo roteirizado e determinístico compatível com o ADK."""
+
+    model: str = 'fake-llm'
+    turns: list[dict[str, Any]] = []
+    template: str = DEFAULT_TEMPLATE
+    # 'fixed', 'uniform' (± jitter) ou 'lognormal' (jitter como desvio)
+    latency_distribution: str = 'fixed'
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    # 0 emite o texto de uma vez
+    tokens_per_second: float = 0.0
+    stream_partials: bool = False
+    stream_chunk_tokens: int = 8
+    seed: int = 0
+
+    @classmethod
+    def supported_models(cls) -> list[str]:
+        return [r'fake-.*']
+
+    @classmethod
+    def from_file(cls, path: str, **overrides) -> 'FakeLlm':
+        with open(path, encoding='utf-8') as f:
+            config = json.load(f)
+        config.update(overrides)
+        return cls(**config)
+
+    async def generate_content_async(
+        self, llm_request: LlmRequest, stream: bool = False
+    ) -> AsyncGenerator[LlmResponse, None]:
+        contents = llm_request.contents or []
+        turn_index = sum(1 for c in contents if c.role == 'model')
+        user_text = _last_user_text(contents)
+        rng = random.Random(f'{self.seed}:{turn_index}:{user_text}')
+        turn = (
+            self.turns[turn_index % len(self.turns)]
+            if self.turns
+            else {'text': self.template}
+        )
+
+        await asyncio.sleep(self._first_token_delay(rng))
+
+        if 'function_call' in turn:
+            call = turn['function_call']
+            yield LlmResponse(
+                content=types.Content(
+                    role='model',
+                    parts=[
+                        types.Part(
+                            function_call=types.FunctionCall(
+                                name=call['name'],
+                                args=_render(call.get('args', {}), user_text, turn_index),
+                            )
+                        )
+                    ],
+                ),
+                turn_complete=True,
+            )
+            return
+
+        text = _render(turn.get('text', ''), user_text, turn_index)
+        words = text.split(' ')
+        chunk = max(1, self.stream_chunk_tokens)
+        chunks = [
+            ' '.join(words[i : i + chunk]) for i in range(0, len(words), chunk)
+        ]
+        emitted: list[str] = []
+        for i, piece in enumerate(chunks):
+            if self.tokens_per_second > 0:
+                await asyncio.sleep(
+                    len(piece.split(' ')) / self.tokens_per_second
+                )
+            emitted.append(piece)
+            if (stream or self.stream_partials) and i < len(chunks) - 1:
+                yield LlmResponse(
+                    content=types.Content(
+                        role='model', parts=[types.Part(text=piece + ' ')]
+                    ),
+                    partial=True,
+                )
+        yield LlmResponse(
+            content=types.Content(
+                role='model', parts=[types.Part(text=' '.join(emitted))]
+            ),
+            partial=False,
+            turn_complete=True,
+        )
+
+    def scripted_tools(self) -> list[BaseTool]:
+        """Tools que atendem às chamadas de função do roteiro."""
+        tools: dict[str, ScriptedTool] = {}
+        for turn in self.turns:
+            if 'function_call' not in turn:
+                continue
+            name = turn['function_call']['name']
+            tools.setdefault(name, ScriptedTool(name)).add_turn(turn)
+        return list(tools.values())
+
+    def _first_token_delay(self, rng: random.Random) -> float:
+        base = self.latency_ms
+        jitter = self.latency_jitter_ms
+        if self.latency_distribution == 'uniform':
+            delay = rng.uniform(base - jitter, base + jitter)
+        elif self.latency_distribution == 'lognormal' and base > 0:
+            # Média `base` e desvio aproximado `jitter`, como latências reais
+            sigma = (jitter / base) if jitter else 0.0
+            delay = rng.lognormvariate(0, sigma) * base
+        else:
+            delay = base
+        return max(0.0, delay) / 1000
+
+
+class ScriptedTool(BaseTool):
+    """Tool que devolve o `tool_result` (e o `artifact`) do roteiro."""
+
+    def __init__(self, name: str):
+        super().__init__(name=name, description=f'Ferramenta roteirizada {name}')
+        self._turns: list[dict[str, Any]] = []
+        self._calls = 0
+
+    def add_turn(self, turn: dict[str, Any]):
+        self._turns.append(turn)
+
+    def _get_declaration(self) -> types.FunctionDeclaration:
+        return types.FunctionDeclaration(
+            name=self.name,
+            description=self.description,
+            parameters=types.Schema(type=types.Type.OBJECT),
+        )
+
+    async def run_async(
+        self, *, args: dict[str, Any], tool_context: ToolContext
+    ) -> Any:
+        turn = self._turns[self._calls % len(self._turns)]
+        self._calls += 1
+        if turn.get('tool_latency_ms'):
+            await asyncio.sleep(turn['tool_latency_ms'] / 1000)
+        result = list(turn.get('tool_result', []))
+        artifact = turn.get('artifact')
+        if artifact:
+            data = artifact.get('text', '').encode('utf-8')
+            if 'base64' in artifact:
+                data = base64.b64decode(artifact['base64'])
+            mime_type = artifact.get('mime_type', 'application/octet-stream')
+            await tool_context.save_artifact(
+                artifact['filename'],
+                types.Part.from_bytes(data=data, mime_type=mime_type),
+            )
+            result.append(
+                {
+                    'kind': 'file',
+                    'file': {
+                        'name': artifact['filename'],
+                        'mime_type': mime_type,
+                        'bytes': base64.b64encode(data).decode('utf-8'),
+                    },
+                }
+            )
+        return {'result': result}
+
+
+def load_fake_llm_from_env() -> FakeLlm:
+    """Cria o FakeLlm a partir de A2A_FAKE_LLM_SCRIPT (opcional)."""
+    path = os.environ.get('A2A_FAKE_LLM_SCRIPT', '')
+    overrides: dict[str, Any] = {}
+    if os.environ.get('A2A_FAKE_LLM_LATENCY_MS'):
+        overrides['latency_ms'] = float(os.environ['A2A_FAKE_LLM_LATENCY_MS'])
+    if os.environ.get('A2A_FAKE_LLM_TOKENS_PER_SECOND'):
+        overrides['tokens_per_second'] = float(
+            os.environ['A2A_FAKE_LLM_TOKENS_PER_SECOND']
+        )
+    if path:
+        return FakeLlm.from_file(path, **overrides)
+    return FakeLlm(**overrides)
+
+
+def _last_user_text(contents: list[types.Content]) -> str:
+    for content in reversed(contents):
+        if content.role != 'user' or not content.parts:
+            continue
+        text = ' '.join(p.text for p in content.parts if p.text)
+        if text:
+            return text
+    return ''
+
+
+def _render(value: Any, user_text: str, turn_index: int) -> Any:
+    """Substitui {user_text} e {turn} em strings, recursivamente."""
+    if isinstance(value, str):
+        return value.replace('{user_text}', user_text).replace(
+            '{turn}', str(turn_index)
+        )
+    if isinstance(value, dict):
+        return {k: _render(v, user_text, turn_index) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_render(v, user_text, turn_index) for v in value]
+    return value
@@ -2,28 +2,91 @@
 Módulo HostAgent com integração real ao Google ADK.
 """
 
+import asyncio
 from typing import Any, Callable, List, Optional
 import httpx
 import os
 from google.adk import Agent as ADKAgent
 from google.adk.agents import LlmAgent
+from google.adk.models.base_llm import BaseLlm
+from google.adk.tools.base_tool import BaseTool
+from google.adk.tools.tool_context import ToolContext
 from google.genai import Client
 from google.genai.types import GenerateContentConfig, SafetySetting, HarmCategory, HarmBlockThreshold
 
+from service.server.metrics import metrics
+
+
+class DeadlineTool(BaseTool):
+    """Limita o tempo de uma tool; ao estourar, o modelo recebe um erro
+    como resultado e a execução continua."""
+
+    def __init__(self, tool: BaseTool, timeout_seconds: float):
+        super().__init__(
+            name=tool.name,
+            description=tool.description,
+            is_long_running=tool.is_long_running,
+        )
+        self.tool = tool
+        self.timeout_seconds = timeout_seconds
+
+    def _get_declaration(self):
+        return self.tool._get_declaration()
+
+    async def run_async(self, *, args: dict[str, Any], tool_context: ToolContext) -> Any:
+        try:
+            return await asyncio.wait_for(
+                self.tool.run_async(args=args, tool_context=tool_context),
+                self.timeout_seconds,
+            )
+        except asyncio.TimeoutError:
+            metrics.inc('timeouts.tool')
+            # Mesmo formato {'result': [...]} das tools que concluem
+            return {
+                'result': [f'Erro: a ferramenta {self.name} passou de {self.timeout_seconds:g}s.'],
+                'error': 'timeout',
+            }
+
 
 class HostAgent:
     """Agente host para gerenciar conversas usando Google ADK."""
     
-    def __init__(self, agents: List[Any], http_client: httpx.AsyncClient, task_callback: Callable):
+    def __init__(
+        self,
+        agents: List[Any],
+        http_client: httpx.AsyncClient,
+        task_callback: Callable,
+        model_backend: Optional[BaseLlm] = None,
+        tool_timeout_seconds: Optional[float] = None,
+    ):
         self.agents = agents
+        # None: as tools rodam sem limite de tempo
+        self.tool_timeout_seconds = tool_timeout_seconds
         self.http_client = http_client
         self.task_callback = task_callback
-        self.client = Client()
+        # Backend de modelo plugável; None usa o Gemini (ou A2A_MODEL_BACKEND)
+        self.model_backend = model_backend or self._backend_from_env()
+        # O cliente genai exige credenciais, então só é criado sem backend local
+        self.client = Client() if self.model_backend is None else None
+
+    @staticmethod
+    def _backend_from_env() -> Optional[BaseLlm]:
+        if os.environ.get('A2A_MODEL_BACKEND', '').lower() == 'fake':
+            from utils.fake_llm import load_fake_llm_from_env
+
+            return load_fake_llm_from_env()
+        return None
     
     def create_agent(self) -> ADKAgent:
         """Cria um agente LLM usando Google ADK."""
         # Configurar modelo
         model_name = os.environ.get('GOOGLE_GENAI_MODEL', 'gemini-1.5-flash')
+        model: str | BaseLlm = self.model_backend or model_name
+        tools = []
+        if hasattr(self.model_backend, 'scripted_tools'):
+            tools = self.model_backend.scripted_tools()
+        if self.tool_timeout_seconds:
+            tools = [DeadlineTool(t, self.tool_timeout_seconds) for t in tools]
         
         # Configurações de segurança
         safety_settings = [
@@ -49,7 +112,8 @@ class HostAgent:
         agent = LlmAgent(
             name="AssistantAgent",
             description="Agente assistente inteligente",
-            model=model_name,
+            model=model,
+            tools=tools,
             instruction="""Você é um assistente útil e prestativo. 
             Responda de forma clara, precisa e educada.
             Se não souber algo, seja honesto sobre isso.""",
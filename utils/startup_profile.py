@@ -0,0 +1,113 @@
+"""Import-time breakdown of the server's cold start (`main.py --profile-startup`).
+
+Runs a fresh interpreter with `-X importtime` so nothing is cached, first for
+`import main` (what every process pays before serving) and then for the
+modules loaded on demand: the manager selected by A2A_HOST, and pandas
+(first table rendered). Prints the slowest top-level imports and the time
+per package.
+"""
+
+import os
+import re
+import subprocess
+import sys
+import time
+
+from collections import defaultdict
+from dataclasses import dataclass
+
+
+_LINE = re.compile(r'import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+@dataclass
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def parse_importtime(stderr: str) -> list[ImportRecord]:
+    records = []
+    for line in stderr.splitlines():
+        match = _LINE.match(line)
+        if match:
+            records.append(
+                ImportRecord(
+                    module=match.group(4),
+                    self_us=int(match.group(1)),
+                    cumulative_us=int(match.group(2)),
+                    depth=len(match.group(3)) // 2,
+                )
+            )
+    return records
+
+
+def measure(code: str, cwd: str) -> tuple[float, list[ImportRecord]]:
+    """Wall time and import records of `python -X importtime -c code`."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+        env={**os.environ, 'PYTHONPATH': cwd},
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return elapsed, parse_importtime(result.stderr)
+
+
+def by_package(records: list[ImportRecord]) -> dict[str, int]:
+    totals: dict[str, int] = defaultdict(int)
+    for record in records:
+        parts = record.module.split('.')
+        # google.* and similar namespaces are more useful one level down
+        name = '.'.join(parts[:2]) if parts[0] == 'google' else parts[0]
+        totals[name] += record.self_us
+    return dict(totals)
+
+
+def report(title: str, elapsed: float, records: list[ImportRecord], top: int) -> str:
+    total = sum(r.self_us for r in records)
+    lines = [f'== {title}: {elapsed:.2f}s de processo, {total / 1e6:.2f}s em imports']
+    lines.append('  imports de primeiro nível mais lentos:')
+    first_level = sorted(
+        (r for r in records if r.depth == 1),
+        key=lambda r: r.cumulative_us,
+        reverse=True,
+    )
+    for r in first_level[:top]:
+        lines.append(f'    {r.cumulative_us / 1000:9.1f} ms  {r.module}')
+    lines.append('  por pacote (tempo próprio):')
+    packages = sorted(by_package(records).items(), key=lambda kv: kv[1], reverse=True)
+    for name, us in packages[:top]:
+        lines.append(f'    {us / 1000:9.1f} ms  {name}')
+    return '\n'.join(lines)
+
+
+def profile_startup(cwd: str, top: int = 15) -> str:
+    host = os.environ.get('A2A_HOST', 'ADK').upper()
+    manager = (
+        'service.server.adk_host_manager'
+        if host == 'ADK'
+        else 'service.server.in_memory_manager'
+    )
+    sections = []
+    elapsed, main_records = measure('import main', cwd)
+    sections.append(report('import main', elapsed, main_records, top))
+    loaded = {r.module for r in main_records}
+    for title, module in [
+        (f'manager selecionado ({host})', manager),
+        ('primeira tabela (pandas)', 'pandas'),
+    ]:
+        elapsed, records = measure(f'import main; import {module}', cwd)
+        extra = [r for r in records if r.module not in loaded]
+        sections.append(
+            report(f'{title}, sob demanda', elapsed, extra, top)
+            if extra
+            else f'== {title}: já carregado por import main'
+        )
+    return '\n\n'.join(sections)